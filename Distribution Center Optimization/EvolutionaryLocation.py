@@ -0,0 +1,197 @@
+### EVOLUTIONARY ALGORITHM FOR DISTRIBUTION CENTER PLACEMENT
+#-----------------------------------------------------------
+
+# The metaheuristic of "Distance optimization evo algorithm.Rmd", written
+# out in Python instead of relying on Excel Solver:
+#
+#  1. Generate the initial population P(0)
+#  2. Evaluate the fitness of each individual in P(0)
+#  3. Generate offsprings using variation operators to form P(i)
+#  4. Evaluate the fitness of each individual in P(i)
+#  5. Select parents from P(i) and P(i-1) based on their fitness
+#  6. Reiterate the algorithm until the halting criteria are satisfied
+#
+# An individual is the (m x 2) array of DC coordinates and its fitness is the
+# total distance from every demand unit to its nearest DC. The fitness of a
+# whole population is one batched NumPy distance evaluation, optionally
+# split over a process pool. All randomness comes from one seeded
+# generator, so a seed gives the same run with or without workers.
+
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from FacilityLocation import xCoord, yCoord, read_demand_points
+
+
+EvolutionResult = namedtuple("EvolutionResult", ["centers", "total_distance", "assignment",
+                                                 "generations", "history", "stop_reason"])
+
+
+def population_fitness(population, points, chunk=4096):
+    """Total nearest-DC distance of every individual, shape (P,)."""
+    # (P, 1, m) against (1, n, 1) per coordinate, in chunks of demand units to bound memory
+    total = np.zeros(population.shape[0])
+    for start in range(0, points.shape[0], chunk):
+        p = points[start:start + chunk]
+        dx = population[:, None, :, 0] - p[None, :, None, 0]
+        dy = population[:, None, :, 1] - p[None, :, None, 1]
+        # nearest DC on squared distances, one sqrt per demand unit
+        total += np.sqrt((dx * dx + dy * dy).min(axis=2)).sum(axis=1)
+    return total
+
+
+def _evaluate(population, points, pool, workers):
+    if pool is None:
+        return population_fitness(population, points)
+    parts = np.array_split(population, workers)
+    return np.concatenate(list(pool.map(population_fitness, parts, [points] * len(parts))))
+
+
+def _tournament(rng, fitness, n, size):
+    # index of the fittest of `size` random individuals, n times
+    entrants = rng.integers(0, fitness.shape[0], size=(n, size))
+    return entrants[np.arange(n), np.argmin(fitness[entrants], axis=1)]
+
+
+def evolve(points, m, bounds=None, population_size=100, elite=4, tournament_size=3,
+           crossover_rate=0.9, mutation_rate=0.2, mutation_scale=0.05,
+           max_generations=500, max_seconds=None, stall_generations=50, target=None,
+           seed=0, workers=1):
+    """Evolve the positions of m DCs that minimise total distance to the points.
+
+    Stops at max_generations, after max_seconds, when the best fitness has not
+    improved for stall_generations, or when it reaches target.
+    """
+    points = np.asarray(points, dtype=float)
+    if bounds is None:
+        bounds = (points.min(axis=0), points.max(axis=0))
+    lo, hi = (np.asarray(b, dtype=float) for b in bounds)
+    scale = mutation_scale * (hi - lo)
+    rng = np.random.default_rng(seed)
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        # 1-2. initial population P(0) and its fitness
+        population = rng.uniform(lo, hi, size=(population_size, m, 2))
+        fitness = _evaluate(population, points, pool, workers)
+
+        history = []
+        best = np.inf
+        stall = 0
+        start = time.perf_counter()
+        stop_reason = "max_generations"
+        generation = 0
+        for generation in range(1, max_generations + 1):
+            # 3. offspring by tournament selection, uniform crossover of DCs and gaussian mutation
+            n_child = population_size - elite
+            a = population[_tournament(rng, fitness, n_child, tournament_size)]
+            b = population[_tournament(rng, fitness, n_child, tournament_size)]
+            cross = (rng.random(n_child) < crossover_rate)[:, None, None] & (rng.random((n_child, m, 1)) < 0.5)
+            children = np.where(cross, b, a)
+            mutate = rng.random((n_child, m, 1)) < mutation_rate
+            children = children + mutate * rng.normal(0.0, 1.0, size=children.shape) * scale
+            children = np.clip(children, lo, hi)
+
+            # 4. fitness of the offspring
+            child_fitness = _evaluate(children, points, pool, workers)
+
+            # 5. the elite of P(i-1) survives next to the offspring
+            keep = np.argsort(fitness)[:elite]
+            population = np.concatenate([population[keep], children])
+            fitness = np.concatenate([fitness[keep], child_fitness])
+
+            # 6. halting criteria
+            gen_best = fitness.min()
+            history.append(gen_best)
+            if gen_best < best - 1e-12:
+                best, stall = gen_best, 0
+            else:
+                stall += 1
+            if target is not None and best <= target:
+                stop_reason = "target"
+                break
+            if stall >= stall_generations:
+                stop_reason = "stall"
+                break
+            if max_seconds is not None and time.perf_counter() - start > max_seconds:
+                stop_reason = "max_seconds"
+                break
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    centers = population[np.argmin(fitness)]
+    assignment = np.argmin(((points[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2), axis=1)
+    return EvolutionResult(centers, float(fitness.min()), assignment, generation,
+                           np.array(history), stop_reason)
+
+
+def benchmark_generations(sizes=(25, 1000, 10000, 100000), m=3, generations=20, population_size=100):
+    print("{:>8} {:>12}".format("points", "gen/s"))
+    rng = np.random.default_rng(0)
+    for n in sizes:
+        points = rng.uniform(0, 50, size=(n, 2))
+        start = time.perf_counter()
+        res = evolve(points, m, population_size=population_size, max_generations=generations,
+                     stall_generations=generations + 1)
+        print("{:>8} {:>12.1f}".format(n, res.generations / (time.perf_counter() - start)))
+
+
+## REGRESSION CHECK
+#------------------
+
+# the Excel evolutionary solver's total distance on the spreadsheet case
+EXCEL_TOTAL_DISTANCE = 259.54
+
+
+def regression_check(points=None, tol=0.06):
+    """Fail unless evolve() matches the Excel solver and a seed is reproducible.
+
+    Runs in a few seconds, without the benchmark:
+        python EvolutionaryLocation.py --check
+    """
+    if points is None:
+        points = np.column_stack([xCoord, yCoord]).astype(float)
+
+    # the spreadsheet case: 25 demand units, 3 DCs, coordinates within [0, 50]
+    res = evolve(points, 3, bounds=([0, 0], [50, 50]), max_generations=2000, stall_generations=200)
+    if res.total_distance > EXCEL_TOTAL_DISTANCE + tol:
+        raise AssertionError("total distance %.4f, Excel solver %.2f"
+                             % (res.total_distance, EXCEL_TOTAL_DISTANCE))
+
+    # same seed, same run, with or without a process pool
+    a = evolve(points, 3, max_generations=30, seed=7)
+    b = evolve(points, 3, max_generations=30, seed=7, workers=2)
+    if not np.array_equal(a.centers, b.centers):
+        raise AssertionError("seed 7 gives different centers with workers=2")
+    return res
+
+
+if __name__ == "__main__":
+
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--check", action="store_true",
+                        help="only run the regression check (no benchmark)")
+    args = parser.parse_args()
+
+    if args.check:
+        regression_check()
+        print("regression check passed")
+        raise SystemExit(0)
+
+    try:
+        points = read_demand_points()
+    except (OSError, ImportError):
+        points = np.column_stack([xCoord, yCoord]).astype(float)
+
+    res = regression_check(points)
+    print(res.centers)
+    print("Assigned DC: ", (res.assignment + 1).tolist())
+    print("Total Distance: ", res.total_distance, "after", res.generations, "generations,", res.stop_reason)
+
+    benchmark_generations()
@@ -0,0 +1,282 @@
+### BENCHMARK SUITE FOR THE MODEL FAMILIES
+#----------------------------------------
+
+# The scripts of the repo solve fixed toy instances (5 customers and 3
+# factories, a 6-node shortest path, a 5-node max flow, 6 truck items, 25
+# demand points). Here every family gets a seeded generator with one size
+# knob, and every formulation of the family a (build, solve) pair:
+#
+#   family         size                      methods
+#   plant          customers (fac = n / 10)  pulp + CBC, matrix + HiGHS
+#   transport      origins = destinations    LP + HiGHS, transportation simplex
+#   shortest_path  nodes (10 arcs per node)  LP + HiGHS, Dijkstra
+#   max_flow       nodes (10 arcs per node)  LP + HiGHS, Dinic
+#   staffing       periods (9 shifts)        MIP + HiGHS, round-off
+#   knapsack       items                     MIP + HiGHS, DP
+#   dc_location    demand points (m = 10)    alternating Weber heuristic
+#   monte_carlo    scenarios                 ModelTemplate + HiGHS
+#
+# run_suite() sweeps the sizes and writes one row per (family, method, size)
+# with build seconds, solve seconds, peak memory and objective to a CSV
+# file. compare() lines up two such files and flags the rows that got slower
+# or bigger beyond a tolerance, or whose objective changed.
+#
+#     python Benchmarks.py run results.csv --families plant knapsack
+#     python Benchmarks.py compare baseline.csv results.csv
+#
+# The peak memory is the tracemalloc peak of a second, separate build and
+# solve, so the timings are not slowed down by the allocation tracing. It
+# counts what Python and NumPy allocate, not the solver's own C heap.
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import pulp as plp
+import scipy.sparse as sp
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "..", "Distribution Center Optimization"))
+
+from SparseModel import make_model, solve_arrays, MAXIMIZE
+from MatrixPlantModel import random_plant_instance, build_plant_model, build_plant_model_pulp
+from MinCostFlowModel import transportation_model, shortest_path_model, max_flow_model
+from NetworkAlgorithms import random_network, build_network, shortest_path, max_flow
+from TransportationSimplex import random_transport_instance, transportation_simplex
+from CyclicSchedule import Pattern, schedule_model, solve_cyclic_schedule
+from TruckLoading import knapsack
+from MonteCarloSimulation import monte_carlo, COLUMNS
+from FacilityLocation import locate_centers
+
+
+# build() -> model (None when the method has no separate build step),
+# solve(model) -> objective
+Case = namedtuple("Case", ["build", "solve"])
+
+RESULT_COLUMNS = ["family", "method", "size", "seed", "build_s", "solve_s", "peak_mib",
+                  "objective", "error"]
+
+KEYS = ["family", "method", "size", "seed"]
+
+
+def _objective(sol):
+    return np.nan if sol.objective is None else sol.objective
+
+
+def _cbc_objective(model):
+    model.solve(plp.PULP_CBC_CMD(msg=0))
+    return plp.value(model.objective)
+
+
+## 1. GENERATORS
+#---------------
+
+def plant_cases(size, seed):
+    data = random_plant_instance(size, max(3, size // 10), seed=seed)
+    return {"pulp+cbc": Case(lambda: build_plant_model_pulp(*data), _cbc_objective),
+            "matrix+highs": Case(lambda: build_plant_model(*data),
+                                 lambda m: _objective(solve_arrays(m)))}
+
+
+def transport_cases(size, seed):
+    cost, supply, demand = random_transport_instance(size, size, seed=seed)
+    return {"lp+highs": Case(lambda: transportation_model(cost, supply, demand)[0],
+                             lambda m: _objective(solve_arrays(m))),
+            "simplex": Case(lambda: None,
+                            lambda m: transportation_simplex(cost, supply, demand).objective)}
+
+
+def network_instance(size, seed):
+    # random arcs plus a costly, high-capacity chain 0 -> 1 -> ... -> n-1, so
+    # that the sink is always reachable
+    tail, head, cost, capacity = random_network(size, 10 * size, seed=seed)
+    chain = np.arange(size - 1)
+    return (np.concatenate([tail, chain]), np.concatenate([head, chain + 1]),
+            np.concatenate([cost, np.full(size - 1, 1000.0)]),
+            np.concatenate([capacity, np.full(size - 1, 1)]))
+
+
+def shortest_path_cases(size, seed):
+    tail, head, cost, _ = network_instance(size, seed)
+    return {"lp+highs": Case(lambda: shortest_path_model(tail, head, cost, 0, size - 1)[0],
+                             lambda m: _objective(solve_arrays(m))),
+            "dijkstra": Case(lambda: build_network(tail, head, cost),
+                             lambda net: shortest_path(net, 0, size - 1).objective)}
+
+
+def max_flow_cases(size, seed):
+    tail, head, _, capacity = network_instance(size, seed)
+    return {"lp+highs": Case(lambda: max_flow_model(tail, head, capacity, 0, size - 1)[0],
+                             lambda m: -_objective(solve_arrays(m))),
+            "dinic": Case(lambda: build_network(tail, head, capacity=capacity),
+                          lambda net: max_flow(net, 0, size - 1).objective)}
+
+
+def staffing_instance(size, seed):
+    # demand per period with a daily wave; one shift of every length 4..12
+    # per cycle of `size` periods
+    rng = np.random.default_rng(seed)
+    t = np.arange(size)
+    demand = np.round(20 + 15 * np.sin(2 * np.pi * t / 24) ** 2 + rng.uniform(0, 10, size))
+    return demand, [Pattern(on, size - on) for on in range(4, 13)]
+
+
+def staffing_cases(size, seed):
+    demand, patterns = staffing_instance(size, seed)
+    return {"mip+highs": Case(lambda: schedule_model(demand, patterns),
+                              lambda m: _objective(solve_arrays(m))),
+            "round-off": Case(lambda: None,
+                              lambda m: solve_cyclic_schedule(demand, patterns).objective)}
+
+
+def knapsack_instance(size, seed):
+    rng = np.random.default_rng(seed)
+    weight = rng.integers(1000, 13000, size)
+    profit = np.round(weight * rng.uniform(5, 8, size)).astype(float)
+    return weight, profit, int(weight.sum() // 4)
+
+
+def knapsack_cases(size, seed):
+    weight, profit, capacity = knapsack_instance(size, seed)
+    build_mip = lambda: make_model(profit, sp.csr_matrix(weight[None, :].astype(float)), [0.0],
+                                   [capacity], col_upper=np.ones(size),
+                                   integrality=np.ones(size, dtype=np.int8), sense=MAXIMIZE)
+    return {"mip+highs": Case(build_mip, lambda m: _objective(solve_arrays(m))),
+            "dp": Case(lambda: None, lambda m: knapsack(weight, profit, capacity).profit)}
+
+
+def dc_location_cases(size, seed):
+    rng = np.random.default_rng(seed)
+    points = rng.uniform(0, 50, (size, 2))
+    return {"weber": Case(lambda: None,
+                          lambda m: locate_centers(points, 10, restarts=3, seed=seed).total_distance)}
+
+
+def monte_carlo_cases(size, seed):
+    obj = COLUMNS.index("OBJ")
+    return {"template+highs": Case(lambda: None,
+                                   lambda m: float(monte_carlo(size, seed=seed)[obj].mean()))}
+
+
+FAMILIES = {"plant": plant_cases,
+            "transport": transport_cases,
+            "shortest_path": shortest_path_cases,
+            "max_flow": max_flow_cases,
+            "staffing": staffing_cases,
+            "knapsack": knapsack_cases,
+            "dc_location": dc_location_cases,
+            "monte_carlo": monte_carlo_cases}
+
+SIZES = {"plant": (20, 50, 100, 200),
+         "transport": (50, 100, 300),
+         "shortest_path": (10**3, 10**4, 10**5),
+         "max_flow": (10**3, 10**4, 10**5),
+         "staffing": (24, 72, 168),
+         "knapsack": (20, 100, 500),
+         "dc_location": (10**3, 10**4, 10**5),
+         "monte_carlo": (64, 256, 1024)}
+
+
+## 2. RUN AND COMPARE
+#--------------------
+
+def run_case(case):
+    """(build_s, solve_s, peak_mib, objective) of one case."""
+    start = time.perf_counter()
+    model = case.build()
+    build_s = time.perf_counter() - start
+    start = time.perf_counter()
+    objective = case.solve(model)
+    solve_s = time.perf_counter() - start
+
+    del model
+    tracemalloc.start()
+    try:
+        case.solve(case.build())
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return build_s, solve_s, peak / 2**20, objective
+
+
+def run_suite(path=None, families=None, sizes=None, seed=0, verbose=True):
+    """Run the size sweeps; returns the results (and writes them to path as CSV)."""
+    rows = []
+    for family in families or FAMILIES:
+        for size in (sizes or {}).get(family, SIZES[family]):
+            for method, case in FAMILIES[family](size, seed).items():
+                try:
+                    build_s, solve_s, peak, objective = run_case(case)
+                    row = [family, method, size, seed, build_s, solve_s, peak, objective, ""]
+                except Exception as e:   # a failing case is a result, not the end of the sweep
+                    row = [family, method, size, seed, np.nan, np.nan, np.nan, np.nan, repr(e)]
+                rows.append(row)
+                if verbose:
+                    print("{:<14} {:<13} {:>7} {:>9.3f} {:>9.3f} {:>9.1f} {:>16.6g} {}".format(*row[:3], *row[4:]))
+    results = pd.DataFrame(rows, columns=RESULT_COLUMNS)
+    if path is not None:
+        results.to_csv(path, index=False)
+    return results
+
+
+def compare(baseline, current, time_tol=0.25, min_seconds=0.05, obj_tol=1e-6, mem_tol=0.25,
+            min_mib=1.0):
+    """Rows of current against baseline (DataFrames or CSV paths).
+
+    A row is flagged when build + solve time grew by more than time_tol
+    (and by more than min_seconds, to ignore timer noise on tiny cases),
+    when the peak memory grew by more than mem_tol (and by more than
+    min_mib), or when the objective moved by more than obj_tol relative.
+    """
+    if not isinstance(baseline, pd.DataFrame):
+        baseline = pd.read_csv(baseline)
+    if not isinstance(current, pd.DataFrame):
+        current = pd.read_csv(current)
+    df = baseline.merge(current, on=KEYS, how="outer", suffixes=("_base", "_new"))
+    t_base = df["build_s_base"] + df["solve_s_base"]
+    t_new = df["build_s_new"] + df["solve_s_new"]
+    df["time_ratio"] = t_new / t_base
+    df["slower"] = (t_new > t_base * (1 + time_tol)) & (t_new - t_base > min_seconds)
+    m_base, m_new = df["peak_mib_base"], df["peak_mib_new"]
+    df["mem_ratio"] = m_new / m_base
+    df["bigger"] = (m_new > m_base * (1 + mem_tol)) & (m_new - m_base > min_mib)
+    scale = np.maximum(1.0, df["objective_base"].abs())
+    df["objective_changed"] = ~np.isclose(df["objective_new"], df["objective_base"],
+                                          rtol=0, atol=obj_tol * scale, equal_nan=True)
+    df["missing"] = t_base.isna() != t_new.isna()
+    df["regression"] = df["slower"] | df["bigger"] | df["objective_changed"] | df["missing"]
+    return df[KEYS + ["time_ratio", "mem_ratio", "objective_base", "objective_new", "slower",
+                      "bigger", "objective_changed", "missing", "regression"]]
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Size sweeps of the model families.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run")
+    run.add_argument("out")
+    run.add_argument("--families", nargs="+", choices=list(FAMILIES))
+    run.add_argument("--seed", type=int, default=0)
+    cmp_ = sub.add_parser("compare")
+    cmp_.add_argument("baseline")
+    cmp_.add_argument("current")
+    cmp_.add_argument("--time-tol", type=float, default=0.25)
+    cmp_.add_argument("--mem-tol", type=float, default=0.25)
+    args = parser.parse_args()
+
+    pd.set_option("display.width", 200, "display.max_columns", None, "display.max_rows", None)
+    if args.command == "run":
+        print("{:<14} {:<13} {:>7} {:>9} {:>9} {:>9} {:>16}".format(
+            "family", "method", "size", "build s", "solve s", "peak MiB", "objective"))
+        run_suite(args.out, args.families, seed=args.seed)
+    else:
+        report = compare(args.baseline, args.current, time_tol=args.time_tol, mem_tol=args.mem_tol)
+        print(report.round(3).to_string(index=False))
+        flagged = int(report["regression"].sum())
+        print("{} regression(s)".format(flagged))
+        sys.exit(1 if flagged else 0)
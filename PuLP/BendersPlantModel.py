@@ -0,0 +1,277 @@
+### BENDERS DECOMPOSITION FOR CAPACITATED PLANT LOCATION
+#--------------------------------------------------------
+
+# The capacitated plant location models (CapacitatedPlantModel.py and the
+# fix_cost/var_cost/cap formulation of OptimizationBasics.py and
+# SolvingAndAnalyzingModelsPuLP.py) are one monolithic MIP. Here the model
+# is split in two:
+#
+#  > master problem: the binary open/size decisions y[i,s] plus one
+#    estimate theta[k] of the transportation cost of every demand scenario
+#  > subproblems:    for fixed y, one transportation LP per scenario,
+#    solved in parallel; their duals become optimality cuts on theta[k]
+#
+# Each iteration reports the lower bound (master), the upper bound (best
+# plan found so far) and the gap. A single deterministic demand vector is
+# simply one scenario.
+#
+# The split pays off when there are many scenarios: the monolithic model
+# copies the transportation block once per scenario, the master only adds
+# one theta each. With a few scenarios and many customers the monolithic
+# MIP is usually faster (20 sites x 200 customers x 4 scenarios: optimal in
+# about 50 s, while Benders is still about 3% from its bound after 60 s).
+
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.optimize import linprog
+
+import SparseModel as sm
+from SparseModel import make_model, solve_arrays, MINIMIZE
+
+
+BendersResult = namedtuple("BendersResult", ["open", "objective", "lower_bound", "gap",
+                                             "iterations", "history"])
+
+
+## 1. TRANSPORTATION SUBPROBLEM
+#------------------------------
+
+def transport_matrices(n_loc, n_cust):
+    # x[i,j] row-major: demand rows sum over i, capacity rows sum over j
+    x = np.arange(n_loc * n_cust)
+    A_eq = sp.csr_matrix((np.ones(x.shape[0]), (x % n_cust, x)), shape=(n_cust, x.shape[0]))
+    A_ub = sp.csr_matrix((np.ones(x.shape[0]), (x // n_cust, x)), shape=(n_loc, x.shape[0]))
+    return A_eq, A_ub
+
+
+def solve_subproblem(var_cost, demand, capacity, is_open, matrices=None, linking=True):
+    """Transportation LP for fixed plants.
+
+    With linking, shipping from site i to customer j is bounded by
+    demand[j]*is_open[i] (constraint 3 of CapacitatedPlantModel.py), which
+    makes the cuts much tighter. Returns (cost, demand duals, capacity duals,
+    bound duals).
+    """
+    n_loc, n_cust = var_cost.shape
+    A_eq, A_ub = matrices if matrices is not None else transport_matrices(n_loc, n_cust)
+    if linking:
+        upper = (is_open[:, None] * demand[None, :]).ravel()
+    else:
+        upper = np.full(n_loc * n_cust, np.inf)
+    res = linprog(var_cost.ravel(), A_ub=A_ub, b_ub=capacity, A_eq=A_eq, b_eq=demand,
+                  bounds=np.column_stack([np.zeros_like(upper), upper]), method="highs")
+    if res.status != 0:
+        raise ValueError("transportation subproblem failed: " + res.message)
+    return (res.fun, res.eqlin.marginals, res.ineqlin.marginals,
+            res.upper.marginals.reshape(n_loc, n_cust))
+
+
+def _solve_scenarios(args):
+    var_cost, demands, capacity, is_open = args
+    matrices = transport_matrices(*var_cost.shape)
+    results = []
+    for d in demands:
+        try:
+            results.append(solve_subproblem(var_cost, d, capacity, is_open, matrices))
+        except ValueError:
+            # a fractional plan (relaxed master) can open less than one site in
+            # total, so demand[j]*is_open[i] cannot carry the demand; without
+            # the linking bounds the cut is weaker but still valid, and for
+            # integer plans the bounds are implied by the capacity rows anyway
+            results.append(solve_subproblem(var_cost, d, capacity, is_open, matrices,
+                                            linking=False))
+    return results
+
+
+## 2. BENDERS LOOP
+#-----------------
+
+def benders(fix_cost, cap, var_cost, demand, probability=None, max_iter=100,
+            gap_tol=1e-4, time_limit=None, workers=1, verbose=True):
+    """Multi-cut Benders decomposition of the capacitated plant location model.
+
+    fix_cost, cap: (locations x sizes); var_cost: (locations x customers);
+    demand: (customers,) or (scenarios x customers) with optional probabilities.
+    """
+    fix_cost = np.asarray(fix_cost, dtype=float)
+    cap = np.asarray(cap, dtype=float)
+    var_cost = np.asarray(var_cost, dtype=float)
+    demand = np.atleast_2d(np.asarray(demand, dtype=float))
+    n_loc, n_size = fix_cost.shape
+    n_scen = demand.shape[0]
+    probability = np.full(n_scen, 1.0 / n_scen) if probability is None else np.asarray(probability, dtype=float)
+    n_y = n_loc * n_size
+
+    # master columns: [ y (n_loc*n_size, row-major) | theta (n_scen) ]
+    c = np.concatenate([fix_cost.ravel(), probability])
+    integrality = np.concatenate([np.ones(n_y, dtype=np.int8), np.zeros(n_scen, dtype=np.int8)])
+    col_upper = np.concatenate([np.ones(n_y), np.full(n_scen, np.inf)])
+
+    # every plan must cover the largest scenario, so each subproblem is feasible
+    rows = [np.concatenate([cap.ravel(), np.zeros(n_scen)])]
+    lower = [demand.sum(axis=1).max()]
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    chunks = np.array_split(np.arange(n_scen), max(1, min(workers, n_scen)))
+
+    def evaluate(y):
+        # solve the subproblems of a plan (in parallel over scenario chunks)
+        capacity = (cap * y).sum(axis=1)
+        jobs = [(var_cost, demand[idx], capacity, y.sum(axis=1)) for idx in chunks]
+        if pool is None:
+            return [r for job in jobs for r in _solve_scenarios(job)]
+        return [r for part in pool.map(_solve_scenarios, jobs) for r in part]
+
+    def add_cuts(results):
+        # optimality cut per scenario:
+        #   theta_k >= u.d_k + sum_i (v_i cap[i,s] + sum_j w_ij d_kj) y[i,s]
+        for k, (_, u, v, w) in enumerate(results):
+            row = np.zeros(n_y + n_scen)
+            row[:n_y] = -(v[:, None] * cap + (w @ demand[k])[:, None]).ravel()
+            row[n_y + k] = 1.0
+            rows.append(row)
+            lower.append(u @ demand[k])
+
+    def solve_master(relax):
+        # (lower bound, plan): the master is only solved to gap_tol / 2, so
+        # the bound is the MIP dual bound and not the incumbent's objective
+        master = make_model(c, sp.csr_matrix(np.array(rows)), np.array(lower),
+                            np.full(len(lower), np.inf), col_upper=col_upper,
+                            integrality=np.zeros_like(integrality) if relax else integrality,
+                            sense=MINIMIZE)
+        if sm.highspy is not None:
+            h = sm.to_highs(master)
+            h.setOptionValue("mip_rel_gap", gap_tol / 2)
+            h.run()
+            sol = sm.highs_solution(h)
+            bound = sol.objective if relax else h.getInfo().mip_dual_bound
+        else:
+            sol = solve_arrays(master, mip_rel_gap=gap_tol / 2)
+            bound = sol.objective - (0.0 if relax else gap_tol / 2 * abs(sol.objective))
+        return bound, sol.x[:n_y].reshape(n_loc, n_size)
+
+    best_obj, best_y = np.inf, None
+    lb = -np.inf
+    history = []
+    start = time.perf_counter()
+    it = 0
+    # phase 1 cuts off the LP relaxation of the master (cheap LPs), phase 2
+    # switches to the integer master once the relaxation stops improving
+    relax = True
+    try:
+        for it in range(1, max_iter + 1):
+            bound, y = solve_master(relax)
+            if relax:
+                # rounding every fractional site up gives a feasible plan early
+                results = evaluate(y)
+                add_cuts(results)
+                plan = np.ceil(y - 1e-9)
+                if plan.any():
+                    plan_results = evaluate(plan)
+                    add_cuts(plan_results)
+                    ub = (fix_cost * plan).sum() + probability @ np.array([r[0] for r in plan_results])
+                    if ub < best_obj:
+                        best_obj, best_y = ub, plan
+                lp_value = probability @ np.array([r[0] for r in results]) + (fix_cost * y).sum()
+                converged = (lp_value - bound) <= gap_tol * max(abs(lp_value), 1e-9)
+                stalled = bound - lb <= 1e-4 * max(abs(bound), 1e-9)
+                if converged or stalled:
+                    relax = False
+                lb = max(lb, bound)
+            else:
+                lb = max(lb, bound)
+                y = np.round(y)
+                results = evaluate(y)
+                add_cuts(results)
+                ub = (fix_cost * y).sum() + probability @ np.array([r[0] for r in results])
+                if ub < best_obj:
+                    best_obj, best_y = ub, y
+
+            gap = (best_obj - lb) / max(abs(best_obj), 1e-9)
+            history.append((it, lb, best_obj, gap, time.perf_counter() - start))
+            if verbose:
+                print("iter {:>3} {:>4}  lower {:>14.2f}  upper {:>14.2f}  gap {:>8.4%}  {:>7.2f}s".format(
+                    it, "LP" if relax else "MIP", *history[-1][1:]))
+            if not relax and gap <= gap_tol:
+                break
+            if time_limit is not None and time.perf_counter() - start > time_limit:
+                break
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    return BendersResult(best_y, best_obj, lb, (best_obj - lb) / max(abs(best_obj), 1e-9), it, history)
+
+
+## 3. MONOLITHIC MODEL (for comparison)
+#--------------------------------------
+
+def monolithic(fix_cost, cap, var_cost, demand, probability=None, time_limit=None):
+    fix_cost = np.asarray(fix_cost, dtype=float)
+    cap = np.asarray(cap, dtype=float)
+    var_cost = np.asarray(var_cost, dtype=float)
+    demand = np.atleast_2d(np.asarray(demand, dtype=float))
+    n_loc, n_size = fix_cost.shape
+    n_scen, n_cust = demand.shape
+    probability = np.full(n_scen, 1.0 / n_scen) if probability is None else np.asarray(probability, dtype=float)
+    n_y, n_x = n_loc * n_size, n_loc * n_cust
+
+    A_eq, A_ub = transport_matrices(n_loc, n_cust)
+    # y block: capacity rows get -cap[i,s] y[i,s]
+    Y = sp.csr_matrix((-cap.ravel(), (np.repeat(np.arange(n_loc), n_size), np.arange(n_y))), shape=(n_loc, n_y))
+    blocks = []
+    for k in range(n_scen):
+        row_eq = [None] * (n_scen + 1)
+        row_ub = [None] * (n_scen + 1)
+        row_eq[k + 1] = A_eq
+        row_ub[0], row_ub[k + 1] = Y, A_ub
+        row_eq[0] = sp.csr_matrix((n_cust, n_y))
+        blocks += [row_eq, row_ub]
+    A = sp.bmat(blocks, format="csr")
+    lower = np.concatenate([np.concatenate([demand[k], np.full(n_loc, -np.inf)]) for k in range(n_scen)])
+    upper = np.concatenate([np.concatenate([demand[k], np.zeros(n_loc)]) for k in range(n_scen)])
+    c = np.concatenate([fix_cost.ravel()] + [probability[k] * var_cost.ravel() for k in range(n_scen)])
+    integrality = np.concatenate([np.ones(n_y, dtype=np.int8), np.zeros(n_scen * n_x, dtype=np.int8)])
+    col_upper = np.concatenate([np.ones(n_y), np.full(n_scen * n_x, np.inf)])
+    model = make_model(c, A, lower, upper, col_upper=col_upper, integrality=integrality)
+    return solve_arrays(model, time_limit=time_limit)
+
+
+def random_instance(n_loc, n_cust, n_scen=1, seed=0):
+    rng = np.random.default_rng(seed)
+    loc_xy = rng.uniform(0, 100, (n_loc, 2))
+    cust_xy = rng.uniform(0, 100, (n_cust, 2))
+    var_cost = np.hypot(*(loc_xy[:, None, :] - cust_xy[None, :, :]).transpose(2, 0, 1)).round(1)
+    base = rng.uniform(50, 300, n_cust).round()
+    demand = (base * rng.uniform(0.8, 1.2, (n_scen, n_cust))).round()
+    total = demand.sum(axis=1).max()
+    cap = np.column_stack([np.full(n_loc, 2.0 * total / n_loc), np.full(n_loc, 5.0 * total / n_loc)])
+    fix_cost = np.column_stack([np.full(n_loc, 20.0), np.full(n_loc, 40.0)]) * total / n_loc
+    return fix_cost, cap, var_cost, demand
+
+
+if __name__ == "__main__":
+
+    # CapacitatedPlantModel.py with a single plant size
+    transportation_cost = np.array([[4, 5, 6, 8, 10],
+                                    [6, 4, 3, 5, 8],
+                                    [9, 7, 4, 3, 4]])
+    res = benders([[1000], [1000], [1000]], [[500], [500], [500]], transportation_cost,
+                  [80, 270, 250, 160, 180])
+    print("Open: ", res.open.ravel(), " Objective function/ Minimized cost: ", res.objective)
+
+    # a two-stage instance with many scenarios: 10 sites x 2 sizes, 100
+    # customers, 20 demand scenarios
+    data = random_instance(10, 100, n_scen=20)
+    start = time.perf_counter()
+    res = benders(*data, gap_tol=1e-3, time_limit=60, verbose=False)
+    print("benders: {:.2f} (gap {:.2%}, {} iterations) in {:.1f}s".format(
+        res.objective, res.gap, res.iterations, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    sol = monolithic(*data, time_limit=300)
+    print("monolithic: {:.2f} in {:.1f}s".format(sol.objective, time.perf_counter() - start))
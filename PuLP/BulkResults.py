@@ -0,0 +1,235 @@
+### BULK RESULT EXTRACTION
+#------------------------
+
+# The scripts read solutions one object at a time:
+#
+#     for v in model.variables(): print(v.name, v.varValue)
+#     [{'name':name, 'shadow price':c.pi, 'slack':c.slack} for name, c in model.constraints.items()]
+#
+# which is fine for 15 variables and dominates post-processing for 10^6.
+# Results keeps the whole solution as contiguous float arrays aligned with
+# stable integer indices: column j is model.variables()[j] and row i is the
+# i-th entry of model.constraints (the order of SparseModel.model_to_arrays).
+#
+#  > extract(): one pass over the PuLP objects after model.solve()
+#  > from_solution(): straight from a ModelArrays + ArraySolution, without
+#    touching a single LpVariable (values, duals and slacks never leave NumPy)
+#  > variables_frame()/constraints_frame() wrap the arrays in DataFrames
+#    without copying them, to_arrow() in a pyarrow Table (optional)
+#  > nonzero_flows()/flow_matrix() export only the nonzero entries of a
+#    variable dict such as serviceToCustomer, as a Series or a sparse matrix
+
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import pulp as plp
+import scipy.sparse as sp
+
+import SparseModel as sm
+
+# pyarrow is optional: only to_arrow() needs it
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+Results = namedtuple("Results",
+                     ["status", "objective", "col_names", "x", "reduced_cost",
+                      "row_names", "dual", "slack"])
+
+
+def _floats(values, n):
+    # None (no value reported) becomes nan
+    return np.array(values, dtype=float) if n else np.empty(0)
+
+
+def extract(model):
+    """The solution on a solved LpProblem, as a Results of arrays."""
+    variables = model.variables()
+    constraints = list(model.constraints.values())
+    n, m = len(variables), len(constraints)
+    return Results(model.status, plp.value(model.objective),
+                   [v.name for v in variables],
+                   _floats([v.varValue for v in variables], n),
+                   _floats([v.dj for v in variables], n),
+                   list(model.constraints.keys()),
+                   _floats([c.pi for c in constraints], m),
+                   _floats([c.slack for c in constraints], m))
+
+
+def from_solution(arrays, sol):
+    """Results from a ModelArrays and its ArraySolution (slack = rhs - activity, as PuLP)."""
+    n, m = arrays.c.shape[0], arrays.A.shape[0]
+    nan_n, nan_m = np.full(n, np.nan), np.full(m, np.nan)
+    if sol.x is None:
+        return Results(sol.status, sol.objective, sm.column_names(arrays), nan_n, nan_n,
+                       sm.row_names(arrays), nan_m, nan_m)
+    activity = sol.row_activity if sol.row_activity is not None else arrays.A @ sol.x
+    rhs = np.where(np.isneginf(arrays.row_lower), arrays.row_upper, arrays.row_lower)
+    return Results(sol.status, sol.objective, sm.column_names(arrays), sol.x,
+                   nan_n if sol.col_dual is None else sol.col_dual,
+                   sm.row_names(arrays),
+                   nan_m if sol.row_dual is None else sol.row_dual,
+                   rhs - activity)
+
+
+def solve_bulk(model, time_limit=None):
+    """Solve an LpProblem in process and return Results, without writing values back."""
+    arrays = sm.model_to_arrays(model)
+    if sm.highspy is not None:
+        h = sm.to_highs(arrays)
+        if time_limit is not None:
+            h.setOptionValue("time_limit", float(time_limit))
+        h.run()
+        sol = sm.highs_solution(h)
+    else:
+        sol = sm.solve_arrays(arrays, time_limit=time_limit)
+    return from_solution(arrays, sol)
+
+
+## 1. TABLE VIEWS
+#----------------
+
+def variables_frame(res):
+    return pd.DataFrame({'value': res.x, 'reduced cost': res.reduced_cost},
+                        index=pd.Index(res.col_names, name='name'), copy=False)
+
+
+def constraints_frame(res):
+    return pd.DataFrame({'shadow price': res.dual, 'slack': res.slack},
+                        index=pd.Index(res.row_names, name='name'), copy=False)
+
+
+def to_arrow(res, rows=False):
+    """pyarrow Table of the columns (or rows); the float arrays are not copied."""
+    if pa is None:
+        raise ImportError("to_arrow needs pyarrow")
+    if rows:
+        return pa.table({'name': res.row_names, 'shadow price': res.dual, 'slack': res.slack})
+    return pa.table({'name': res.col_names, 'value': res.x, 'reduced cost': res.reduced_cost})
+
+
+## 2. SPARSE EXPORT OF VARIABLE DICTS
+#------------------------------------
+
+def column_index(res, variables):
+    """(keys, column indices) of a dict of LpVariables, e.g. serviceToCustomer."""
+    position = {name: j for j, name in enumerate(res.col_names)}
+    keys = list(variables.keys())
+    # variables that appear in no constraint nor objective are not model columns
+    cols = np.array([position.get(variables[k].name, -1) for k in keys], dtype=np.int64)
+    return keys, cols
+
+
+def nonzero_flows(res, variables, tol=1e-9):
+    """Series of the entries of a variable dict with |value| > tol, keyed like the dict."""
+    keys, cols = column_index(res, variables)
+    values = np.where(cols >= 0, res.x[cols], 0.0)
+    nz = np.flatnonzero(np.abs(values) > tol)
+    picked = [keys[i] for i in nz.tolist()]
+    index = (pd.MultiIndex.from_tuples(picked) if picked and isinstance(picked[0], tuple)
+             else pd.Index(picked))
+    return pd.Series(values[nz], index=index, name='value')
+
+
+def flow_matrix(res, variables, tol=1e-9):
+    """Nonzero entries of a dict keyed by (row, column) pairs as a sparse matrix.
+
+    Returns (coo_matrix, row labels, column labels); labels are sorted.
+    """
+    flows = nonzero_flows(res, variables, tol)
+    keys = list(variables.keys())
+    row_labels = sorted({k[0] for k in keys})
+    col_labels = sorted({k[1] for k in keys})
+    rows = pd.Index(row_labels).get_indexer(flows.index.get_level_values(0))
+    cols = pd.Index(col_labels).get_indexer(flows.index.get_level_values(1))
+    A = sp.coo_matrix((flows.to_numpy(), (rows, cols)), shape=(len(row_labels), len(col_labels)))
+    return A, row_labels, col_labels
+
+
+## BENCHMARK
+#-----------
+
+def benchmark_extraction(n_cust=1000, n_fac=50):
+    from InProcessSolver import InProcessSolver
+    from MatrixPlantModel import random_plant_instance, build_plant_model_pulp
+
+    model = build_plant_model_pulp(*random_plant_instance(n_cust, n_fac))
+    # the LP relaxation, so that duals exist
+    model.solve(InProcessSolver(mip=False))
+    print("{} variables, {} constraints".format(len(model.variables()), len(model.constraints)))
+
+    start = time.perf_counter()
+    pd.DataFrame([{'name': v.name, 'value': v.varValue, 'reduced cost': v.dj}
+                  for v in model.variables()])
+    pd.DataFrame([{'name': name, 'shadow price': c.pi, 'slack': c.slack}
+                  for name, c in model.constraints.items()])
+    t_loop = time.perf_counter() - start
+
+    start = time.perf_counter()
+    res = extract(model)
+    variables_frame(res)
+    constraints_frame(res)
+    t_extract = time.perf_counter() - start
+
+    arrays = sm.model_to_arrays(model)
+    arrays = arrays._replace(integrality=np.zeros_like(arrays.integrality))
+    if sm.highspy is not None:
+        h = sm.to_highs(arrays)
+        h.run()
+        sol = sm.highs_solution(h)
+    else:
+        sol = sm.solve_arrays(arrays)
+    start = time.perf_counter()
+    res = from_solution(arrays, sol)
+    variables_frame(res)
+    constraints_frame(res)
+    t_arrays = time.perf_counter() - start
+
+    print("{:<28} {:>9}".format("post-processing", "seconds"))
+    print("{:<28} {:>9.3f}".format("dict per row + DataFrame", t_loop))
+    print("{:<28} {:>9.3f}".format("extract()", t_extract))
+    print("{:<28} {:>9.3f}".format("from_solution()", t_arrays))
+
+
+if __name__ == "__main__":
+
+    from InProcessSolver import InProcessSolver
+
+    # CapacitatedPlantModel.py
+    Customer = [1, 2, 3, 4, 5]
+    Facility = ['Factory1', 'Factory2', 'Factory3']
+    Demand = {1: 80, 2: 270, 3: 250, 4: 160, 5: 180}
+    Max_Supply = {'Factory1': 500, 'Factory2': 500, 'Factory3': 500}
+    Fixed_cost = {'Factory1': 1000, 'Factory2': 1000, 'Factory3': 1000}
+    transportation_cost = {'Factory1': {1: 4, 2: 5, 3: 6, 4: 8, 5: 10},
+                           'Factory2': {1: 6, 2: 4, 3: 3, 4: 5, 5: 8},
+                           'Factory3': {1: 9, 2: 7, 3: 4, 4: 3, 5: 4}}
+    model = plp.LpProblem("Capacitated_plant_problem", plp.LpMinimize)
+    facilityIsActive = plp.LpVariable.dicts("Facility_is_active", Facility, 0, 1, plp.LpBinary)
+    serviceToCustomer = plp.LpVariable.dicts("Service", [(i, j) for i in Customer for j in Facility], 0)
+    model += plp.lpSum(Fixed_cost[j] * facilityIsActive[j] for j in Facility) + \
+        plp.lpSum(transportation_cost[j][i] * serviceToCustomer[(i, j)] for j in Facility for i in Customer)
+    for i in Customer:
+        model += plp.lpSum(serviceToCustomer[(i, j)] for j in Facility) == Demand[i]
+    for j in Facility:
+        model += plp.lpSum(serviceToCustomer[(i, j)] for i in Customer) <= Max_Supply[j] * facilityIsActive[j]
+    for i in Customer:
+        for j in Facility:
+            model += serviceToCustomer[(i, j)] <= Demand[i] * facilityIsActive[j]
+    model.solve(InProcessSolver())
+
+    res = extract(model)
+    print(variables_frame(res).head())
+    print(nonzero_flows(res, serviceToCustomer))
+    A, customers, factories = flow_matrix(res, serviceToCustomer)
+    print(pd.DataFrame(A.toarray(), index=customers, columns=factories))
+
+    # the same arrays without going through the LpVariables
+    bulk = solve_bulk(model)
+    print("same values:", np.allclose(bulk.x, res.x), " objective", bulk.objective)
+
+    benchmark_extraction()
@@ -0,0 +1,174 @@
+### CYCLIC SHIFT SCHEDULING
+#--------------------------
+
+# The staffing problem (5 consecutive working days) and the saw maintenance
+# problem (4 hours on, 1 hour inspection) of OptimizationBasics.py, section
+# 4, are both cyclic coverage models:
+#
+#   min   sum cost[p] x[p, s]
+#   s.t.  sum of x[p, s] over the (p, s) that work in period h >= demand[h]
+#         x[p, s] >= 0 integer
+#
+# where x[p, s] is the number of people (or saws) starting pattern p in
+# period s, and a pattern works `on` periods, rests `off` periods and
+# repeats with period on + off. Here the model is generated from the demand
+# vector and the patterns: every column of the coverage matrix is a cyclic
+# shift of its pattern, built in one vectorized step.
+#
+# Two properties of the matrix are used before any branch-and-bound:
+#
+#  > coverage repeats with the lcm of the pattern periods, so the horizon
+#    folds onto that cycle with demand = the maximum over the folded periods
+#    (the saw problem folds from 10 hours onto 5)
+#  > when every pattern works in one block per cycle the matrix has circular
+#    ones, and for unit costs the integer optimum is the smallest integer
+#    k >= LP optimum for which the LP with sum(x) = k is feasible; those LPs
+#    are network flows in disguise and have integral solutions (Bartholdi,
+#    Orlin & Ratliff, 1980)
+#
+# Everything else, including the odd fractional vertex returned by the LP
+# solver, falls back to the MIP.
+
+import math
+import time
+from collections import namedtuple
+from functools import reduce
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.optimize import linprog
+
+from SparseModel import make_model, solve_arrays, MINIMIZE
+
+
+Pattern = namedtuple("Pattern", ["on", "off", "cost"], defaults=(1.0,))
+
+ScheduleResult = namedtuple("ScheduleResult", ["starts", "coverage", "objective", "method"])
+
+
+def pattern_period(pattern):
+    return pattern.on + pattern.off
+
+
+def coverage_matrix(horizon, patterns):
+    """Circulant coverage matrix (horizon x len(patterns)*horizon), columns (pattern, start)."""
+    blocks = []
+    for p in patterns:
+        period = pattern_period(p)
+        if horizon % period:
+            raise ValueError("pattern period %d does not divide the horizon %d" % (period, horizon))
+        # periods worked by the pattern that starts in period 0
+        offsets = (np.arange(horizon // period)[:, None] * period + np.arange(p.on)).ravel()
+        rows = (np.arange(horizon)[:, None] + offsets[None, :]) % horizon
+        blocks.append(sp.csc_matrix((np.ones(rows.size), rows.ravel(),
+                                     np.arange(0, rows.size + 1, offsets.size)),
+                                    shape=(horizon, horizon)))
+    return sp.hstack(blocks, format="csc")
+
+
+def schedule_model(demand, patterns):
+    """The integer coverage model as ModelArrays."""
+    demand = np.asarray(demand, dtype=float)
+    H = demand.shape[0]
+    A = coverage_matrix(H, patterns)
+    c = np.repeat([p.cost for p in patterns], H).astype(float)
+    col_names = ["x_%d_%d" % (k, s) for k in range(len(patterns)) for s in range(H)]
+    return make_model(c, A, demand, np.full(H, np.inf),
+                      integrality=np.ones(c.shape[0], dtype=np.int8),
+                      sense=MINIMIZE, col_names=col_names)
+
+
+def _round_off(A, demand, tol=1e-6):
+    # unit costs on a circular-ones matrix: LP bound, then the feasibility
+    # LPs sum(x) = k for k = ceil(bound), ceil(bound) + 1, ...
+    n = A.shape[1]
+    lp = linprog(np.ones(n), A_ub=-A, b_ub=-demand, bounds=(0, None), method="highs")
+    if lp.status != 0:
+        return None
+    k = math.ceil(lp.fun - tol)
+    ones = np.ones((1, n))
+    for k in range(k, k + A.shape[0] + 1):
+        res = linprog(np.zeros(n), A_ub=-A, b_ub=-demand, A_eq=ones, b_eq=[k],
+                      bounds=(0, None), method="highs-ds")
+        if res.status != 0:
+            continue
+        x = np.round(res.x)
+        # the vertex should be integral; if not, leave it to the MIP
+        if np.abs(res.x - x).max() > tol:
+            return None
+        return x
+    return None
+
+
+def solve_cyclic_schedule(demand, patterns, time_limit=None):
+    """Cheapest integer starts per (pattern, period) covering a cyclic demand vector."""
+    demand = np.asarray(demand, dtype=float)
+    patterns = [p if isinstance(p, Pattern) else Pattern(*p) for p in patterns]
+    H = demand.shape[0]
+
+    # 1. fold the horizon onto the cycle of the patterns
+    cycle = reduce(lambda a, b: a * b // math.gcd(a, b), [pattern_period(p) for p in patterns])
+    if H % cycle:
+        raise ValueError("pattern periods do not divide the horizon %d" % H)
+    folded = demand.reshape(H // cycle, cycle).max(axis=0)
+    A = coverage_matrix(cycle, patterns)
+    cost = np.repeat([p.cost for p in patterns], cycle).astype(float)
+
+    # 2. circular ones and unit costs: round-off, no branching
+    x = None
+    method = "mip"
+    single_block = all(pattern_period(p) == cycle for p in patterns)
+    if single_block and len(set(p.cost for p in patterns)) == 1:
+        x = _round_off(A, folded)
+        if x is not None:
+            method = "round-off"
+
+    # 3. otherwise the MIP
+    if x is None:
+        model = make_model(cost, A, folded, np.full(cycle, np.inf),
+                           integrality=np.ones(cost.shape[0], dtype=np.int8))
+        sol = solve_arrays(model, time_limit=time_limit)
+        if sol.x is None:
+            raise ValueError("no schedule found (status %d)" % sol.status)
+        x = np.round(sol.x)
+
+    # unfold: every start lies in the first cycle of the horizon
+    starts = np.zeros((len(patterns), H))
+    starts[:, :cycle] = x.reshape(len(patterns), cycle)
+    coverage = coverage_matrix(H, patterns) @ starts.ravel()
+    return ScheduleResult(starts, coverage, float(cost @ x), method)
+
+
+def benchmark_schedule(horizon=168, lengths=range(4, 13), seed=0, time_limit=60):
+    # hourly demand over a week, one shift per week of every length
+    rng = np.random.default_rng(seed)
+    hours = np.arange(horizon)
+    demand = np.round(20 + 15 * np.sin(2 * np.pi * hours / 24) ** 2 + rng.uniform(0, 10, horizon))
+    patterns = [Pattern(on, horizon - on) for on in lengths]
+
+    start = time.perf_counter()
+    res = solve_cyclic_schedule(demand, patterns)
+    t_fast = time.perf_counter() - start
+
+    start = time.perf_counter()
+    sol = solve_arrays(schedule_model(demand, patterns), time_limit=time_limit)
+    t_mip = time.perf_counter() - start
+    print("{} periods, {} patterns, {} columns".format(horizon, len(patterns), horizon * len(patterns)))
+    print("{:<10} {:>10} {:>9}".format("method", "objective", "seconds"))
+    print("{:<10} {:>10.0f} {:>9.3f}".format(res.method, res.objective, t_fast))
+    print("{:<10} {:>10.0f} {:>9.3f}".format("mip", sol.objective, t_mip))
+
+
+if __name__ == "__main__":
+
+    # staffing: 5 consecutive working days out of 7
+    res = solve_cyclic_schedule([31, 45, 40, 40, 48, 30, 25], [Pattern(5, 2)])
+    print("staffing ({}): {} workers, starts per day {}".format(
+        res.method, res.objective, res.starts[0].tolist()))
+
+    # saws: 4 hours on, 1 hour inspection, over a 10-hour shift
+    res = solve_cyclic_schedule([7, 7, 7, 6, 5, 6, 6, 7, 7, 6], [Pattern(4, 1)])
+    print("saws ({}): {} saws, starts per hour {}".format(
+        res.method, res.objective, res.starts[0].tolist()))
+
+    benchmark_schedule()
@@ -0,0 +1,269 @@
+### GRAPH ANALYTICS ON CSR ARRAYS
+#--------------------------------
+
+# "Network Analysis in R/Network and Graph Analysis in R.R" measures toy
+# networks with igraph: degree(), betweenness(), edge_density() and
+# components(). Here the same measures run on CSR adjacency arrays, so they
+# scale to networks with millions of edges and live in the same process as
+# the optimizers:
+#
+#  > degree: row lengths of the CSR structure (loops count twice, parallel
+#    edges count separately, as in igraph)
+#  > components: union-find over the edge list, vectorized as rounds of
+#    hooking roots onto smaller roots followed by pointer jumping
+#  > betweenness: Brandes' algorithm, level-synchronous (one NumPy step per
+#    BFS level), parallel over source vertices with a process pool; the
+#    approximate mode samples k sources and scales by n / k
+#
+# Vertices are 0..n-1. Shortest paths are counted in hops (the graphs of the
+# R script carry no weights).
+
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+# indptr/indices: CSR adjacency, indices[indptr[u]:indptr[u+1]] are the
+# neighbours of u (out-neighbours when directed, both ends otherwise);
+# edge[i] is the position in the edge list of the CSR entry i
+Graph = namedtuple("Graph", ["n", "tail", "head", "directed", "indptr", "indices", "edge"])
+
+Components = namedtuple("Components", ["membership", "no", "csize"])
+
+
+def _csr(n, tail, head):
+    order = np.argsort(tail, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(tail, minlength=n), out=indptr[1:])
+    return indptr, head[order], order
+
+
+def build_graph(tail, head, n=None, directed=False):
+    """Graph on vertices 0..n-1 from an edge list."""
+    tail = np.asarray(tail, dtype=np.int64)
+    head = np.asarray(head, dtype=np.int64)
+    if n is None:
+        n = int(max(tail.max(initial=-1), head.max(initial=-1))) + 1
+    if directed:
+        indptr, indices, edge = _csr(n, tail, head)
+    else:
+        indptr, indices, edge = _csr(n, np.concatenate([tail, head]), np.concatenate([head, tail]))
+        edge %= tail.shape[0] or 1
+    return Graph(n, tail, head, directed, indptr, indices, edge)
+
+
+def _expand(g, rows):
+    # (row, neighbour) pairs of all CSR slices of rows, without a Python loop
+    start = g.indptr[rows]
+    length = g.indptr[rows + 1] - start
+    total = int(length.sum())
+    offset = np.arange(total) - np.repeat(np.cumsum(length) - length, length)
+    return np.repeat(rows, length), g.indices[np.repeat(start, length) + offset]
+
+
+## 1. GENERATORS
+#---------------
+
+def sample_pa(n, seed=0):
+    """Preferential attachment tree (igraph's sample_pa with power = 1, m = 1).
+
+    Vertex t attaches to an older vertex with probability proportional to its
+    in-degree + 1 (zero appeal 1).
+    """
+    rng = np.random.default_rng(seed)
+    head = np.zeros(max(n - 1, 0), dtype=np.int64)
+    # every vertex appears once for its appeal and once per edge it received,
+    # so a uniform draw from the list is a draw proportional to in-degree + 1
+    urn = np.empty(2 * n, dtype=np.int64)
+    urn[0] = 0
+    size = 1
+    draws = rng.random(max(n - 1, 0))
+    for t in range(1, n):
+        target = urn[int(draws[t - 1] * size)]
+        head[t - 1] = target
+        urn[size] = target
+        urn[size + 1] = t
+        size += 2
+    return build_graph(np.arange(1, n), head, n=n)
+
+
+def sample_gnp(n, p, seed=0, directed=False):
+    """Erdos-Renyi G(n, p) graph without loops (igraph's sample_gnp)."""
+    rng = np.random.default_rng(seed)
+    pairs = n * (n - 1) if directed else n * (n - 1) // 2
+    m = rng.binomial(pairs, p)
+    k = np.sort(rng.choice(pairs, size=m, replace=False))
+    if directed:
+        tail = k // (n - 1)
+        head = k % (n - 1)
+        head += head >= tail
+    else:
+        # k enumerates the upper triangle row by row
+        tail = (n - 2 - np.floor(np.sqrt(4.0 * n * (n - 1) - 8.0 * k - 7) / 2 - 0.5)).astype(np.int64)
+        head = k + tail + 1 - n * (n - 1) // 2 + (n - tail) * (n - tail - 1) // 2
+    return build_graph(tail, head, n=n, directed=directed)
+
+
+## 2. DEGREE, DENSITY AND COMPONENTS
+#-----------------------------------
+
+def degree(g, mode="all"):
+    """Vertex degrees; mode is "out", "in" or "all" (ignored when undirected)."""
+    if not g.directed:
+        return np.diff(g.indptr)
+    out = np.bincount(g.tail, minlength=g.n)
+    inn = np.bincount(g.head, minlength=g.n)
+    return {"out": out, "in": inn, "all": out + inn}[mode]
+
+
+def edge_density(g, loops=False):
+    """Edges over possible edges (igraph's edge_density)."""
+    m = g.tail.shape[0]
+    if loops:
+        pairs = g.n * g.n if g.directed else g.n * (g.n + 1) / 2
+    else:
+        pairs = g.n * (g.n - 1) if g.directed else g.n * (g.n - 1) / 2
+    return m / pairs
+
+
+def components(g):
+    """Weakly connected components.
+
+    membership is numbered 0, 1, ... in the order of the smallest vertex of
+    each component, which is igraph's numbering (minus one).
+    """
+    parent = np.arange(g.n)
+    tail, head = g.tail, g.head
+    while tail.shape[0]:
+        ru, rv = parent[tail], parent[head]
+        cross = ru != rv
+        if not cross.any():
+            break
+        ru, rv = ru[cross], rv[cross]
+        tail, head = tail[cross], head[cross]
+        # hook the larger root of every crossing edge onto the smaller one
+        np.minimum.at(parent, np.maximum(ru, rv), np.minimum(ru, rv))
+        # pointer jumping until every vertex points at its root
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
+    roots, membership = np.unique(parent, return_inverse=True)
+    return Components(membership, roots.shape[0], np.bincount(membership))
+
+
+## 3. BETWEENNESS
+#----------------
+
+def _dependencies(g, sources):
+    # Brandes: one BFS per source counting shortest paths (sigma), then the
+    # dependencies accumulated back over the BFS levels
+    bc = np.zeros(g.n)
+    slot = np.zeros(g.n, dtype=np.int64)
+    for s in sources:
+        dist = np.full(g.n, -1, dtype=np.int64)
+        sigma = np.zeros(g.n)
+        dist[s] = 0
+        sigma[s] = 1.0
+        frontier = np.array([s])
+        levels = []
+        d = 0
+        while frontier.shape[0]:
+            u, v = _expand(g, frontier)
+            new = v[dist[v] < 0]
+            dist[new] = d + 1
+            dag = dist[v] == d + 1
+            u, v = u[dag], v[dag]
+            np.add.at(sigma, v, sigma[u])
+            levels.append((u, v))
+            # deduplicate the new vertices without sorting: each keeps the
+            # position it was written to last
+            slot[new] = np.arange(new.shape[0])
+            frontier = new[slot[new] == np.arange(new.shape[0])]
+            d += 1
+        delta = np.zeros(g.n)
+        for u, v in reversed(levels):
+            np.add.at(delta, u, sigma[u] / sigma[v] * (1.0 + delta[v]))
+        delta[s] = 0.0
+        bc += delta
+    return bc
+
+
+def _dependencies_job(job):
+    return _dependencies(*job)
+
+
+def betweenness(g, k=None, seed=0, workers=1, normalized=False):
+    """Vertex betweenness (igraph's betweenness on unweighted graphs).
+
+    k=None sums over all sources; k=int samples k sources at random and
+    scales the sum by n / k. workers > 1 splits the sources over a process
+    pool.
+    """
+    if k is None or k >= g.n:
+        sources = np.arange(g.n)
+        scale = 1.0
+    else:
+        sources = np.sort(np.random.default_rng(seed).choice(g.n, size=k, replace=False))
+        scale = g.n / k
+
+    chunks = np.array_split(sources, max(1, min(workers, sources.shape[0])))
+    if workers == 1:
+        bc = _dependencies(g, sources)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            bc = sum(pool.map(_dependencies_job, [(g, idx) for idx in chunks]))
+
+    # undirected: every path was counted from both of its ends
+    bc *= scale if g.directed else scale / 2
+    if normalized:
+        pairs = (g.n - 1) * (g.n - 2)
+        bc *= (1.0 if g.directed else 2.0) / pairs if pairs else 0.0
+    return bc
+
+
+## BENCHMARK
+#-----------
+
+def benchmark_graph(sizes=(10**4, 10**5, 10**6), degree_avg=4, k=64, workers=(1, 4)):
+    print("{:>8} {:>9} {:>8} {:>9} {:>13}".format("nodes", "edges", "build s", "comp s",
+                                                  "betw(k) s/w"))
+    for n in sizes:
+        start = time.perf_counter()
+        g = sample_gnp(n, degree_avg / n, seed=1)
+        t_build = time.perf_counter() - start
+        start = time.perf_counter()
+        components(g)
+        t_comp = time.perf_counter() - start
+        times = []
+        for w in workers:
+            start = time.perf_counter()
+            betweenness(g, k=k, workers=w)
+            times.append("{:.2f}".format(time.perf_counter() - start))
+        print("{:>8} {:>9} {:>8.3f} {:>9.3f} {:>13}".format(n, g.tail.shape[0], t_build, t_comp,
+                                                          "/".join(times)))
+
+
+if __name__ == "__main__":
+
+    # 1. connectedness: the oldest vertices of a preferential attachment tree
+    g1 = sample_pa(10, seed=1)
+    print("degree:", degree(g1).tolist())
+
+    # 2. betweenness: the bridges of the tree
+    g2 = sample_pa(10, seed=2)
+    print("betweenness:", betweenness(g2).tolist())
+
+    # 3. density: a tree has n - 1 edges, so its density is 2 / n
+    for n, seed in ((10, 3), (20, 4)):
+        print("edge density n={}: {} (2/n = {})".format(n, edge_density(sample_pa(n, seed=seed)), 2 / n))
+
+    # 5. components of a sparse random graph
+    comp = components(sample_gnp(30, 0.04, seed=7))
+    print("membership:", comp.membership.tolist())
+    print("no:", comp.no, "csize:", comp.csize.tolist())
+
+    benchmark_graph()
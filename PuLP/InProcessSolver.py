@@ -0,0 +1,212 @@
+### IN-PROCESS SOLVING
+#---------------------
+
+# model.solve() uses the CBC command line driver by default: the model is
+# written to an .mps file in a temp directory, a CBC process is started and
+# its solution file is parsed back. For small models solved thousands of
+# times that is most of the wall time.
+#
+# InProcessSolver is a drop-in PuLP solver that extracts the model into
+# arrays and passes them to the HiGHS library through memory buffers
+# (highspy, or scipy's bundled HiGHS when highspy is not installed):
+#
+#     model.solve(InProcessSolver())
+#
+# Values, reduced costs, shadow prices and slacks are written back onto the
+# LpVariables and constraints just like the CBC driver does.
+#
+# The gain is on LPs. On small MIPs the HiGHS branch-and-bound setup costs
+# more than the CBC process start, and in-process solving is slower (see the
+# class docstring), so benchmark_solvers() is worth running before switching
+# a MIP workload over.
+
+import time
+
+import numpy as np
+import pulp as plp
+
+import SparseModel as sm
+
+
+class InProcessSolver(plp.LpSolver):
+    """PuLP solver that hands the model to HiGHS in memory instead of through files.
+
+    It wins on LPs, about 1 ms against 4 ms for CBC on the repo's small LPs
+    (profit, lrv_5.4 in benchmark_solvers()). It loses on small MIPs: about
+    8-14 ms against 5-8 ms for CBC on glass, staffing, truck and
+    capacitated_plant, because the HiGHS MIP setup outweighs the saved
+    process start. Use PULP_CBC_CMD for workloads of many small MIPs.
+    """
+
+    name = "InProcessSolver"
+
+    # called with "written" once the arrays are extracted and with "read"
+    # before the solution goes back onto lp (Profiling.ProfiledSolver sets it)
+    phase_hook = None
+
+    def __init__(self, mip=True, msg=False, timeLimit=None, gapRel=None, **kwargs):
+        plp.LpSolver.__init__(self, mip=mip, msg=msg, timeLimit=timeLimit, **kwargs)
+        self.gapRel = gapRel
+
+    def available(self):
+        return True
+
+    def actualSolve(self, lp):
+        arrays = sm.model_to_arrays(lp)
+        if not self.mip:
+            arrays = arrays._replace(integrality=np.zeros_like(arrays.integrality))
+        if self.phase_hook is not None:
+            self.phase_hook("written")
+
+        if sm.highspy is not None:
+            h = sm.to_highs(arrays)
+            h.setOptionValue("output_flag", bool(self.msg))
+            if self.timeLimit is not None:
+                h.setOptionValue("time_limit", float(self.timeLimit))
+            if self.gapRel is not None:
+                h.setOptionValue("mip_rel_gap", float(self.gapRel))
+            h.run()
+            sol = sm.highs_solution(h)
+        else:
+            sol = sm.solve_arrays(arrays, time_limit=self.timeLimit, mip_rel_gap=self.gapRel)
+
+        if self.phase_hook is not None:
+            self.phase_hook("read")
+        assign_solution(lp, arrays, sol)
+        return sol.status
+
+
+def assign_solution(lp, arrays, sol):
+    """Write an ArraySolution back onto the variables and constraints of lp."""
+    is_mip = bool(arrays.integrality.any())
+    if sol.x is None:
+        sol_status = {-1: plp.LpSolutionInfeasible,
+                      -2: plp.LpSolutionUnbounded}.get(sol.status, plp.LpSolutionNoSolutionFound)
+    elif sol.status == plp.LpStatusOptimal:
+        sol_status = plp.LpSolutionOptimal
+    else:
+        sol_status = plp.LpSolutionIntegerFeasible if is_mip else plp.LpSolutionNoSolutionFound
+    lp.assignStatus(sol.status, sol_status)
+
+    if sol.x is not None:
+        lp.assignVarsVals(dict(zip(arrays.col_names, sol.x.tolist())))
+        row_activity = sol.row_activity
+        if row_activity is None:
+            row_activity = arrays.A @ sol.x
+        lp.assignConsSlack(dict(zip(arrays.row_names, row_activity.tolist())), activity=True)
+    if sol.row_dual is not None and not is_mip:
+        lp.assignVarsDj(dict(zip(arrays.col_names, sol.col_dual.tolist())))
+        lp.assignConsPi(dict(zip(arrays.row_names, sol.row_dual.tolist())))
+
+
+## BENCHMARK: CBC driver vs in-process on the example models
+#------------------------------------------------------------
+
+def glass_model():
+    # OptimizationBasics.py, section 1
+    model = plp.LpProblem("Maximize Glass Co. Profits", plp.LpMaximize)
+    wine = plp.LpVariable('Wine', lowBound=0, upBound=None, cat='Integer')
+    beer = plp.LpVariable('Beer', lowBound=0, upBound=None, cat='Integer')
+    model += 5 * wine + 4.5 * beer
+    model += 6 * wine + 5 * beer <= 60
+    model += 10 * wine + 20 * beer <= 150
+    model += wine <= 60
+    return model
+
+
+def staffing_model():
+    # OptimizationBasics.py, section 4
+    model = plp.LpProblem("Minimize Staffing", plp.LpMinimize)
+    days = list(range(7))
+    need = [31, 45, 40, 40, 48, 30, 25]
+    x = plp.LpVariable.dicts('staff_', days, lowBound=0, cat='Integer')
+    model += plp.lpSum([x[i] for i in days])
+    for d in days:
+        model += plp.lpSum(x[(d - k) % 7] for k in range(5)) >= need[d]
+    return model
+
+
+def truck_model():
+    # OptimizationBasics.py, section 6
+    products = ['A', 'B', 'C', 'D', 'E', 'F']
+    weight = {'A':12800, 'B':10900, 'C':11400, 'D':2100, 'E':11300, 'F':2300}
+    profitability = {'A':77878, 'B':82713, 'C':82728, 'D':68423, 'E':84119, 'F':77765}
+    model = plp.LpProblem("Loading Truck Problem", plp.LpMaximize)
+    x = plp.LpVariable.dicts('Ship_', products, cat='Binary')
+    model += plp.lpSum(profitability[i]*x[i] for i in products)
+    model += plp.lpSum(weight[i]*x[i] for i in products) <= 20000
+    model += x['E'] + x['D'] <= 1
+    model += x['D'] <= x['B']
+    return model
+
+
+def profit_model():
+    # SensitivityAndSimulationPuLP.py, section 1
+    model = plp.LpProblem("Maximize profits", plp.LpMaximize)
+    A = plp.LpVariable('A', lowBound=0)
+    B = plp.LpVariable('B', lowBound=0)
+    C = plp.LpVariable('C', lowBound=0)
+    model += 500 * A + 450 * B + 600 * C
+    model += 6*A + 5*B + 8*C <= 60
+    model += 10.5*A + 20*B + 10*C <= 150
+    model += A <= 8
+    return model
+
+
+def lrv_model():
+    # LRV - Chapter 5.py, exercise 5.4
+    model = plp.LpProblem("Maximization", plp.LpMaximize)
+    x1 = plp.LpVariable("x1", lowBound=0)
+    x2 = plp.LpVariable("x2", lowBound=0)
+    model += x1 + 3*x2
+    model += x1 + x2 <= 8, "resource 1"
+    model += -x1 + x2 <= 4, "resource 2"
+    model += x1 <= 6, "resource 3"
+    return model
+
+
+def plant_model():
+    # CapacitatedPlantModel.py
+    from MatrixPlantModel import build_plant_model_pulp
+    cost = np.array([[4, 6, 9], [5, 4, 7], [6, 3, 4], [8, 5, 3], [10, 8, 4]])
+    return build_plant_model_pulp(cost, [80, 270, 250, 160, 180],
+                                  [500, 500, 500], [1000, 1000, 1000])
+
+
+EXAMPLE_MODELS = {"glass": glass_model,
+                  "staffing": staffing_model,
+                  "truck": truck_model,
+                  "profit": profit_model,
+                  "lrv_5.4": lrv_model,
+                  "capacitated_plant": plant_model}
+
+
+def benchmark_solvers(repeats=20):
+    print("{:>18} {:>12} {:>12} {:>12} {:>8}".format(
+        "model", "cbc ms", "in-proc ms", "speedup", "same obj"))
+    for name, build in EXAMPLE_MODELS.items():
+        timings = {}
+        objectives = {}
+        for label, solver in (("cbc", plp.PULP_CBC_CMD(msg=0)), ("inproc", InProcessSolver())):
+            model = build()
+            start = time.perf_counter()
+            for _ in range(repeats):
+                model.solve(solver)
+            timings[label] = (time.perf_counter() - start) / repeats * 1e3
+            objectives[label] = plp.value(model.objective)
+        print("{:>18} {:>12.2f} {:>12.3f} {:>12.1f} {:>8}".format(
+            name, timings["cbc"], timings["inproc"], timings["cbc"] / timings["inproc"],
+            str(bool(np.isclose(objectives["cbc"], objectives["inproc"], rtol=1e-6)))))
+
+
+if __name__ == "__main__":
+
+    model = profit_model()
+    print(model.solve(InProcessSolver()))
+    print("Objective = ", plp.value(model.objective))
+    for v in model.variables():
+        print(v.name, "=", v.varValue)
+    for name, c in model.constraints.items():
+        print(name, c.pi, c.slack)
+
+    benchmark_solvers()
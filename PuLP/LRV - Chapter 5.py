@@ -52,6 +52,15 @@ model.solve(plp.GLPK(options=['--ranges sensitivity.sen']))
 # Q: how much can the RHS constraint coefficients change without affecting the shadow prices
 # A: c1 => [4,16], c2 => [-4,8], c3 => [2,infinity)
 
+# e)
+
+# the same ranges without the GLPK report file, as arrays (see SensitivityReport.py)
+from SensitivityReport import sensitivity_report, variables_frame, constraints_frame
+
+report = sensitivity_report(model)
+print(variables_frame(report))
+print(constraints_frame(report))
+
 
 
 
@@ -0,0 +1,199 @@
+### LAZY LINKING CONSTRAINTS FOR THE CAPACITATED PLANT PROBLEM
+#-------------------------------------------------------------
+
+# Constraint 3 of CapacitatedPlantModel.py,
+#
+#     serviceToCustomer[(i,j)] <= Demand[i]*facilityIsActive[j]
+#
+# adds one row per customer-facility pair, and at the optimum almost all of
+# them are slack. For integer facilityIsActive they are even implied by
+# constraints 1 and 2; they only matter because they tighten the LP
+# relaxation that branch and bound works on. Here they are generated on
+# demand instead:
+#
+#  > start from constraints 1 and 2 (build_plant_model(linking=False))
+#  > solve the LP relaxation, find the violated pairs with one array
+#    comparison, add only those rows and re-solve, until none is violated;
+#    the LP bound is then the one of the full formulation
+#  > switch the facilities to binary and solve the MIP, checking the
+#    integer solution the same way before accepting it
+#
+# With highspy the rows are added to the live Highs object, so every
+# re-solve starts from the previous basis; without it the model is rebuilt
+# and solved through scipy.optimize.milp.
+
+import time
+from collections import namedtuple
+
+import numpy as np
+import scipy.sparse as sp
+
+import SparseModel as sm
+from MatrixPlantModel import build_plant_model, split_solution, random_plant_instance
+
+
+# links are the flat pair indices i*n_fac + j of the rows that were added;
+# history has one (phase, objective, rows added) entry per solve; converged
+# is False when a phase ran out of iterations with rows still violated (the
+# LP bound is then only the one of the rows added so far)
+LazyResult = namedtuple("LazyResult", ["status", "objective", "x", "lp_bound", "links",
+                                       "iterations", "history", "converged"])
+
+
+def violated_links(x, demand, n_fac, tol=1e-6):
+    """Flat indices i*n_fac + j of the pairs with serviceToCustomer > demand*facilityIsActive."""
+    n_cust = demand.shape[0]
+    is_active, service = split_solution(x, n_cust, n_fac)
+    violation = service - demand[:, None] * is_active[None, :]
+    return np.flatnonzero(violation.ravel() > tol)
+
+
+def link_rows(links, demand, n_fac):
+    """Rows serviceToCustomer[(i,j)] - demand[i]*facilityIsActive[j] <= 0 for the given pairs."""
+    n_cust = demand.shape[0]
+    k = links.shape[0]
+    rows = np.repeat(np.arange(k), 2)
+    cols = np.column_stack([n_fac + links, links % n_fac]).ravel()
+    vals = np.column_stack([np.ones(k), -demand[links // n_fac]]).ravel()
+    A = sp.csr_matrix((vals, (rows, cols)), shape=(k, n_fac + n_cust * n_fac))
+    return A, np.full(k, -np.inf), np.zeros(k)
+
+
+class _Highs:
+    # the model inside a Highs object; rows are appended in place
+
+    def __init__(self, model):
+        self.h = sm.to_highs(model._replace(integrality=np.zeros_like(model.integrality)))
+        self.integer = np.flatnonzero(model.integrality).astype(np.int32)
+
+    def set_integer(self, integer):
+        kind = np.uint8(1 if integer else 0)
+        self.h.changeColsIntegrality(self.integer.shape[0], self.integer,
+                                     np.full(self.integer.shape[0], kind))
+
+    def add(self, A, lower, upper):
+        A = A.tocsr()
+        self.h.addRows(A.shape[0], lower, upper, A.nnz, A.indptr[:-1].astype(np.int32),
+                       A.indices.astype(np.int32), A.data)
+
+    def solve(self):
+        self.h.run()
+        return sm.highs_solution(self.h)
+
+
+class _Rebuild:
+    # the model as arrays, stacked and solved again from scratch
+
+    def __init__(self, model):
+        self.model = model
+        self.integrality = model.integrality
+        self.set_integer(False)
+
+    def set_integer(self, integer):
+        integrality = self.integrality if integer else np.zeros_like(self.integrality)
+        self.model = self.model._replace(integrality=integrality)
+
+    def add(self, A, lower, upper):
+        m = self.model
+        self.model = m._replace(A=sp.vstack([m.A, A], format="csr"),
+                                row_lower=np.concatenate([m.row_lower, lower]),
+                                row_upper=np.concatenate([m.row_upper, upper]))
+
+    def solve(self):
+        return sm.solve_arrays(self.model)
+
+
+def solve_lazy(transportation_cost, demand, max_supply, fixed_cost, relax_first=True,
+               tol=1e-6, max_iter=100):
+    """Capacitated plant model with constraint 3 added only where it is violated.
+
+    Each phase (LP relaxation, MIP) gets up to max_iter solves; the MIP phase
+    always runs, so the result is an integer solution even when separation on
+    the relaxation did not converge.
+
+    relax_first=False skips the LP phase and only checks the integer solutions,
+    which (constraint 3 being implied for binary facilities) accepts the first
+    one: the same optimum, without the stronger bound.
+    """
+    demand = np.asarray(demand, dtype=float)
+    n_fac = np.shape(max_supply)[0]
+    model = build_plant_model(transportation_cost, demand, max_supply, fixed_cost, linking=False)
+    solver = _Highs(model) if sm.highspy is not None else _Rebuild(model)
+
+    links = np.empty(0, dtype=np.int64)
+    history = []
+    lp_bound = None
+    converged = True
+    for phase in (("lp", "mip") if relax_first else ("mip",)):
+        solver.set_integer(phase == "mip")
+        for _ in range(max_iter):
+            sol = solver.solve()
+            if sol.x is None:
+                return LazyResult(sol.status, None, None, lp_bound, links, len(history), history,
+                                  converged)
+            # rows already in the model can only be violated within the solver tolerance
+            new = np.setdiff1d(violated_links(sol.x, demand, n_fac, tol), links,
+                               assume_unique=True)
+            history.append((phase, sol.objective, new.shape[0]))
+            if new.shape[0] == 0:
+                break
+            solver.add(*link_rows(new, demand, n_fac))
+            links = np.union1d(links, new)
+        else:
+            converged = False
+        if phase == "lp":
+            lp_bound = sol.objective
+    return LazyResult(sol.status, sol.objective, sol.x, lp_bound, links, len(history), history,
+                      converged)
+
+
+def solve_eager(transportation_cost, demand, max_supply, fixed_cost):
+    """The full formulation: (status, objective, x, LP bound)."""
+    model = build_plant_model(transportation_cost, demand, max_supply, fixed_cost)
+    solver = _Highs(model) if sm.highspy is not None else _Rebuild(model)
+    lp = solver.solve()
+    solver.set_integer(True)
+    sol = solver.solve()
+    return sol.status, sol.objective, sol.x, lp.objective
+
+
+## BENCHMARK
+#-----------
+
+def benchmark_lazy(sizes=((100, 10), (200, 20), (500, 30))):
+    print("{:>6} {:>5} {:>10} {:>9} {:>10} {:>9} {:>6} {:>9} {:>12} {:>12}".format(
+        "cust", "fac", "link rows", "eager s", "rows added", "iter", "lazy s", "same obj",
+        "eager bound", "lazy bound"))
+    for n_cust, n_fac in sizes:
+        instance = random_plant_instance(n_cust, n_fac)
+
+        start = time.perf_counter()
+        status, objective, x, bound = solve_eager(*instance)
+        t_eager = time.perf_counter() - start
+
+        start = time.perf_counter()
+        res = solve_lazy(*instance)
+        t_lazy = time.perf_counter() - start
+
+        same = res.converged and abs(res.objective - objective) <= 1e-6 * max(1.0, abs(objective))
+        print("{:>6} {:>5} {:>10} {:>9.2f} {:>10} {:>9} {:>6.2f} {:>9} {:>12.2f} {:>12.2f}".format(
+            n_cust, n_fac, n_cust * n_fac, t_eager, res.links.shape[0], res.iterations, t_lazy,
+            str(same), bound, res.lp_bound))
+
+
+if __name__ == "__main__":
+
+    # CapacitatedPlantModel.py
+    transportation_cost = np.array([[4, 6, 9], [5, 4, 7], [6, 3, 4], [8, 5, 3], [10, 8, 4]])
+    Demand = np.array([80, 270, 250, 160, 180])
+    Max_Supply = np.array([500, 500, 500])
+    Fixed_cost = np.array([1000, 1000, 1000])
+
+    res = solve_lazy(transportation_cost, Demand, Max_Supply, Fixed_cost)
+    print("objective:", res.objective, " LP bound:", res.lp_bound)
+    print("linking rows added:", res.links.shape[0], "of", Demand.shape[0] * Max_Supply.shape[0])
+    for phase, objective, added in res.history:
+        print("  {:<4} {:>10.2f} {:>4} rows".format(phase, objective, added))
+    print("full model objective:", solve_eager(transportation_cost, Demand, Max_Supply, Fixed_cost)[1])
+
+    benchmark_lazy()
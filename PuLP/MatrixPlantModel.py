@@ -0,0 +1,169 @@
+### The Capacitated Plant Problem (matrix form)
+#----------------------------------------------
+
+# Same model as CapacitatedPlantModel.py, but assembled straight from NumPy
+# arrays into a sparse constraint matrix. No LpVariable/LpAffineExpression
+# objects are created, so the build scales with the number of nonzeros.
+#
+# column layout:  [ facilityIsActive (n_fac) | serviceToCustomer (n_cust x n_fac, row-major) ]
+# row layout:     [ demand (n_cust) | capacity (n_fac) | linking (n_cust x n_fac) ]
+
+import time
+import tracemalloc
+
+import numpy as np
+import scipy.sparse as sp
+import pulp as plp
+
+from SparseModel import make_model, solve_arrays, write_mps, MINIMIZE
+
+
+def build_plant_model(transportation_cost, demand, max_supply, fixed_cost,
+                      linking=True, names=False):
+    """Capacitated plant model from arrays.
+
+    transportation_cost has shape (n_customers, n_facilities).
+    """
+    cost = np.asarray(transportation_cost, dtype=float)
+    demand = np.asarray(demand, dtype=float)
+    max_supply = np.asarray(max_supply, dtype=float)
+    fixed_cost = np.asarray(fixed_cost, dtype=float)
+    n_cust, n_fac = cost.shape
+    n_x = n_cust * n_fac
+
+    # column index of facilityIsActive[j] is j, of serviceToCustomer[(i,j)] is n_fac + i*n_fac + j
+    x_col = n_fac + np.arange(n_x)
+    cust_of_x = np.repeat(np.arange(n_cust), n_fac)
+    fac_of_x = np.tile(np.arange(n_fac), n_cust)
+
+    # objective function
+    c = np.concatenate([fixed_cost, cost.ravel()])
+
+    # constraint 1: Match production with demand
+    rows = [cust_of_x]
+    cols = [x_col]
+    vals = [np.ones(n_x)]
+
+    # constraint 2: Production & Shipping <= Capacity
+    rows += [n_cust + fac_of_x, n_cust + np.arange(n_fac)]
+    cols += [x_col, np.arange(n_fac)]
+    vals += [np.ones(n_x), -max_supply]
+
+    lower = [demand, np.full(n_fac, -np.inf)]
+    upper = [demand, np.zeros(n_fac)]
+
+    # constraint 3: Shipping from i to j <= demand*facilityIsActive
+    if linking:
+        link_row = n_cust + n_fac + np.arange(n_x)
+        rows += [link_row, link_row]
+        cols += [x_col, fac_of_x]
+        vals += [np.ones(n_x), -demand[cust_of_x]]
+        lower.append(np.full(n_x, -np.inf))
+        upper.append(np.zeros(n_x))
+
+    n_rows = n_cust + n_fac + (n_x if linking else 0)
+    A = sp.coo_matrix((np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))),
+                      shape=(n_rows, n_fac + n_x)).tocsr()
+
+    col_upper = np.concatenate([np.ones(n_fac), np.full(n_x, np.inf)])
+    integrality = np.concatenate([np.ones(n_fac, dtype=np.int8), np.zeros(n_x, dtype=np.int8)])
+
+    col_names = row_names = None
+    if names:
+        col_names = (["Facility_is_active_%d" % j for j in range(n_fac)]
+                     + ["Service_%d_%d" % (i, j) for i in range(n_cust) for j in range(n_fac)])
+        row_names = (["Demand_%d" % i for i in range(n_cust)]
+                     + ["Capacity_%d" % j for j in range(n_fac)]
+                     + (["Link_%d_%d" % (i, j) for i in range(n_cust) for j in range(n_fac)]
+                        if linking else []))
+
+    return make_model(c, A, np.concatenate(lower), np.concatenate(upper),
+                      col_upper=col_upper, integrality=integrality, sense=MINIMIZE,
+                      col_names=col_names, row_names=row_names)
+
+
+def split_solution(x, n_cust, n_fac):
+    """Split a solution vector into (facilityIsActive, serviceToCustomer matrix)."""
+    return x[:n_fac], x[n_fac:].reshape(n_cust, n_fac)
+
+
+## BENCHMARK: dict/loop formulation vs matrix formulation
+#---------------------------------------------------------
+
+def random_plant_instance(n_cust, n_fac, seed=0):
+    rng = np.random.default_rng(seed)
+    cost = rng.uniform(1, 10, size=(n_cust, n_fac)).round()
+    demand = rng.uniform(50, 300, size=n_cust).round()
+    # enough capacity so that roughly a third of the sites must open
+    max_supply = np.full(n_fac, 3.0 * demand.sum() / n_fac)
+    fixed_cost = rng.uniform(500, 1500, size=n_fac).round()
+    return cost, demand, max_supply, fixed_cost
+
+
+def build_plant_model_pulp(cost, demand, max_supply, fixed_cost):
+    # the formulation of CapacitatedPlantModel.py, fed from the same arrays
+    Customer = list(range(len(demand)))
+    Facility = list(range(len(max_supply)))
+    model = plp.LpProblem("Capacitated_plant_problem", plp.LpMinimize)
+    facilityIsActive = plp.LpVariable.dicts("Facility_is_active", Facility, 0, 1, plp.LpBinary)
+    serviceToCustomer = plp.LpVariable.dicts("Service", [(i,j) for i in Customer for j in Facility], 0)
+    model += plp.lpSum(fixed_cost[j]*facilityIsActive[j] for j in Facility) + plp.lpSum(cost[i][j]*serviceToCustomer[(i,j)]
+                                                                                       for j in Facility
+                                                                                       for i in Customer)
+    for i in Customer:
+        model += plp.lpSum(serviceToCustomer[(i,j)] for j in Facility) == demand[i]
+    for j in Facility:
+        model += plp.lpSum(serviceToCustomer[(i,j)] for i in Customer) <= max_supply[j]*facilityIsActive[j]
+    for i in Customer:
+        for j in Facility:
+            model += serviceToCustomer[(i,j)] <= demand[i]*facilityIsActive[j]
+    return model
+
+
+def _measure(fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    out = fn(*args)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return out, elapsed, peak / 2**20
+
+
+def benchmark_build(sizes=((100, 10), (500, 50), (2000, 100))):
+    print("{:>8} {:>6} {:>12} {:>12} {:>12} {:>12}".format(
+        "cust", "fac", "pulp s", "pulp MiB", "matrix s", "matrix MiB"))
+    for n_cust, n_fac in sizes:
+        data = random_plant_instance(n_cust, n_fac)
+        _, t_pulp, m_pulp = _measure(build_plant_model_pulp, *data)
+        _, t_mat, m_mat = _measure(build_plant_model, *data)
+        print("{:>8} {:>6} {:>12.3f} {:>12.1f} {:>12.4f} {:>12.1f}".format(
+            n_cust, n_fac, t_pulp, m_pulp, t_mat, m_mat))
+
+
+if __name__ == "__main__":
+
+    # the 5 customer / 3 factory example of CapacitatedPlantModel.py
+    transportation_cost = np.array([[4, 6, 9],
+                                    [5, 4, 7],
+                                    [6, 3, 4],
+                                    [8, 5, 3],
+                                    [10, 8, 4]])
+    Demand = np.array([80, 270, 250, 160, 180])
+    Max_Supply = np.array([500, 500, 500])
+    Fixed_cost = np.array([1000, 1000, 1000])
+
+    model = build_plant_model(transportation_cost, Demand, Max_Supply, Fixed_cost, names=True)
+    sol = solve_arrays(model)
+    print(plp.LpStatus[sol.status])
+
+    active, service = split_solution(sol.x, len(Demand), len(Max_Supply))
+    tolerance = 0.0001
+    for j in np.flatnonzero(active > tolerance):
+        print("Establish Facility at site: ", "Factory%d" % (j + 1))
+    print("Objective function/ Minimized cost: ", sol.objective)
+
+    # the same matrix can be handed to any MPS reading solver
+    write_mps(model, "CapacitatedPlantModel.mps")
+
+    benchmark_build()
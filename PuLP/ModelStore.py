@@ -0,0 +1,326 @@
+### BINARY MODEL STORE
+#--------------------
+
+# Section 5 of SolvingAndAnalyzingModelsPuLP.py inspects a model through
+# model.writeLP(). For large plant models the LP text is hundreds of MB and
+# slow to write and to parse back. save_model() stores a ModelArrays as a
+# directory of raw .npy arrays instead:
+#
+#   model.json        shapes, sense, offset, dtypes and a SHA-256 per array
+#   c.npy, indptr.npy, indices.npy, data.npy       objective and CSR matrix
+#   row_lower.npy ... integrality.npy              bounds and types
+#   col_names.npy + col_names_offsets.npy          names as UTF-8 bytes
+#
+#  > load_model(mmap=True) maps the arrays instead of reading them, so a
+#    model opens in milliseconds and pages in only what is touched; names
+#    are decoded lazily (NameList)
+#  > diff_models() compares the hashes in the two headers first and only
+#    scans (in blocks, through the memory map) the arrays that differ
+#  > write_mps() streams a stored model to MPS with SparseModel.write_mps
+#  > describe() is the quick look that the validation LP file was used for
+
+import hashlib
+import json
+import os
+import time
+from collections import namedtuple
+from collections.abc import Sequence
+
+import numpy as np
+import pulp as plp
+import scipy.sparse as sp
+
+import SparseModel as sm
+
+
+FORMAT_VERSION = 1
+
+# array name -> (number of differing entries, first differing positions), or
+# a message when the arrays cannot be compared entry by entry
+ModelDiff = namedtuple("ModelDiff", ["same", "header", "arrays"])
+
+
+class NameList(Sequence):
+    """Read-only list of names stored as one UTF-8 buffer plus offsets."""
+
+    def __init__(self, buf, offsets):
+        self.buf = buf
+        self.offsets = offsets
+
+    def __len__(self):
+        return self.offsets.shape[0] - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[k] for k in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        return bytes(self.buf[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+    def __iter__(self):
+        # decode once, then cut at the offsets
+        data = bytes(self.buf)
+        o = self.offsets.tolist()
+        return (data[o[k]:o[k + 1]].decode("utf-8") for k in range(len(o) - 1))
+
+
+def _encode_names(names):
+    encoded = [n.encode("utf-8") for n in names]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)), out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _sha256(a, block=1 << 24):
+    h = hashlib.sha256()
+    flat = np.ascontiguousarray(a).reshape(-1).view(np.uint8)
+    for start in range(0, flat.shape[0], block):
+        h.update(flat[start:start + block])
+    return h.hexdigest()
+
+
+def save_model(model, path):
+    """Store a ModelArrays (or a plp.LpProblem) in the directory path."""
+    if isinstance(model, plp.LpProblem):
+        model = sm.model_to_arrays(model)
+    A = sp.csr_matrix(model.A)
+    A.sort_indices()
+    arrays = {"c": model.c, "indptr": A.indptr.astype(np.int64),
+              "indices": A.indices.astype(np.int64), "data": A.data.astype(float),
+              "row_lower": model.row_lower, "row_upper": model.row_upper,
+              "col_lower": model.col_lower, "col_upper": model.col_upper,
+              "integrality": np.asarray(model.integrality, dtype=np.int8)}
+    for key, names in (("col_names", sm.column_names(model)), ("row_names", sm.row_names(model))):
+        arrays[key], arrays[key + "_offsets"] = _encode_names(names)
+
+    os.makedirs(path, exist_ok=True)
+    header = {"version": FORMAT_VERSION, "shape": list(A.shape), "nnz": int(A.nnz),
+              "sense": int(model.sense), "offset": float(model.offset), "arrays": {}}
+    for key, a in arrays.items():
+        a = np.ascontiguousarray(a)
+        np.save(os.path.join(path, key + ".npy"), a, allow_pickle=False)
+        header["arrays"][key] = {"dtype": a.dtype.str, "shape": list(a.shape), "sha256": _sha256(a)}
+    # the header is written last: a directory without it is not a model
+    with open(os.path.join(path, "model.json"), "w") as f:
+        json.dump(header, f, indent=1)
+    return header
+
+
+def read_header(path):
+    with open(os.path.join(path, "model.json")) as f:
+        header = json.load(f)
+    if header.get("version") != FORMAT_VERSION:
+        raise ValueError("unsupported model store version %r" % header.get("version"))
+    return header
+
+
+def _array(path, key, mmap):
+    return np.load(os.path.join(path, key + ".npy"), mmap_mode="r" if mmap else None,
+                   allow_pickle=False)
+
+
+def load_model(path, mmap=True):
+    """ModelArrays from save_model(); with mmap the arrays are read-only memory maps."""
+    header = read_header(path)
+    a = {key: _array(path, key, mmap) for key in header["arrays"]}
+    A = sp.csr_matrix((a["data"], a["indices"], a["indptr"]), shape=tuple(header["shape"]),
+                      copy=False)
+    return sm.ModelArrays(a["c"], A, a["row_lower"], a["row_upper"], a["col_lower"], a["col_upper"],
+                          a["integrality"], header["sense"],
+                          NameList(a["col_names"], a["col_names_offsets"]),
+                          NameList(a["row_names"], a["row_names_offsets"]),
+                          header["offset"])
+
+
+def write_mps(path, mps_path, name="MODEL"):
+    """Stream a stored model to a free-format MPS file."""
+    sm.write_mps(load_model(path), mps_path, name=name)
+
+
+## 1. INSPECTION AND DIFF
+#------------------------
+
+def describe(path, head=5):
+    """Sizes, row and column types and a few names of a stored model."""
+    header = read_header(path)
+    model = load_model(path)
+    types = sm._row_types(model)
+    m, n = header["shape"]
+    lines = ["{} rows, {} columns, {} nonzeros, {}".format(
+                 m, n, header["nnz"], "maximize" if header["sense"] == sm.MAXIMIZE else "minimize"),
+             "rows: {}".format(", ".join("{} {}".format(int((types == t).sum()), label)
+                                         for t, label in (("L", "<="), ("G", ">="), ("E", "="),
+                                                          ("N", "free")))),
+             "columns: {} integer, {} binary, {} free".format(
+                 int(model.integrality.sum()),
+                 int((model.integrality.astype(bool) & (model.col_lower == 0) &
+                      (model.col_upper == 1)).sum()),
+                 int((np.isneginf(model.col_lower) & np.isposinf(model.col_upper)).sum())),
+             "first columns: " + ", ".join(model.col_names[:head]),
+             "first rows: " + ", ".join(model.row_names[:head])]
+    return "\n".join(lines)
+
+
+def _scan(a, b, block, sample):
+    # number and first positions of differing entries (nan == nan)
+    count, first = 0, []
+    for start in range(0, a.shape[0], block):
+        x, y = np.asarray(a[start:start + block]), np.asarray(b[start:start + block])
+        differ = x != y
+        if x.dtype.kind == "f":
+            differ &= ~(np.isnan(x) & np.isnan(y))
+        idx = np.flatnonzero(differ)
+        count += idx.shape[0]
+        if len(first) < sample:
+            first.extend((idx[:sample - len(first)] + start).tolist())
+    return count, first
+
+
+def _block(path, indptr, r0, r1, n):
+    # rows r0:r1 of a stored matrix, read through the memory map
+    start, stop = int(indptr[r0]), int(indptr[r1])
+    return sp.csr_matrix((np.asarray(_array(path, "data", True)[start:stop]),
+                          np.asarray(_array(path, "indices", True)[start:stop]),
+                          np.asarray(indptr[r0:r1 + 1]) - start), shape=(r1 - r0, n))
+
+
+def _matrix_rows(path_a, path_b, header, block, sample):
+    # number and first indices of rows whose coefficients differ, about
+    # block nonzeros at a time
+    m, n = header["shape"]
+    ptr_a, ptr_b = _array(path_a, "indptr", True), _array(path_b, "indptr", True)
+    rows = max(1, block * m // max(1, header["nnz"]))
+    count, first = 0, []
+    for r0 in range(0, m, rows):
+        r1 = min(m, r0 + rows)
+        differ = _block(path_a, ptr_a, r0, r1, n) != _block(path_b, ptr_b, r0, r1, n)
+        changed = np.unique(differ.nonzero()[0])
+        count += changed.shape[0]
+        if len(first) < sample:
+            first.extend((changed[:sample - len(first)] + r0).tolist())
+    return count, first
+
+
+def diff_models(path_a, path_b, block=1 << 20, sample=5):
+    """Compare two stored models array by array, through the memory maps."""
+    ha, hb = read_header(path_a), read_header(path_b)
+    header = {k: (ha[k], hb[k]) for k in ("shape", "nnz", "sense", "offset") if ha[k] != hb[k]}
+    arrays = {}
+    for key in ha["arrays"]:
+        ia, ib = ha["arrays"][key], hb["arrays"][key]
+        if ia["sha256"] == ib["sha256"]:
+            continue
+        if ia["shape"] != ib["shape"] or ia["dtype"] != ib["dtype"]:
+            arrays[key] = "shape {} vs {}".format(ia["shape"], ib["shape"])
+            continue
+        count, first = _scan(_array(path_a, key, True), _array(path_b, key, True), block, sample)
+        arrays[key] = (count, first)
+
+    # the matrix is reported as changed rows, names as positions
+    if any(key in arrays for key in ("indptr", "indices", "data")):
+        for key in ("indptr", "indices", "data"):
+            arrays.pop(key, None)
+        if ha["shape"] == hb["shape"]:
+            arrays["matrix rows"] = _matrix_rows(path_a, path_b, ha, block, sample)
+        else:
+            arrays["matrix"] = "shape {} vs {}".format(ha["shape"], hb["shape"])
+    for key in ("col_names", "row_names"):
+        if key in arrays or key + "_offsets" in arrays:
+            names_a = NameList(_array(path_a, key, True), _array(path_a, key + "_offsets", True))
+            names_b = NameList(_array(path_b, key, True), _array(path_b, key + "_offsets", True))
+            if len(names_a) == len(names_b):
+                changed = [k for k, (x, y) in enumerate(zip(names_a, names_b)) if x != y]
+                arrays[key] = (len(changed), changed[:sample])
+            arrays.pop(key + "_offsets", None)
+    return ModelDiff(not header and not arrays, header, arrays)
+
+
+def format_diff(diff):
+    if diff.same:
+        return "models are identical"
+    lines = ["{}: {} vs {}".format(k, *v) for k, v in diff.header.items()]
+    for key, d in diff.arrays.items():
+        if isinstance(d, str):
+            lines.append("{}: {}".format(key, d))
+        else:
+            lines.append("{}: {} entries differ, first at {}".format(key, d[0], d[1]))
+    return "\n".join(lines)
+
+
+## BENCHMARK
+#-----------
+
+def benchmark_store(sizes=((200, 20), (1000, 50), (2000, 100)), folder=None):
+    import tempfile
+    from MatrixPlantModel import random_plant_instance, build_plant_model_pulp
+
+    folder = tempfile.mkdtemp() if folder is None else folder
+    print("{:>9} {:>10} {:>10} {:>9} {:>10} {:>9} {:>9} {:>9}".format(
+        "columns", "nonzeros", "writeLP s", "parse s", "store MiB", "save s", "load s",
+        "speedup"))
+    for n_cust, n_fac in sizes:
+        lp = build_plant_model_pulp(*random_plant_instance(n_cust, n_fac))
+        model = sm.model_to_arrays(lp)
+
+        start = time.perf_counter()
+        lp.writeLP(os.path.join(folder, "model.lp"))
+        t_lp = time.perf_counter() - start
+        # PuLP has no LP reader, so the text is parsed back from the MPS file
+        lp.writeMPS(os.path.join(folder, "model.mps"))
+        start = time.perf_counter()
+        plp.LpProblem.fromMPS(os.path.join(folder, "model.mps"))
+        t_parse = time.perf_counter() - start
+
+        store = os.path.join(folder, "store_%d" % n_cust)
+        start = time.perf_counter()
+        save_model(model, store)
+        t_save = time.perf_counter() - start
+        start = time.perf_counter()
+        loaded = load_model(store)
+        # touch everything, as a parser would have
+        np.asarray(loaded.A.data).sum()
+        list(loaded.col_names)
+        list(loaded.row_names)
+        t_load = time.perf_counter() - start
+        size = sum(e.stat().st_size for e in os.scandir(store)) / 2**20
+        print("{:>9} {:>10} {:>10.2f} {:>9.2f} {:>10.1f} {:>9.3f} {:>9.3f} {:>8.0f}x".format(
+            model.c.shape[0], model.A.nnz, t_lp, t_parse, size, t_save, t_load,
+            (t_lp + t_parse) / (t_save + t_load)))
+
+
+if __name__ == "__main__":
+
+    import shutil
+    import tempfile
+
+    from MatrixPlantModel import build_plant_model
+
+    # the 5 customer / 3 factory plant model of CapacitatedPlantModel.py
+    cost = np.array([[4, 6, 9], [5, 4, 7], [6, 3, 4], [8, 5, 3], [10, 8, 4]])
+    model = build_plant_model(cost, np.array([80, 270, 250, 160, 180]), np.array([500, 500, 500]),
+                              np.array([1000, 1000, 1000]), names=True)
+    folder = tempfile.mkdtemp()
+    a, b = os.path.join(folder, "plant_a"), os.path.join(folder, "plant_b")
+    save_model(model, a)
+    print(describe(a))
+
+    # the loaded model solves like the original
+    print("objective:", sm.solve_arrays(load_model(a)).objective)
+
+    # change one capacity and one cost, then diff
+    c = model.c.copy()
+    c[5] += 1
+    upper = model.row_upper.copy()
+    upper[-1] = 400
+    A = model.A.tolil()
+    A[6, 3] = -400
+    save_model(model._replace(c=c, A=A.tocsr(), row_upper=upper), b)
+    print(format_diff(diff_models(a, b)))
+    print(format_diff(diff_models(a, a)))
+
+    write_mps(a, os.path.join(folder, "plant.mps"))
+    with open(os.path.join(folder, "plant.mps")) as f:
+        print("".join(f.readlines()[:8]))
+    shutil.rmtree(folder)
+
+    benchmark_store()
@@ -0,0 +1,131 @@
+### BUILD ONCE, RE-SOLVE MANY
+#----------------------------
+
+# In SensitivityAndSimulationPuLP.py every scenario builds a new LpProblem
+# and new LpVariables, writes an LP file and starts a solver process, even
+# though only the objective coefficients change. A ModelTemplate builds the
+# structure once and then only swaps coefficient and right-hand-side
+# vectors between solves:
+#
+#  > with highspy the model stays loaded in one Highs object, and the basis
+#    of the previous solve is kept as a warm start
+#  > without highspy each solve goes to scipy's HiGHS from the cached arrays
+#    (no warm start, but still no model rebuild, file or subprocess)
+
+import time
+
+import numpy as np
+import pulp as plp
+
+import SparseModel as sm
+
+
+class ModelTemplate:
+
+    def __init__(self, model, backend=None):
+        # accept an LpProblem or an already extracted ModelArrays
+        if isinstance(model, plp.LpProblem):
+            model = sm.model_to_arrays(model)
+        self.model = model
+        self.n_cols = model.c.shape[0]
+        self.n_rows = model.A.shape[0]
+        self._cols = np.arange(self.n_cols, dtype=np.int32)
+        self._rows = np.arange(self.n_rows, dtype=np.int32)
+
+        if backend is None:
+            backend = "highs" if sm.highspy is not None else "scipy"
+        self.backend = backend
+        if backend == "highs":
+            self._highs = sm.to_highs(model)
+
+        self._c = model.c.copy()
+        self._row_lower = model.row_lower.copy()
+        self._row_upper = model.row_upper.copy()
+
+    def set_objective(self, c):
+        c = np.asarray(c, dtype=float)
+        self._c[:] = c
+        if self.backend == "highs":
+            self._highs.changeColsCost(self.n_cols, self._cols, c)
+
+    def set_row_bounds(self, row_lower, row_upper):
+        self._row_lower[:] = row_lower
+        self._row_upper[:] = row_upper
+        if self.backend == "highs":
+            self._highs.changeRowsBounds(self.n_rows, self._rows,
+                                         self._row_lower, self._row_upper)
+
+    def set_rhs(self, rhs):
+        # replace the finite side(s) of every row, keeping its sense
+        rhs = np.asarray(rhs, dtype=float)
+        lower = np.where(np.isneginf(self.model.row_lower), -np.inf, rhs)
+        upper = np.where(np.isposinf(self.model.row_upper), np.inf, rhs)
+        self.set_row_bounds(lower, upper)
+
+    def solve(self, c=None, rhs=None):
+        """Update the objective and/or rhs vectors, then re-solve."""
+        if c is not None:
+            self.set_objective(c)
+        if rhs is not None:
+            self.set_rhs(rhs)
+
+        if self.backend == "highs":
+            self._highs.run()
+            return sm.highs_solution(self._highs)
+        return sm.solve_arrays(self.model._replace(c=self._c,
+                                                   row_lower=self._row_lower,
+                                                   row_upper=self._row_upper))
+
+
+if __name__ == "__main__":
+
+    # the profit model of SensitivityAndSimulationPuLP.py, built once
+    model = plp.LpProblem("Maximize profits", plp.LpMaximize)
+    A = plp.LpVariable('A', lowBound=0)
+    B = plp.LpVariable('B', lowBound=0)
+    C = plp.LpVariable('C', lowBound=0)
+    model += 500 * A + 450 * B + 600 * C
+    model += 6*A + 5*B + 8*C <= 60
+    model += 10.5*A + 20*B + 10*C <= 150
+    model += A <= 8
+
+    template = ModelTemplate(model)
+    sol = template.solve()
+    print("Objective = ", sol.objective, "x = ", sol.x)
+
+    # shadow price of C1 by re-solving with one more working hour
+    base_rhs = np.array([60.0, 150.0, 8.0])
+    print("C1 + 1 hour: ", template.solve(rhs=base_rhs + [1, 0, 0]).objective - sol.objective)
+    template.set_rhs(base_rhs)
+
+    # monte carlo sweep: only the objective changes between solves
+    rng = np.random.default_rng(0)
+    noise = rng.normal(0, 25, size=(1000, 3))
+    base = np.array([500.0, 450.0, 600.0])
+
+    start = time.perf_counter()
+    for n in noise:
+        template.set_objective(base + n)
+    update = (time.perf_counter() - start) / len(noise)
+
+    start = time.perf_counter()
+    for n in noise:
+        template.solve(c=base + n)
+    total = (time.perf_counter() - start) / len(noise)
+
+    start = time.perf_counter()
+    for a, b, c in noise[:100]:
+        m = plp.LpProblem("Maximize profits", plp.LpMaximize)
+        A = plp.LpVariable('A', lowBound=0)
+        B = plp.LpVariable('B', lowBound=0)
+        C = plp.LpVariable('C', lowBound=0)
+        m += (500+a)*A + (450+b)*B + (600+c)*C
+        m += 6*A + 5*B + 8*C <= 60
+        m += 10.5*A + 20*B + 10*C <= 150
+        m += A <= 8
+        m.solve(plp.PULP_CBC_CMD(msg=0))
+    rebuild = (time.perf_counter() - start) / 100
+
+    print("{} backend: update {:.1f} us, update + solve {:.1f} us".format(
+        template.backend, update * 1e6, total * 1e6))
+    print("rebuild + CBC: {:.1f} us per scenario".format(rebuild * 1e6))
@@ -0,0 +1,169 @@
+### PLANT LOCATION INPUT DATA
+#----------------------------
+
+# The plant location models in OptimizationBasics.py and
+# SolvingAndAnalyzingModelsPuLP.py expect the DataFrames fix_cost, var_cost,
+# cap and demand, and read them one scalar .loc[] at a time. This module
+# loads those tables from CSV/XLSX into aligned NumPy arrays instead:
+#
+#  > every parsed table is cached as a binary snapshot (a .npy file plus its
+#    row/column labels), stored next to the source under .snapshots/
+#  > a snapshot is tied to the SHA-256 of the source file, so re-running on
+#    unchanged inputs skips spreadsheet parsing and memory-maps the arrays
+#  > model coefficients are then plain array indexing: fix_cost[i, s]
+
+import hashlib
+import json
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import pulp as plp
+
+
+Table = namedtuple("Table", ["index", "columns", "values"])
+
+PlantInputs = namedtuple("PlantInputs", ["locations", "sizes", "fix_cost", "var_cost", "cap", "demand"])
+
+
+def file_hash(path, block_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _read_table(path, sheet_name, index_col, usecols):
+    if str(path).lower().endswith(".csv"):
+        df = pd.read_csv(path, index_col=index_col, usecols=usecols)
+    else:
+        df = pd.read_excel(path, sheet_name=sheet_name, index_col=index_col, usecols=usecols)
+    return df.dropna(how="all")
+
+
+def load_table(path, sheet_name=0, index_col=0, usecols=None, cache_dir=None):
+    """Load a numeric table as a Table of labels and a (memory-mapped) float array."""
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)), ".snapshots")
+
+    # the snapshot name covers the file content and the way it was read
+    key = hashlib.sha256(json.dumps([file_hash(path), sheet_name, index_col, usecols],
+                                    default=str).encode()).hexdigest()[:16]
+    stem = os.path.splitext(os.path.basename(path))[0].replace(" ", "_")
+    base = os.path.join(cache_dir, "%s-%s" % (stem, key))
+
+    if os.path.exists(base + ".json") and os.path.exists(base + ".npy"):
+        with open(base + ".json") as f:
+            labels = json.load(f)
+        return Table(labels["index"], labels["columns"], np.load(base + ".npy", mmap_mode="r"))
+
+    df = _read_table(path, sheet_name, index_col, usecols)
+    values = df.to_numpy(dtype=float)
+    os.makedirs(cache_dir, exist_ok=True)
+    # write the array first: a snapshot only counts once its labels exist
+    np.save(base + ".npy", values)
+    with open(base + ".json", "w") as f:
+        json.dump({"source": os.path.abspath(path),
+                   "index": [str(i) for i in df.index],
+                   "columns": [str(c) for c in df.columns]}, f)
+    return Table([str(i) for i in df.index], [str(c) for c in df.columns],
+                 np.load(base + ".npy", mmap_mode="r"))
+
+
+def _positions(labels, keys, axis):
+    # one dict lookup per key instead of a list scan
+    if keys is None:
+        return np.arange(len(labels))
+    position = {label: k for k, label in enumerate(labels)}
+    keys = [str(k) for k in keys]
+    missing = [k for k in keys if k not in position]
+    if missing:
+        raise KeyError("%s labels not in table: %s" % (axis, ", ".join(missing)))
+    return np.array([position[k] for k in keys], dtype=np.intp)
+
+
+def align(table, rows=None, columns=None):
+    """Reorder a table's values to the given row/column labels (array indexing, no .loc).
+
+    Raises KeyError naming the labels the table does not have.
+    """
+    r = _positions(table.index, rows, "row")
+    c = _positions(table.columns, columns, "column")
+    return np.asarray(table.values[np.ix_(r, c)])
+
+
+def load_plant_inputs(fix_cost_path, var_cost_path, cap_path, demand_path,
+                      demand_col="Dmd", cache_dir=None):
+    """Load fix_cost, var_cost, cap and demand aligned on location and size."""
+    fix_cost = load_table(fix_cost_path, cache_dir=cache_dir)
+    locations = fix_cost.index
+    sizes = fix_cost.columns
+    return PlantInputs(locations, sizes,
+                       align(fix_cost),
+                       align(load_table(var_cost_path, cache_dir=cache_dir), locations, locations),
+                       align(load_table(cap_path, cache_dir=cache_dir), locations, sizes),
+                       align(load_table(demand_path, cache_dir=cache_dir), locations, [demand_col])[:, 0])
+
+
+def plant_location_model(inputs):
+    # the model of SolvingAndAnalyzingModelsPuLP.py, application 2, with
+    # integer positions into the input arrays instead of .loc lookups
+    loc = range(len(inputs.locations))
+    size = range(len(inputs.sizes))
+    model = plp.LpProblem("Capacitated Plant Location Model", plp.LpMinimize)
+
+    x = plp.LpVariable.dicts("production_", [(i,j) for i in loc for j in loc],
+                             lowBound=0, upBound=None, cat='Continuous')
+    y = plp.LpVariable.dicts("plant_", [(i,s) for s in size for i in loc], cat='Binary')
+
+    model += (plp.lpSum([inputs.fix_cost[i, s] * y[(i,s)] for s in size for i in loc])
+              + plp.lpSum([inputs.var_cost[i, j] * x[(i,j)] for i in loc for j in loc]))
+
+    for j in loc:
+        model += plp.lpSum([x[(i, j)] for i in loc]) == inputs.demand[j]
+
+    for i in loc:
+        model += plp.lpSum([x[(i,j)] for j in loc]) <= plp.lpSum([inputs.cap[i, s] * y[(i,s)] for s in size])
+
+    return model, x, y
+
+
+if __name__ == "__main__":
+
+    import tempfile
+    import time
+
+    # illustrative tables in the layout the plant location scripts expect
+    loc = ['USA', 'Germany', 'Japan', 'Brazil', 'India']
+    tmp = tempfile.mkdtemp()
+    pd.DataFrame({'Low_Cap': [6500, 4980, 6230, 3230, 2110],
+                  'High_Cap': [9500, 7270, 9100, 4730, 3080]}, index=loc).to_csv(os.path.join(tmp, "fix_cost.csv"))
+    pd.DataFrame([[6, 13, 20, 12, 22],
+                  [13, 6, 14, 14, 13],
+                  [20, 14, 3, 21, 10],
+                  [12, 14, 21, 8, 23],
+                  [17, 13, 9, 21, 8]], index=loc, columns=loc).to_csv(os.path.join(tmp, "var_cost.csv"))
+    pd.DataFrame({'Low_Cap': [500] * 5, 'High_Cap': [1500] * 5}, index=loc).to_csv(os.path.join(tmp, "cap.csv"))
+    pd.DataFrame({'Dmd': [2719.6, 84.1, 1676.8, 145.4, 156.4]}, index=loc).to_csv(os.path.join(tmp, "demand.csv"))
+
+    paths = [os.path.join(tmp, f) for f in ("fix_cost.csv", "var_cost.csv", "cap.csv", "demand.csv")]
+    inputs = load_plant_inputs(*paths)
+    model, x, y = plant_location_model(inputs)
+    model.solve(plp.PULP_CBC_CMD(msg=0))
+    print("STATUS: ", plp.LpStatus[model.status])
+    print("Objective: ", plp.value(model.objective))
+    for (i, s), v in y.items():
+        if v.varValue > 0.5:
+            print("Open {} plant in {}".format(inputs.sizes[s], inputs.locations[i]))
+
+    # the distribution center spreadsheet: first parse vs snapshot hit
+    xlsx = os.path.join("..", "Distribution Center Optimization", "Distribution center optimization.xlsx")
+    if os.path.exists(xlsx):
+        cache = os.path.join(tmp, ".snapshots")
+        for label in ("parse", "snapshot"):
+            start = time.perf_counter()
+            stores = load_table(xlsx, index_col=0, usecols=["StoreID", "StoreXCoord", "StoreYCoord"],
+                                cache_dir=cache)
+            print("{}: {:.4f}s, {} demand units".format(label, time.perf_counter() - start, stores.values.shape[0]))
@@ -0,0 +1,360 @@
+### PHASE-LEVEL PROFILING OF MODEL RUNS
+#-------------------------------------
+
+# A slow run of CapacitatedPlantModel.py or of the Monte Carlo loop can spend
+# its time in five places: building the lpSum expressions, writing the
+# LP/MPS file, starting the solver process, solving, or reading the solution
+# back into varValue. Profiler times each of them per run:
+#
+#     profiler = Profiler("runs.jsonl")
+#     with profiler.run("capacitated_plant", scenario=k):
+#         with profiler.phase("build"):
+#             model = build_model()
+#         model.solve(ProfiledSolver(plp.PULP_CBC_CMD(msg=0), profiler))
+#
+#  > the solver phases are measured from inside the wrapped solver. Solvers
+#    with a phase_hook (InProcessSolver, SolveCache.CachedSolver) report
+#    when the model is written (arrays extracted) and when the solution is
+#    read back. For command line solvers lp.writeMPS/writeLP and the
+#    solver's readsol methods are wrapped on those instances, and the
+#    solver module's subprocess is swapped for one that stamps Popen, for
+#    the duration of the solve only. That swap is module global: profile
+#    command line solves from one thread at a time (processes are fine)
+#  > every run adds the number of variables, constraints and nonzeros, the
+#    solver status and the peak memory, and is written as one JSON line
+#  > a disabled profiler hands out one shared no-op context and the wrapped
+#    solver calls straight through, so instrumentation can stay in the code
+#
+# Setting PULP_PROFILE=<file.jsonl> turns default_profiler() on without
+# touching the code; load_records() and summarize() aggregate the lines.
+
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+import pulp as plp
+
+try:
+    import resource
+except ImportError:     # not on Windows
+    resource = None
+
+
+PHASES = ("build", "write", "process_start", "solve", "parse")
+
+_NULL = contextlib.nullcontext()
+
+
+def model_counts(lp):
+    """Number of variables, constraints and constraint nonzeros of a PuLP model."""
+    return {"variables": len(lp.variables()),
+            "constraints": len(lp.constraints),
+            "nonzeros": sum(len(c) for c in lp.constraints.values())}
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return {}
+    # ru_maxrss is in kB on Linux and in bytes on macOS
+    unit = 1 / 1024**2 if sys.platform == "darwin" else 1 / 1024
+    return {"peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit,
+            "child_peak_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit}
+
+
+class Profiler:
+    """Collects one record per run and writes it as a JSON line.
+
+    memory="rss" records the process high-water marks (free), "tracemalloc"
+    the peak of Python allocations within the run (slows allocation down),
+    None nothing.
+    """
+
+    def __init__(self, path=None, enabled=True, memory="rss"):
+        self.path = path
+        self.enabled = enabled
+        self.memory = memory
+        self.records = []
+        self._record = None
+        self._file = None
+        if enabled and path is not None:
+            # line buffered: records survive a crash of a long batch
+            self._file = open(path, "a", buffering=1)
+
+    def run(self, label, **meta):
+        """Context manager around one model run (build + solve)."""
+        if not self.enabled:
+            return _NULL
+        return self._run(label, meta)
+
+    @contextlib.contextmanager
+    def _run(self, label, meta):
+        outer = self._record
+        record = self._record = {"label": label, **meta, "phases": dict.fromkeys(PHASES, 0.0)}
+        if self.memory == "tracemalloc":
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["total"] = time.perf_counter() - start
+            if self.memory == "tracemalloc":
+                record["python_peak_mb"] = tracemalloc.get_traced_memory()[1] / 1024**2
+            elif self.memory == "rss":
+                record.update(_peak_rss_mb())
+            self._record = outer
+            self._emit(record)
+
+    def phase(self, name):
+        """Context manager adding its wall time to a phase of the current run."""
+        if not self.enabled:
+            return _NULL
+        return self._phase(name)
+
+    @contextlib.contextmanager
+    def _phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        if self._record is not None:
+            phases = self._record["phases"]
+            phases[name] = phases.get(name, 0.0) + seconds
+
+    def update(self, **values):
+        if self._record is not None:
+            self._record.update(values)
+
+    def _emit(self, record):
+        if self._file is not None:
+            self._file.write(json.dumps(record, default=str) + "\n")
+        else:
+            self.records.append(record)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def default_profiler():
+    """A profiler writing to $PULP_PROFILE, or a disabled one when it is not set."""
+    path = os.environ.get("PULP_PROFILE")
+    return Profiler(path, enabled=bool(path))
+
+
+## 1. SOLVER WRAPPER
+#-------------------
+
+@contextlib.contextmanager
+def _wrapped(owner, attr, before=None, after=None):
+    # replace owner.attr by a version that stamps times around the call,
+    # for the duration of the with-block only
+    original = getattr(owner, attr)
+
+    def timed(*args, **kwargs):
+        if before is not None:
+            before()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            if after is not None:
+                after()
+
+    own = attr in vars(owner) if hasattr(owner, "__dict__") else False
+    setattr(owner, attr, timed)
+    try:
+        yield
+    finally:
+        if own:
+            setattr(owner, attr, original)
+        else:
+            delattr(owner, attr)
+
+
+@contextlib.contextmanager
+def _wrapped_hook(solver, hook):
+    # set the phase_hook of one solver instance for the duration of a solve
+    own = "phase_hook" in vars(solver)
+    original = solver.phase_hook
+    solver.phase_hook = hook
+    try:
+        yield
+    finally:
+        if own:
+            solver.phase_hook = original
+        else:
+            del solver.phase_hook
+
+
+@contextlib.contextmanager
+def _wrapped_module(module, replacement):
+    original = module.subprocess
+    module.subprocess = replacement
+    try:
+        yield
+    finally:
+        module.subprocess = original
+
+
+class _TimedSubprocess:
+    # stands in for the subprocess module of a solver API module; only Popen
+    # is timed
+    def __init__(self, marks):
+        self._marks = marks
+
+    def Popen(self, *args, **kwargs):
+        proc = subprocess.Popen(*args, **kwargs)
+        self._marks["spawned"] = time.perf_counter()
+        return proc
+
+    def __getattr__(self, name):
+        return getattr(subprocess, name)
+
+
+def _solver_chain(solver):
+    # a wrapper solver (CachedSolver, ProfiledSolver) keeps the one it
+    # delegates to in .solver
+    while isinstance(solver, plp.LpSolver):
+        yield solver
+        solver = getattr(solver, "solver", None)
+
+
+class ProfiledSolver(plp.LpSolver):
+    """PuLP solver that times the phases of `solver` into a Profiler."""
+
+    name = "ProfiledSolver"
+
+    def __init__(self, solver=None, profiler=None, **kwargs):
+        plp.LpSolver.__init__(self, **kwargs)
+        self.solver = plp.PULP_CBC_CMD(msg=0) if solver is None else solver
+        self.profiler = default_profiler() if profiler is None else profiler
+        self.mip = self.solver.mip
+
+    def available(self):
+        return self.solver.available()
+
+    def actualSolve(self, lp):
+        if not self.profiler.enabled:
+            return self.solver.actualSolve(lp)
+        if self.profiler._record is None:
+            # a solve outside profiler.run() is a run of its own
+            with self.profiler.run(lp.name):
+                return self._profiled(lp)
+        return self._profiled(lp)
+
+    def _profiled(self, lp):
+        marks = {}
+
+        def mark(key):
+            # the last write (a wrapper extracts before its inner solver
+            # does) and the first read count
+            if key == "written" or key not in marks:
+                marks[key] = time.perf_counter()
+
+        stamp = lambda key: (lambda: mark(key))
+        chain = list(_solver_chain(self.solver))
+        innermost = chain[-1]
+        module = sys.modules[type(innermost).__module__]
+
+        with contextlib.ExitStack() as stack:
+            for solver in chain:
+                if hasattr(solver, "phase_hook"):
+                    stack.enter_context(_wrapped_hook(solver, mark))
+            # command line solvers: the LP/MPS file, the solution file and
+            # the process start
+            for attr in ("writeMPS", "writeLP"):
+                stack.enter_context(_wrapped(lp, attr, after=stamp("written")))
+            for attr in ("readsol_MPS", "readsol_LP", "readsol"):
+                if hasattr(innermost, attr):
+                    stack.enter_context(_wrapped(innermost, attr, before=stamp("read")))
+            if getattr(module, "subprocess", None) is subprocess:
+                stack.enter_context(_wrapped_module(module, _TimedSubprocess(marks)))
+
+            start = time.perf_counter()
+            status = self.solver.actualSolve(lp)
+            end = time.perf_counter()
+
+        # the phases follow each other, so the marks split [start, end]
+        written = marks.get("written", start)
+        spawned = marks.get("spawned", written)
+        read = marks.get("read", end)
+        self.profiler.add("write", written - start)
+        self.profiler.add("process_start", spawned - written)
+        self.profiler.add("solve", read - spawned)
+        self.profiler.add("parse", end - read)
+        self.profiler.update(solver=self.solver.name, status=plp.LpStatus[status], **model_counts(lp))
+        return status
+
+
+## 2. AGGREGATION
+#----------------
+
+def load_records(path):
+    """JSON lines of a profiler as a DataFrame, one column per phase."""
+    with open(path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    df = pd.json_normalize(records)
+    return df.rename(columns=lambda c: c.replace("phases.", ""))
+
+
+def summarize(df, by="label"):
+    """Mean seconds per phase and share of the total, per label."""
+    phases = [p for p in df.columns if p in PHASES or p in ("total",)]
+    mean = df.groupby(by)[phases].mean()
+    share = mean[[p for p in phases if p != "total"]].div(mean["total"], axis=0)
+    return mean.join(share.add_suffix("_share")).assign(runs=df.groupby(by).size())
+
+
+if __name__ == "__main__":
+
+    import tempfile
+
+    import numpy as np
+
+    from InProcessSolver import InProcessSolver
+    from MatrixPlantModel import build_plant_model_pulp
+
+    rng = np.random.default_rng(0)
+    n_cust, n_fac = 200, 20
+    cost = rng.uniform(1, 20, size=(n_cust, n_fac)).round()
+    demand = rng.integers(50, 300, n_cust)
+    capacity = np.full(n_fac, demand.sum() / 8)
+    fixed = np.full(n_fac, 5000.0)
+
+    path = os.path.join(tempfile.mkdtemp(), "runs.jsonl")
+    profiler = Profiler(path)
+    for label, solver in (("cbc", plp.PULP_CBC_CMD(msg=0)), ("in-process", InProcessSolver())):
+        for k in range(5):
+            with profiler.run(label, scenario=k):
+                with profiler.phase("build"):
+                    model = build_plant_model_pulp(cost, demand, capacity, fixed)
+                model.solve(ProfiledSolver(solver, profiler))
+    profiler.close()
+
+    df = load_records(path)
+    print(df.iloc[0].to_dict())
+    pd.set_option("display.width", 200, "display.max_columns", None)
+    print(summarize(df).round(4))
+
+    # overhead of the instrumentation on a small model solved many times
+    from InProcessSolver import profit_model
+    off = Profiler(enabled=False)
+    on = Profiler(memory="rss")
+    for label, solver in (("plain", InProcessSolver()),
+                          ("disabled", ProfiledSolver(InProcessSolver(), off)),
+                          ("enabled", ProfiledSolver(InProcessSolver(), on))):
+        model = profit_model()
+        start = time.perf_counter()
+        for _ in range(500):
+            model.solve(solver)
+        print("{:<9} {:.3f} ms/solve".format(label, (time.perf_counter() - start) / 500 * 1e3))
@@ -0,0 +1,286 @@
+### ROLLING-HORIZON TRANSPORTATION PLAN
+#--------------------------------------
+
+# Section 3 of OptimizationBasics.py plans integer num_of_shipments[m, w, c]
+# for every month, warehouse and customer in one model. Over a 52- or
+# 365-period horizon that integer model gets large, so here it is solved
+# window by window:
+#
+#  > a window covers `window` periods starting at the first uncommitted one
+#  > only its first `step` periods are committed (the rest is lookahead),
+#    their plan is appended to the output file and the closing inventory
+#    becomes the opening inventory of the next window
+#  > the next window starts `step` periods later, overlapping the previous
+#
+# Periods are linked through warehouse stock, which is what makes the
+# lookahead matter:
+#
+#   min   sum cost[w,c] ship[t,w,c] + prod_cost[t,w] produce[t,w] + hold[w] inv[t,w]
+#   s.t.  sum_w load ship[t,w,c] >= demand[t,c]
+#         inv[t-1,w] + produce[t,w] - sum_c load ship[t,w,c] = inv[t,w]
+#         0 <= produce[t,w] <= prod_cap[t,w],  0 <= inv[t,w] <= storage[w]
+#         ship[t,w,c] >= 0 integer (number of shipments of `load` units)
+#
+# A window only sees its own periods, so it would end with empty warehouses
+# even when capacity after it cannot keep up with demand. Each window
+# therefore keeps a stock floor at the end of its last committed period: the
+# total stock the rest of the horizon needs to stay feasible
+# (stock_targets(), one backward pass). The lookahead periods are left free,
+# and the last window, which commits up to the end of the horizon, has none.
+#
+# Only one window model exists at a time, so memory depends on the window
+# size and not on the horizon.
+
+import time
+from collections import namedtuple
+
+import numpy as np
+import scipy.sparse as sp
+
+from SparseModel import make_model, solve_arrays, MINIMIZE
+
+
+TransportPlanData = namedtuple("TransportPlanData",
+                               ["cost", "demand", "prod_cap", "prod_cost", "hold_cost",
+                                "storage", "initial_inventory", "periods", "warehouses", "customers",
+                                "load"],
+                               defaults=(None, None, None, 1.0))
+
+RollingResult = namedtuple("RollingResult", ["objective", "windows", "inventory", "history"])
+
+
+## 1. WINDOW MODEL
+#-----------------
+
+def stock_targets(data):
+    """Least total stock needed at the start of each period (and after the last)."""
+    # whole shipments only: every customer receives demand rounded up to loads
+    shipped = np.ceil(data.demand / data.load - 1e-9) * data.load
+    shortfall = shipped.sum(axis=1) - data.prod_cap.sum(axis=1)
+    # a warehouse only ships whole loads, so up to one load per warehouse of
+    # stock plus capacity can be stranded in a period: a period needs
+    #   stock >= shortfall + margin     to ship its own demand, and
+    #   stock >= shortfall + need[t+1]  to leave the next floor behind
+    # (the stranded stock stays in the warehouses and counts towards it)
+    margin = data.cost.shape[0] * data.load
+    need = np.zeros(shortfall.shape[0] + 1)
+    for t in range(shortfall.shape[0] - 1, -1, -1):
+        need[t] = max(0.0, shortfall[t] + max(need[t + 1], margin))
+    return need
+
+
+def build_window(data, start, stop, inventory, stock_floor=None, floor_period=None):
+    """Integer model of periods [start, stop) with the given opening inventory.
+
+    Columns per period: [ship (w x c, row-major) | produce (w) | inv (w)].
+    Rows: demand (period x customer), stock balance (period x warehouse),
+    then total closing stock of window period floor_period (default: the
+    last one) >= stock_floor if a floor is given.
+    """
+    n_w, n_c = data.cost.shape
+    n_p = stop - start
+    block = n_w * n_c + 2 * n_w
+    base = np.arange(n_p)[:, None] * block
+
+    ship = (base + np.arange(n_w * n_c)).reshape(n_p, n_w, n_c)
+    produce = base + n_w * n_c + np.arange(n_w)
+    inv = base + n_w * n_c + n_w + np.arange(n_w)
+
+    # demand rows: sum over warehouses of load * ship[t, :, c]
+    d_rows = np.broadcast_to((np.arange(n_p)[:, None] * n_c + np.arange(n_c))[:, None, :], ship.shape)
+    # balance rows: produce - sum_c load * ship - inv + previous inv
+    b_rows = n_p * n_c + np.arange(n_p)[:, None] * n_w + np.arange(n_w)
+    prev = b_rows[1:]
+    rows = np.concatenate([d_rows.ravel(),
+                           np.broadcast_to(b_rows[:, :, None], ship.shape).ravel(),
+                           b_rows.ravel(), b_rows.ravel(), prev.ravel()])
+    cols = np.concatenate([ship.ravel(), ship.ravel(), produce.ravel(), inv.ravel(), inv[:-1].ravel()])
+    vals = np.concatenate([np.full(ship.size, data.load), np.full(ship.size, -data.load), np.ones(produce.size),
+                           -np.ones(inv.size), np.ones(prev.size)])
+    n_rows = n_p * (n_c + n_w)
+    demand = data.demand[start:stop]
+    rhs = np.zeros((n_p, n_w))
+    rhs[0] = -np.asarray(inventory, dtype=float)
+    row_lower = np.concatenate([demand.ravel(), rhs.ravel()])
+    row_upper = np.concatenate([np.full(demand.size, np.inf), rhs.ravel()])
+    if stock_floor is not None:
+        k = n_p - 1 if floor_period is None else floor_period
+        rows = np.concatenate([rows, np.full(n_w, n_rows)])
+        cols = np.concatenate([cols, inv[k]])
+        vals = np.concatenate([vals, np.ones(n_w)])
+        row_lower = np.append(row_lower, stock_floor)
+        row_upper = np.append(row_upper, np.inf)
+        n_rows += 1
+    A = sp.csr_matrix((vals, (rows, cols)), shape=(n_rows, n_p * block))
+
+    c = np.concatenate([np.broadcast_to(data.cost.ravel(), (n_p, n_w * n_c)),
+                        data.prod_cost[start:stop],
+                        np.broadcast_to(data.hold_cost, (n_p, n_w))], axis=1).ravel()
+    col_upper = np.concatenate([np.full((n_p, n_w * n_c), np.inf),
+                                data.prod_cap[start:stop],
+                                np.broadcast_to(data.storage, (n_p, n_w))], axis=1).ravel()
+    integrality = np.zeros(n_p * block, dtype=np.int8)
+    integrality[ship.ravel()] = 1
+    return make_model(c, A, row_lower, row_upper, col_upper=col_upper,
+                      integrality=integrality, sense=MINIMIZE)
+
+
+def split_window(x, n_periods, n_w, n_c):
+    """ship (periods x w x c), produce (periods x w), inv (periods x w) from a window solution."""
+    x = x.reshape(n_periods, n_w * n_c + 2 * n_w)
+    return (x[:, :n_w * n_c].reshape(n_periods, n_w, n_c),
+            x[:, n_w * n_c:n_w * n_c + n_w],
+            x[:, n_w * n_c + n_w:])
+
+
+def _labels(data):
+    T = data.demand.shape[0]
+    n_w, n_c = data.cost.shape
+    return (data.periods if data.periods is not None else [str(t + 1) for t in range(T)],
+            data.warehouses if data.warehouses is not None else ["W%d" % w for w in range(n_w)],
+            data.customers if data.customers is not None else ["C%d" % c for c in range(n_c)])
+
+
+def _write_plan(f, data, start, ship, produce, inv):
+    # long format: period, warehouse, item, quantity; item is a customer for
+    # shipments, or "produce" / "inventory"
+    periods, warehouses, customers = _labels(data)
+    for k in range(ship.shape[0]):
+        t = periods[start + k]
+        for w, c in zip(*np.nonzero(ship[k])):
+            f.write("%s,%s,%s,%g\n" % (t, warehouses[w], customers[c], ship[k, w, c]))
+        for w in range(ship.shape[1]):
+            f.write("%s,%s,produce,%g\n" % (t, warehouses[w], produce[k, w]))
+            f.write("%s,%s,inventory,%g\n" % (t, warehouses[w], inv[k, w]))
+    f.flush()
+
+
+## 2. ROLLING HORIZON
+#--------------------
+
+def rolling_horizon(data, window=8, step=4, out=None, time_limit=None, mip_rel_gap=None,
+                    verbose=False):
+    """Solve the plan in overlapping windows, committing `step` periods at a time.
+
+    If out is a path, the committed plan is streamed to it as CSV. Raises
+    ValueError when a window has no feasible plan.
+    """
+    if not 1 <= step <= window:
+        raise ValueError("need 1 <= step <= window")
+    T = data.demand.shape[0]
+    n_w, n_c = data.cost.shape
+    inventory = np.asarray(data.initial_inventory, dtype=float)
+    objective = 0.0
+    history = []
+    need = stock_targets(data)
+
+    f = open(out, "w") if out is not None else None
+    try:
+        if f is not None:
+            f.write("period,warehouse,item,quantity\n")
+        start = 0
+        while start < T:
+            stop = min(start + window, T)
+            # the last window commits everything it covers
+            commit = stop - start if stop == T else step
+            tic = time.perf_counter()
+            # the floor only binds the stock handed over to the next window
+            floor = need[start + commit] if stop < T else None
+            model = build_window(data, start, stop, inventory, floor, commit - 1)
+            sol = solve_arrays(model, time_limit=time_limit, mip_rel_gap=mip_rel_gap)
+            if sol.x is None:
+                raise ValueError("no feasible plan for periods %d-%d" % (start, stop - 1))
+
+            ship, produce, inv = split_window(np.round(sol.x, 6), stop - start, n_w, n_c)
+            ship, produce, inv = ship[:commit], produce[:commit], inv[:commit]
+            objective += ((ship * data.cost).sum() + (produce * data.prod_cost[start:start + commit]).sum()
+                          + (inv * data.hold_cost).sum())
+            inventory = inv[-1]
+            if f is not None:
+                _write_plan(f, data, start, ship, produce, inv)
+
+            history.append((start, stop, model.c.shape[0], time.perf_counter() - tic))
+            if verbose:
+                print("periods {:>4}-{:<4} {:>7} columns {:>7.3f}s".format(start, stop - 1, *history[-1][2:]))
+            start += commit
+    finally:
+        if f is not None:
+            f.close()
+
+    return RollingResult(objective, len(history), inventory, history)
+
+
+def monolithic_plan(data, time_limit=None, mip_rel_gap=None):
+    """The whole horizon as one integer model."""
+    return solve_arrays(build_window(data, 0, data.demand.shape[0], data.initial_inventory),
+                        time_limit=time_limit, mip_rel_gap=mip_rel_gap)
+
+
+def random_plan_instance(n_periods, n_w=2, n_c=4, load=10.0, seed=0):
+    # seasonal demand and production cost, capacity that cannot follow the
+    # peaks on its own, so stock has to be built ahead of them
+    rng = np.random.default_rng(seed)
+    season = 1.0 - 0.4 * np.cos(2 * np.pi * np.arange(n_periods) / 26.0)
+    demand = np.round(rng.uniform(20, 60, n_c) * season[:, None] * rng.uniform(0.9, 1.1, (n_periods, n_c)))
+    base_cap = 1.15 * (np.ceil(demand / load) * load).sum(axis=1).mean() / n_w
+    prod_cap = np.round(np.full((n_periods, n_w), base_cap) * rng.uniform(0.9, 1.1, (n_periods, n_w)))
+    prod_cost = np.round(rng.uniform(80, 120, n_w) * (1.0 + 0.2 * season[:, None]), 1)
+    data = TransportPlanData(cost=rng.integers(200, 300, (n_w, n_c)).astype(float),
+                             demand=demand, prod_cap=prod_cap, prod_cost=prod_cost,
+                             hold_cost=np.full(n_w, 4.0), storage=np.full(n_w, 4 * base_cap),
+                             initial_inventory=np.zeros(n_w), load=load)
+    # start with whatever stock a short horizon ending on a peak needs
+    return data._replace(initial_inventory=np.full(n_w, np.ceil(stock_targets(data)[0] / n_w)))
+
+
+def benchmark_horizon(horizons=(13, 26, 52), n_w=3, n_c=20, window=8, step=4, time_limit=60):
+    # about 40 s at the defaults; longer horizons and more lanes take minutes
+    print("{:>8} {:>14} {:>9} {:>14} {:>9} {:>8}".format(
+        "periods", "monolithic", "s", "rolling", "s", "gap"))
+    for T in horizons:
+        data = random_plan_instance(T, n_w, n_c)
+        start = time.perf_counter()
+        full = monolithic_plan(data, time_limit=time_limit)
+        t_full = time.perf_counter() - start
+        start = time.perf_counter()
+        res = rolling_horizon(data, window=window, step=step)
+        t_roll = time.perf_counter() - start
+        full_obj = full.objective if full.x is not None else np.nan
+        print("{:>8} {:>14.0f} {:>9.2f} {:>14.0f} {:>9.2f} {:>8.3%}".format(
+            T, full_obj, t_full, res.objective, t_roll, (res.objective - full_obj) / full_obj))
+
+
+if __name__ == "__main__":
+
+    import os
+    import tempfile
+
+    # the lanes of OptimizationBasics.py section 3, with illustrative demand,
+    # production capacity and costs added
+    warehouse = ['New York', 'Atlanta']
+    customers = ['East', 'South', 'Midwest', 'West']
+    months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+    costs = np.array([[211, 232, 240, 300],
+                      [232, 212, 230, 280]], dtype=float)
+    demand = np.array([[50, 40, 30, 20]]) * (1.0 + 0.5 * np.sin(np.arange(12) / 12 * 2 * np.pi))[:, None]
+    data = TransportPlanData(cost=costs, demand=np.round(demand),
+                             prod_cap=np.full((12, 2), 90.0), prod_cost=np.full((12, 2), 100.0),
+                             hold_cost=np.array([5.0, 4.0]), storage=np.array([200.0, 200.0]),
+                             initial_inventory=np.array([20.0, 20.0]),
+                             periods=months, warehouses=warehouse, customers=customers)
+
+    out = os.path.join(tempfile.mkdtemp(), "transport_plan.csv")
+    res = rolling_horizon(data, window=4, step=2, out=out, verbose=True)
+    print("rolling horizon: ", res.objective, " monolithic: ", monolithic_plan(data).objective)
+    with open(out) as f:
+        print("".join(f.readlines()[:8]))
+
+    # windows without lookahead (step == window) must stay feasible too
+    data = random_plan_instance(20, 2, 4)
+    full = monolithic_plan(data).objective
+    for window, step in ((4, 4), (8, 8), (20, 20), (8, 4)):
+        res = rolling_horizon(data, window=window, step=step)
+        print("window {:>2} step {:>2}: {:>10.1f}  monolithic {:>10.1f}".format(
+            window, step, res.objective, full))
+
+    benchmark_horizon()
@@ -220,6 +220,9 @@ for i in range(len(products)):
     plt.xlabel("Value of decision variable")
     plt.show()
 
+# for large runs (thousands of scenarios over a process pool, seeded per block)
+# see monte_carlo() in MonteCarloSimulation.py
+
 
 
 
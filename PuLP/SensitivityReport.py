@@ -0,0 +1,104 @@
+### SENSITIVITY REPORT
+#---------------------
+
+# LRV - Chapter 5.py gets ranging by asking GLPK to write sensitivity.sen
+# to disk, and SensitivityAndSimulationPuLP.py only looks at c.pi and
+# c.slack. sensitivity_report() solves an LP once with HiGHS and reads the
+# full ranging information off the optimal basis:
+#
+#  > variables:   value, reduced cost, objective coefficient range
+#  > constraints: shadow price, slack, right-hand-side range
+#
+# Within a coefficient range the optimal solution stays the same; within a
+# right-hand-side range the shadow prices stay the same. Everything comes
+# back as NumPy arrays aligned with model.variables() / model.constraints.
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import pulp as plp
+
+import SparseModel as sm
+
+
+SensitivityReport = namedtuple("SensitivityReport",
+                               ["objective", "col_names", "value", "reduced_cost",
+                                "cost_lower", "cost_upper",
+                                "row_names", "shadow_price", "slack",
+                                "rhs_lower", "rhs_upper"])
+
+
+def sensitivity_report(model):
+    """Solve an LP (LpProblem or ModelArrays) and return its ranging report."""
+    if sm.highspy is None:
+        raise ImportError("sensitivity_report needs highspy for basis ranging")
+    if isinstance(model, plp.LpProblem):
+        model = sm.model_to_arrays(model)
+    if model.integrality.any():
+        raise ValueError("ranging is only defined for LPs, the model has integer variables")
+
+    h = sm.to_highs(model)
+    h.run()
+    if sm.highs_status(h) != plp.LpStatusOptimal:
+        raise ValueError("model is not optimal: " + plp.LpStatus[sm.highs_status(h)])
+    sol = sm.highs_solution(h)
+    _, ranging = h.getRanging()
+    basis = h.getBasis()
+
+    n, m = model.c.shape[0], model.A.shape[0]
+    cost_lower = np.array(ranging.col_cost_dn.value_[:n])
+    cost_upper = np.array(ranging.col_cost_up.value_[:n])
+    rhs_lower = np.array(ranging.row_bound_dn.value_[:m])
+    rhs_upper = np.array(ranging.row_bound_up.value_[:m])
+
+    # a basic (non-binding) row keeps its shadow price of 0 until the rhs
+    # reaches the row activity; HiGHS reports activity ranging for those rows
+    activity = sol.row_activity
+    basic = np.array([s == sm.highspy.HighsBasisStatus.kBasic for s in basis.row_status])
+    le = basic & np.isneginf(model.row_lower)
+    ge = basic & np.isposinf(model.row_upper)
+    rhs_lower[le], rhs_upper[le] = activity[le], np.inf
+    rhs_lower[ge], rhs_upper[ge] = -np.inf, activity[ge]
+
+    # slack as PuLP reports it: rhs - activity
+    rhs = np.where(np.isneginf(model.row_lower), model.row_upper, model.row_lower)
+    slack = rhs - activity
+
+    return SensitivityReport(sol.objective, sm.column_names(model), sol.x, sol.col_dual,
+                             cost_lower, cost_upper,
+                             sm.row_names(model), sol.row_dual, slack,
+                             rhs_lower, rhs_upper)
+
+
+def variables_frame(report):
+    return pd.DataFrame({'value': report.value,
+                         'reduced cost': report.reduced_cost,
+                         'cost lower': report.cost_lower,
+                         'cost upper': report.cost_upper},
+                        index=report.col_names)
+
+
+def constraints_frame(report):
+    return pd.DataFrame({'shadow price': report.shadow_price,
+                         'slack': report.slack,
+                         'rhs lower': report.rhs_lower,
+                         'rhs upper': report.rhs_upper},
+                        index=report.row_names)
+
+
+if __name__ == "__main__":
+
+    # exercise 5.4 of LRV - Chapter 5.py
+    model = plp.LpProblem("Maximization", plp.LpMaximize)
+    x1 = plp.LpVariable("x1", lowBound=0)
+    x2 = plp.LpVariable("x2", lowBound=0)
+    model += x1 + 3*x2
+    model += x1 + x2 <= 8, "resource 1"
+    model += -x1 + x2 <= 4, "resource 2"
+    model += x1 <= 6, "resource 3"
+
+    report = sensitivity_report(model)
+    print("objective function: " + str(report.objective))
+    print(variables_frame(report))
+    print(constraints_frame(report))
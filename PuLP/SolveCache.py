@@ -0,0 +1,300 @@
+### SOLUTION CACHE
+#-----------------
+
+# Sensitivity runs and Monte Carlo loops (SensitivityAndSimulationPuLP.py)
+# solve the same model over and over: a scenario draw that repeats, a
+# parameter sweep that is re-run after a plotting change. SolveCache stores
+# every solution under a fingerprint of the model itself:
+#
+#  > the fingerprint is a SHA-256 over the canonical arrays of the model
+#    (CSR matrix with sorted indices, bounds, objective, integrality, sense),
+#    so it does not depend on how or when the model was built
+#  > optionally coefficients are rounded first (decimals=...), so nearly
+#    identical scenarios share one entry
+#  > values, duals, activities and the status are kept on disk as .npz
+#    files, plus a small in-memory layer; least recently used entries are
+#    evicted beyond max_entries
+#
+# Plug it in where model.solve() is called:
+#
+#     cache = SolveCache()
+#     model.solve(CachedSolver(InProcessSolver(), cache))
+#     print(cache.stats())
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np
+import scipy.sparse as sp
+import pulp as plp
+
+import SparseModel as sm
+from InProcessSolver import InProcessSolver, assign_solution
+
+
+# a time-limited or failed solve says nothing about the model, only final
+# answers are stored
+CACHED_STATUS = (plp.LpStatusOptimal, plp.LpStatusInfeasible, plp.LpStatusUnbounded)
+
+# PuLP reports a time-limited MIP with an incumbent as LpStatusOptimal; only
+# its sol_status tells the proven optimum apart
+CACHED_SOL_STATUS = (plp.LpSolutionOptimal, plp.LpSolutionInfeasible, plp.LpSolutionUnbounded)
+
+
+def _canonical(values, decimals):
+    values = np.asarray(values, dtype=float)
+    if decimals is not None:
+        values = np.round(values, decimals)
+    # -0.0 and 0.0 must hash the same
+    return np.ascontiguousarray(values + 0.0)
+
+
+def fingerprint(model, decimals=None, extra=None):
+    """SHA-256 hex digest of a ModelArrays instance (names are not part of it).
+
+    extra is any JSON-serialisable value that also changes the answer, e.g.
+    the solver and its options.
+    """
+    A = sp.csr_matrix(model.A, dtype=float, copy=True)
+    A.sum_duplicates()
+    A.data = _canonical(A.data, decimals)
+    A.eliminate_zeros()
+    A.sort_indices()
+
+    h = hashlib.sha256()
+    h.update(json.dumps([A.shape, int(model.sense), extra], default=str).encode())
+    h.update(A.indptr.astype(np.int64).tobytes())
+    h.update(A.indices.astype(np.int64).tobytes())
+    for values in (A.data, model.c, model.row_lower, model.row_upper,
+                   model.col_lower, model.col_upper, [model.offset]):
+        h.update(_canonical(values, decimals).tobytes())
+    h.update(np.asarray(model.integrality, dtype=np.int8).tobytes())
+    return h.hexdigest()
+
+
+class SolveCache:
+    """Content-addressed store of ArraySolutions, on disk with an in-memory LRU layer."""
+
+    def __init__(self, path=".solve_cache", max_entries=10000, memory_entries=256, decimals=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.decimals = decimals
+        self._memory = OrderedDict()
+        self._stats = {"hits": 0, "memory_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        # running number of files on disk; the directory is only scanned
+        # again when it passes max_entries
+        self._count = 0
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            self._count = sum(1 for e in os.scandir(path) if e.name.endswith(".npz"))
+
+    def key(self, model, extra=None):
+        return fingerprint(model, self.decimals, extra)
+
+    def _file(self, key):
+        return os.path.join(self.path, key + ".npz")
+
+    def _remember(self, key, sol):
+        self._memory[key] = sol
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """The cached ArraySolution for a fingerprint, or None."""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self._stats["hits"] += 1
+            self._stats["memory_hits"] += 1
+            return self._memory[key]
+
+        sol = None
+        if self.path is not None:
+            try:
+                with np.load(self._file(key)) as f:
+                    sol = sm.ArraySolution(int(f["status"]),
+                                           float(f["objective"]) if "objective" in f else None,
+                                           *(f[k] if k in f else None
+                                             for k in ("x", "row_dual", "col_dual", "row_activity")))
+                # the file's mtime is its position in the LRU order
+                os.utime(self._file(key))
+            except (OSError, KeyError, ValueError):
+                sol = None
+        if sol is None:
+            self._stats["misses"] += 1
+            return None
+        self._stats["hits"] += 1
+        self._remember(key, sol)
+        return sol
+
+    def put(self, key, sol):
+        if sol.status not in CACHED_STATUS:
+            return
+        self._remember(key, sol)
+        self._stats["stores"] += 1
+        if self.path is None:
+            return
+        arrays = {"status": sol.status}
+        if sol.objective is not None:
+            arrays["objective"] = sol.objective
+        for k in ("x", "row_dual", "col_dual", "row_activity"):
+            if getattr(sol, k) is not None:
+                arrays[k] = getattr(sol, k)
+        # write then rename, so a concurrent reader never sees half a file
+        tmp = self._file(key) + ".%d.tmp" % os.getpid()
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        if not os.path.exists(self._file(key)):
+            self._count += 1
+        os.replace(tmp, self._file(key))
+        if self._count > self.max_entries:
+            self._evict()
+
+    def _evict(self):
+        # other processes may share the directory, so the count is refreshed here
+        entries = [e for e in os.scandir(self.path) if e.name.endswith(".npz")]
+        self._count = len(entries)
+        if len(entries) <= self.max_entries:
+            return
+        # go a tenth below the limit, so a full cache is not rescanned on every put
+        keep = self.max_entries - self.max_entries // 10
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for e in entries[:len(entries) - keep]:
+            try:
+                os.remove(e.path)
+                self._count -= 1
+                self._memory.pop(e.name[:-4], None)
+                self._stats["evictions"] += 1
+            except OSError:
+                pass
+
+    def solve(self, model, **kwargs):
+        """solve_arrays() through the cache; kwargs are part of the key."""
+        key = self.key(model, extra=["solve_arrays", sorted(kwargs.items())])
+        sol = self.get(key)
+        if sol is None:
+            sol = sm.solve_arrays(model, **kwargs)
+            self.put(key, sol)
+        return sol
+
+    def stats(self):
+        stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        self._memory.clear()
+        if self.path is not None:
+            for e in os.scandir(self.path):
+                if e.name.endswith(".npz"):
+                    os.remove(e.path)
+            self._count = 0
+
+
+def read_solution(lp, arrays):
+    """The solution a PuLP solver left on lp, as an ArraySolution aligned with arrays."""
+    variables = lp.variables()
+    constraints = list(lp.constraints.values())
+    if lp.status not in CACHED_STATUS or lp.sol_status not in CACHED_SOL_STATUS:
+        # put() does not store a status 0 entry
+        return sm.ArraySolution(plp.LpStatusNotSolved, None, None)
+    if any(v.varValue is None for v in variables):
+        return sm.ArraySolution(lp.status, None, None)
+    x = np.array([v.varValue for v in variables], dtype=float)
+    col_dual = [v.dj for v in variables]
+    row_dual = [c.pi for c in constraints]
+    # MIP solvers leave dj/pi unset
+    col_dual = None if None in col_dual else np.array(col_dual, dtype=float)
+    row_dual = None if None in row_dual else np.array(row_dual, dtype=float)
+    return sm.ArraySolution(lp.status, plp.value(lp.objective), x, row_dual, col_dual, arrays.A @ x)
+
+
+def solver_key(solver):
+    """The settings of a PuLP solver that can change its answer, as a JSON-able list."""
+    options = dict(getattr(solver, "optionsDict", None) or {})
+    for attr in ("gapRel", "gapAbs"):
+        if getattr(solver, attr, None) is not None:
+            options[attr] = getattr(solver, attr)
+    return [solver.name, solver.mip, solver.timeLimit, sorted(options.items()),
+            list(solver.options or [])]
+
+
+class CachedSolver(plp.LpSolver):
+    """PuLP solver that answers from a SolveCache and otherwise delegates to `solver`."""
+
+    name = "CachedSolver"
+
+    # same hook as InProcessSolver.phase_hook
+    phase_hook = None
+
+    def __init__(self, solver=None, cache=None, **kwargs):
+        plp.LpSolver.__init__(self, **kwargs)
+        self.solver = InProcessSolver() if solver is None else solver
+        self.cache = SolveCache() if cache is None else cache
+
+    def available(self):
+        return self.solver.available()
+
+    def actualSolve(self, lp):
+        arrays = sm.model_to_arrays(lp)
+        if not self.solver.mip:
+            arrays = arrays._replace(integrality=np.zeros_like(arrays.integrality))
+        # the same model under another solver, gap or time limit may have
+        # another answer
+        key = self.cache.key(arrays, extra=solver_key(self.solver))
+        if self.phase_hook is not None:
+            self.phase_hook("written")
+        sol = self.cache.get(key)
+        if sol is not None:
+            if self.phase_hook is not None:
+                self.phase_hook("read")
+            assign_solution(lp, arrays, sol)
+            return sol.status
+
+        status = self.solver.actualSolve(lp)
+        self.cache.put(key, read_solution(lp, arrays))
+        return status
+
+
+if __name__ == "__main__":
+
+    import tempfile
+    import time
+
+    from MonteCarloSimulation import profit_model, BASE_PROFIT, NOISE_SD
+
+    # the simulation of SensitivityAndSimulationPuLP.py section 4, with the
+    # noisy coefficients rounded to tens of dollars: many draws repeat
+    rng = np.random.default_rng(0)
+    draws = np.round(BASE_PROFIT + rng.normal(0, NOISE_SD, size=(500, 3)), -1)
+
+    def run(solver):
+        objectives = []
+        for c in draws:
+            model = profit_model()
+            A, B, C = sorted(model.variables(), key=lambda v: v.name)
+            model.setObjective(c[0] * A + c[1] * B + c[2] * C)
+            model.solve(solver)
+            objectives.append(plp.value(model.objective))
+        return np.array(objectives)
+
+    cache = SolveCache(os.path.join(tempfile.mkdtemp(), "solve_cache"), max_entries=1000)
+    for label, solver in (("CBC", plp.PULP_CBC_CMD(msg=0)),
+                          ("CBC + cache", CachedSolver(plp.PULP_CBC_CMD(msg=0), cache)),
+                          ("CBC + warm cache", CachedSolver(plp.PULP_CBC_CMD(msg=0), cache))):
+        start = time.perf_counter()
+        objectives = run(solver)
+        print("{:<18} {:>7.3f}s  mean objective {:.2f}".format(label, time.perf_counter() - start,
+                                                               objectives.mean()))
+    print(cache.stats())
+
+    # duals and slacks come back from the cache like from the solver
+    model = profit_model()
+    model.solve(CachedSolver(plp.PULP_CBC_CMD(msg=0), cache))
+    model.solve(CachedSolver(plp.PULP_CBC_CMD(msg=0), cache))
+    for name, c in model.constraints.items():
+        print(name, c.pi, c.slack)
@@ -132,3 +132,10 @@ f.close()
 model.writeLP("validationLP.lp")
 model.writeLP("validationLP.csv")
 
+# for large models the text files are slow to write and to read back;
+# ModelStore keeps a binary copy that loads in milliseconds and can be
+# summarised, diffed against another version or exported to MPS
+import ModelStore
+ModelStore.save_model(model, "validationModel")
+print(ModelStore.describe("validationModel"))
+
@@ -0,0 +1,295 @@
+### SPARSE MATRIX MODELS
+#-----------------------
+
+# A model stored as plain arrays instead of PuLP objects:
+#
+#   min/max   c @ x
+#   s.t.      row_lower <= A @ x <= row_upper
+#             col_lower <= x <= col_upper
+#             x[j] integer where integrality[j] == 1
+#
+# A is a scipy.sparse CSR matrix. Nothing here creates LpVariable or
+# LpAffineExpression objects, so building and writing a model costs
+# O(nonzeros) in NumPy instead of O(nonzeros) Python objects.
+
+from collections import namedtuple
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.optimize import milp, LinearConstraint, Bounds
+import pulp as plp
+
+# highspy is optional: without it models are solved through scipy.optimize
+try:
+    import highspy
+except ImportError:
+    highspy = None
+
+
+ModelArrays = namedtuple("ModelArrays",
+                         ["c", "A", "row_lower", "row_upper",
+                          "col_lower", "col_upper", "integrality",
+                          "sense", "col_names", "row_names", "offset"],
+                         defaults=(None, None, 0.0))
+
+# row_dual/col_dual (shadow prices and reduced costs) and row_activity are
+# only filled in by solvers that report them
+ArraySolution = namedtuple("ArraySolution",
+                           ["status", "objective", "x",
+                            "row_dual", "col_dual", "row_activity"],
+                           defaults=(None, None, None))
+
+# same sense convention as PuLP (plp.LpMinimize == 1, plp.LpMaximize == -1)
+MINIMIZE = 1
+MAXIMIZE = -1
+
+
+def make_model(c, A, row_lower, row_upper, col_lower=None, col_upper=None,
+               integrality=None, sense=MINIMIZE, col_names=None, row_names=None,
+               offset=0.0):
+    """Normalise the inputs of a sparse model into a ModelArrays tuple."""
+    c = np.asarray(c, dtype=float)
+    A = sp.csr_matrix(A, dtype=float)
+    n = c.shape[0]
+    if col_lower is None:
+        col_lower = np.zeros(n)
+    if col_upper is None:
+        col_upper = np.full(n, np.inf)
+    if integrality is None:
+        integrality = np.zeros(n, dtype=np.int8)
+    return ModelArrays(c, A,
+                       np.asarray(row_lower, dtype=float),
+                       np.asarray(row_upper, dtype=float),
+                       np.broadcast_to(np.asarray(col_lower, dtype=float), (n,)).copy(),
+                       np.broadcast_to(np.asarray(col_upper, dtype=float), (n,)).copy(),
+                       np.asarray(integrality, dtype=np.int8),
+                       sense, col_names, row_names, float(offset))
+
+
+def column_names(model):
+    if model.col_names is not None:
+        return list(model.col_names)
+    return ["C%d" % j for j in range(model.c.shape[0])]
+
+
+def row_names(model):
+    if model.row_names is not None:
+        return list(model.row_names)
+    return ["R%d" % i for i in range(model.A.shape[0])]
+
+
+def model_to_arrays(model):
+    """Extract the matrix form of a plp.LpProblem.
+
+    Columns follow model.variables(), rows follow model.constraints.
+    """
+    variables = model.variables()
+    index = {v.name: j for j, v in enumerate(variables)}
+    n = len(variables)
+
+    c = np.zeros(n)
+    offset = 0.0
+    if model.objective is not None:
+        for v, coef in model.objective.items():
+            c[index[v.name]] = coef
+        offset = model.objective.constant
+
+    rows, cols, vals = [], [], []
+    m = len(model.constraints)
+    lower = np.full(m, -np.inf)
+    upper = np.full(m, np.inf)
+    for i, con in enumerate(model.constraints.values()):
+        for v, coef in con.items():
+            rows.append(i)
+            cols.append(index[v.name])
+            vals.append(coef)
+        rhs = -con.constant
+        if con.sense != plp.LpConstraintLE:
+            lower[i] = rhs
+        if con.sense != plp.LpConstraintGE:
+            upper[i] = rhs
+
+    A = sp.csr_matrix((vals, (rows, cols)), shape=(m, n))
+    col_lower = np.array([-np.inf if v.lowBound is None else v.lowBound for v in variables], dtype=float)
+    col_upper = np.array([np.inf if v.upBound is None else v.upBound for v in variables], dtype=float)
+    integrality = np.array([v.cat == plp.LpInteger for v in variables], dtype=np.int8)
+
+    return make_model(c, A, lower, upper, col_lower, col_upper, integrality,
+                      sense=model.sense,
+                      col_names=[v.name for v in variables],
+                      row_names=list(model.constraints.keys()),
+                      offset=offset)
+
+
+## 1. SOLVE DIRECTLY FROM THE MATRIX
+#-----------------------------------
+
+# scipy ships HiGHS, so the matrix goes to the solver in memory without any
+# LP/MPS file or solver subprocess. Status codes follow plp.LpStatus.
+
+def solve_arrays(model, time_limit=None, mip_rel_gap=None):
+    """Solve a ModelArrays instance with HiGHS through scipy.optimize.milp."""
+    options = {}
+    if time_limit is not None:
+        options["time_limit"] = time_limit
+    if mip_rel_gap is not None:
+        options["mip_rel_gap"] = mip_rel_gap
+
+    constraints = []
+    if model.A.shape[0] > 0:
+        constraints.append(LinearConstraint(model.A, model.row_lower, model.row_upper))
+
+    res = milp(model.sense * model.c,
+               integrality=model.integrality,
+               bounds=Bounds(model.col_lower, model.col_upper),
+               constraints=constraints,
+               options=options)
+
+    # milp: 0 optimal, 1 iteration/time limit, 2 infeasible, 3 unbounded
+    status = {0: 1, 1: 0, 2: -1, 3: -2}.get(res.status, -3)
+    if res.x is None:
+        return ArraySolution(status, None, None)
+    return ArraySolution(status, model.sense * res.fun + model.offset, res.x)
+
+
+## 2. SOLVE THROUGH THE HIGHS LIBRARY
+#------------------------------------
+
+# With highspy the model lives inside a Highs object that can be modified
+# and re-solved, keeping the previous basis as a warm start.
+
+def to_highs(model):
+    """Load a ModelArrays instance into a new, silent highspy.Highs object."""
+    A = model.A.tocsc()
+    lp = highspy.HighsLp()
+    lp.num_col_ = A.shape[1]
+    lp.num_row_ = A.shape[0]
+    lp.col_cost_ = model.c
+    lp.col_lower_ = model.col_lower
+    lp.col_upper_ = model.col_upper
+    lp.row_lower_ = model.row_lower
+    lp.row_upper_ = model.row_upper
+    lp.offset_ = model.offset
+    lp.sense_ = highspy.ObjSense.kMaximize if model.sense == MAXIMIZE else highspy.ObjSense.kMinimize
+    lp.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+    lp.a_matrix_.start_ = A.indptr
+    lp.a_matrix_.index_ = A.indices
+    lp.a_matrix_.value_ = A.data
+    if model.integrality.any():
+        lp.integrality_ = [highspy.HighsVarType.kInteger if k else highspy.HighsVarType.kContinuous
+                           for k in model.integrality]
+
+    h = highspy.Highs()
+    h.setOptionValue("output_flag", False)
+    h.passModel(lp)
+    return h
+
+
+def highs_status(h):
+    status = h.getModelStatus()
+    if status == highspy.HighsModelStatus.kOptimal:
+        return 1
+    if status == highspy.HighsModelStatus.kInfeasible:
+        return -1
+    if status in (highspy.HighsModelStatus.kUnbounded,
+                  highspy.HighsModelStatus.kUnboundedOrInfeasible):
+        return -2
+    return 0
+
+
+def highs_solution(h):
+    """Read the solution of a solved Highs object into an ArraySolution."""
+    status = highs_status(h)
+    sol = h.getSolution()
+    if not sol.value_valid:
+        return ArraySolution(status, None, None)
+    x = np.array(sol.col_value)
+    row_dual = col_dual = None
+    if sol.dual_valid:
+        row_dual = np.array(sol.row_dual)
+        col_dual = np.array(sol.col_dual)
+    return ArraySolution(status, h.getInfo().objective_function_value, x,
+                         row_dual, col_dual, np.array(sol.row_value))
+
+
+## 3. STREAMING MPS WRITER
+#-------------------------
+
+# Writes free-format MPS column by column from the CSC form of A. Lines are
+# generated per column and flushed in blocks, so memory stays bounded by the
+# matrix itself rather than by a text copy of the whole model.
+
+def _row_types(model):
+    lo, up = model.row_lower, model.row_upper
+    types = np.full(lo.shape[0], "E", dtype="<U1")
+    types[np.isneginf(lo) & ~np.isposinf(up)] = "L"
+    types[~np.isneginf(lo) & np.isposinf(up)] = "G"
+    types[np.isneginf(lo) & np.isposinf(up)] = "N"
+    return types
+
+
+def write_mps(model, path, name="MODEL", block_size=100000):
+    """Write a ModelArrays instance to a free-format MPS file."""
+    cols = column_names(model)
+    rows = row_names(model)
+    types = _row_types(model)
+    lo, up = model.row_lower, model.row_upper
+    A = model.A.tocsc()
+    # MPS minimises, so a maximisation problem is written with negated costs
+    c = model.sense * model.c
+
+    with open(path, "w") as f:
+        f.write("NAME %s\n" % name)
+        f.write("ROWS\n N OBJ\n")
+        f.writelines(" %s %s\n" % (t, r) for t, r in zip(types, rows))
+
+        f.write("COLUMNS\n")
+        buf = []
+        in_int = False
+        for j in range(A.shape[1]):
+            is_int = bool(model.integrality[j])
+            if is_int != in_int:
+                buf.append(" MARKER 'MARKER' %s\n" % ("'INTORG'" if is_int else "'INTEND'"))
+                in_int = is_int
+            if c[j] != 0:
+                buf.append(" %s OBJ %.17g\n" % (cols[j], c[j]))
+            start, end = A.indptr[j], A.indptr[j + 1]
+            for i, v in zip(A.indices[start:end], A.data[start:end]):
+                buf.append(" %s %s %.17g\n" % (cols[j], rows[i], v))
+            if len(buf) >= block_size:
+                f.writelines(buf)
+                buf = []
+        if in_int:
+            buf.append(" MARKER 'MARKER' 'INTEND'\n")
+        f.writelines(buf)
+
+        f.write("RHS\n")
+        rhs = np.where(types == "G", lo, up)
+        rhs = np.where(types == "E", lo, rhs)
+        f.writelines(" RHS %s %.17g\n" % (rows[i], rhs[i])
+                     for i in np.flatnonzero((types != "N") & (rhs != 0)))
+
+        ranged = np.flatnonzero((types == "E") & (lo != up))
+        if ranged.size:
+            f.write("RANGES\n")
+            f.writelines(" RNG %s %.17g\n" % (rows[i], up[i] - lo[i]) for i in ranged)
+
+        f.write("BOUNDS\n")
+        for j in range(A.shape[1]):
+            l, u = model.col_lower[j], model.col_upper[j]
+            if model.integrality[j] and l == 0 and u == 1:
+                f.write(" BV BND %s\n" % cols[j])
+                continue
+            if l == u:
+                f.write(" FX BND %s %.17g\n" % (cols[j], l))
+                continue
+            if np.isneginf(l):
+                f.write(" MI BND %s\n" % cols[j])
+            elif l != 0:
+                f.write(" LO BND %s %.17g\n" % (cols[j], l))
+            if not np.isposinf(u):
+                f.write(" UP BND %s %.17g\n" % (cols[j], u))
+            elif model.integrality[j]:
+                # some readers default integer columns to [0, 1]
+                f.write(" PL BND %s\n" % cols[j])
+        f.write("ENDATA\n")
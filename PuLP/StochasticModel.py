@@ -0,0 +1,295 @@
+### SAMPLE AVERAGE APPROXIMATION: TWO-STAGE STOCHASTIC MODELS
+#-----------------------------------------------------------
+
+# The Monte Carlo section of SensitivityAndSimulationPuLP.py solves one LP
+# per noise draw and then counts which plan came up most often. A two-stage
+# model finds the one plan that is best on average over all draws:
+#
+#   max/min  c @ x + sum_k p[k] q[k] @ y[k]
+#   s.t.     row_lower <= A x <= row_upper                 (first stage)
+#            h_lower[k] <= T x + W y[k] <= h_upper[k]      (scenario k)
+#
+# x is shared (the A, B, C production plan), y[k] is the recourse of
+# scenario k. Three ways to solve it:
+#
+#  > extensive_form(): the deterministic equivalent as one sparse
+#    block-angular ModelArrays, built with Kronecker products in O(nonzeros)
+#  > reduce_scenarios(): fast forward selection (Heitsch & Roemisch) of a
+#    few representative scenarios that carry the probability of the others
+#  > progressive_hedging(): scenario subproblems with a penalty pulling
+#    every x[k] to the probability weighted mean, solved in parallel over a
+#    process pool; with highspy the penalty is the usual quadratic, without
+#    it an L1 penalty keeps the subproblems LPs
+#
+# T, W and the first stage are shared by all scenarios; q, h_lower and
+# h_upper vary per scenario.
+
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import scipy.sparse as sp
+
+import SparseModel as sm
+from SparseModel import make_model, solve_arrays, MAXIMIZE
+
+
+TwoStageModel = namedtuple("TwoStageModel",
+                           ["c", "A", "row_lower", "row_upper", "col_lower", "col_upper",
+                            "T", "W", "q", "h_lower", "h_upper", "y_lower", "y_upper",
+                            "probability", "sense"])
+
+# x: first-stage plan, y: (S, n2) recourse, bound: PH dual bound (None otherwise)
+StochasticResult = namedtuple("StochasticResult", ["objective", "x", "y", "iterations", "bound"])
+
+
+def n_scenarios(model):
+    return model.q.shape[0]
+
+
+def extensive_form(model):
+    """The deterministic equivalent as one block-angular ModelArrays.
+
+    Columns are [x | y[0] | ... | y[S-1]], rows [first stage | scenario 0 | ...].
+    """
+    S = n_scenarios(model)
+    A = sp.bmat([[sp.csr_matrix(model.A), None],
+                 [sp.kron(np.ones((S, 1)), model.T), sp.kron(sp.identity(S), model.W)]],
+                format="csr")
+    c = np.concatenate([model.c, (model.probability[:, None] * model.q).ravel()])
+    return make_model(c, A,
+                      np.concatenate([model.row_lower, model.h_lower.ravel()]),
+                      np.concatenate([model.row_upper, model.h_upper.ravel()]),
+                      col_lower=np.concatenate([model.col_lower, np.tile(model.y_lower, S)]),
+                      col_upper=np.concatenate([model.col_upper, np.tile(model.y_upper, S)]),
+                      sense=model.sense)
+
+
+def solve_extensive(model, time_limit=None):
+    sol = solve_arrays(extensive_form(model), time_limit=time_limit)
+    if sol.x is None:
+        raise ValueError("extensive form not solved (status %d)" % sol.status)
+    n1 = model.c.shape[0]
+    return StochasticResult(sol.objective, sol.x[:n1], sol.x[n1:].reshape(n_scenarios(model), -1),
+                            None, None)
+
+
+def evaluate(model, x):
+    """Expected objective of a fixed first-stage plan x (the recourse re-optimized)."""
+    ef = extensive_form(model)
+    n1 = model.c.shape[0]
+    lower, upper = ef.col_lower.copy(), ef.col_upper.copy()
+    lower[:n1] = upper[:n1] = x
+    sol = solve_arrays(ef._replace(col_lower=lower, col_upper=upper))
+    return np.nan if sol.objective is None else sol.objective
+
+
+## 1. SCENARIO REDUCTION
+#-----------------------
+
+def reduce_scenarios(model, n, scale=True):
+    """Keep n scenarios by fast forward selection; returns (model, kept indices).
+
+    Scenarios are compared on their data (q, h_lower, h_upper), each column
+    scaled to unit spread when scale is True. The probability of every
+    dropped scenario moves to its nearest kept one.
+    """
+    S = n_scenarios(model)
+    if n >= S:
+        return model, np.arange(S)
+    xi = np.hstack([model.q, model.h_lower, model.h_upper])
+    xi = np.where(np.isfinite(xi), xi, 0.0)
+    if scale:
+        spread = xi.std(axis=0)
+        xi = xi[:, spread > 0] / spread[spread > 0]
+    sq = (xi ** 2).sum(axis=1)
+    D = np.sqrt(np.maximum(sq[:, None] + sq[None, :] - 2 * xi @ xi.T, 0.0))
+    p = model.probability
+
+    nearest = np.full(S, np.inf)
+    selected = np.zeros(S, dtype=bool)
+    for _ in range(n):
+        # cost of the scenarios left out if u were selected next
+        cost = p @ np.minimum(nearest[:, None], D)
+        cost[selected] = np.inf
+        u = int(np.argmin(cost))
+        selected[u] = True
+        nearest = np.minimum(nearest, D[:, u])
+
+    kept = np.flatnonzero(selected)
+    owner = kept[np.argmin(D[:, kept], axis=1)]
+    probability = np.bincount(owner, weights=p, minlength=S)[kept]
+    return model._replace(q=model.q[kept], h_lower=model.h_lower[kept],
+                          h_upper=model.h_upper[kept], probability=probability), kept
+
+
+## 2. PROGRESSIVE HEDGING
+#------------------------
+
+def _scenario_arrays(model):
+    # the [x | y] matrix shared by all scenario subproblems
+    return sp.bmat([[sp.csr_matrix(model.A), None], [model.T, model.W]], format="csr")
+
+
+def _solve_prox(job):
+    # min (c + w) x + q y + rho/2 |x - xbar|^2 (or rho |x - xbar|_1) for a
+    # chunk of scenarios; all costs in minimization form
+    model, A, scenarios, w, xbar, rho = job
+    n1, n2 = model.c.shape[0], model.W.shape[1]
+    sign = -1.0 if model.sense == MAXIMIZE else 1.0
+    out = []
+    for k, wk in zip(scenarios, w):
+        c = np.concatenate([sign * model.c + wk, sign * model.q[k]])
+        lower = np.concatenate([model.row_lower, model.h_lower[k]])
+        upper = np.concatenate([model.row_upper, model.h_upper[k]])
+        col_lower = np.concatenate([model.col_lower, model.y_lower])
+        col_upper = np.concatenate([model.col_upper, model.y_upper])
+        if rho == 0:
+            sol = solve_arrays(make_model(c, A, lower, upper, col_lower, col_upper))
+        elif sm.highspy is not None:
+            h = sm.to_highs(make_model(c - rho * np.concatenate([xbar, np.zeros(n2)]), A,
+                                       lower, upper, col_lower, col_upper))
+            # rho/2 x'x on the first-stage columns (constant rho/2 xbar'xbar dropped)
+            n = n1 + n2
+            start = np.concatenate([np.arange(n1 + 1), np.full(n2, n1)])
+            h.passHessian(n, n1, sm.highspy.HessianFormat.kTriangular,
+                          start.astype(np.int32), np.arange(n1, dtype=np.int32), np.full(n1, rho))
+            h.run()
+            sol = sm.highs_solution(h)
+        else:
+            # L1 proximal term: t >= |x - xbar| with cost rho t
+            I = sp.identity(n1, format="csr")
+            Z = sp.csr_matrix((n1, n2))
+            A1 = sp.vstack([sp.hstack([A, sp.csr_matrix((A.shape[0], n1))]),
+                            sp.hstack([I, Z, I]), sp.hstack([-I, Z, I])], format="csr")
+            sol = solve_arrays(make_model(
+                np.concatenate([c, np.full(n1, rho)]), A1,
+                np.concatenate([lower, xbar, -xbar]),
+                np.concatenate([upper, np.full(2 * n1, np.inf)]),
+                np.concatenate([col_lower, np.zeros(n1)]),
+                np.concatenate([col_upper, np.full(n1, np.inf)])))
+        if sol.x is None:
+            raise ValueError("scenario %d subproblem not solved (status %d)" % (k, sol.status))
+        x, y = sol.x[:n1], sol.x[n1:n1 + n2]
+        out.append((x, y, float(c[:n1] @ x + c[n1:] @ y)))
+    return out
+
+
+def progressive_hedging(model, rho=None, tol=1e-4, max_iter=200, workers=1, verbose=False):
+    """Progressive hedging; returns the consensus plan, its evaluated objective and a bound.
+
+    rho defaults to a tenth of the mean absolute cost coefficient (first
+    stage and mean recourse costs).
+    """
+    S = n_scenarios(model)
+    n1 = model.c.shape[0]
+    p = model.probability / model.probability.sum()
+    sign = -1.0 if model.sense == MAXIMIZE else 1.0
+    A = _scenario_arrays(model)
+    if rho is None:
+        rho = max(np.abs(np.concatenate([model.c, model.q.mean(axis=0)])).mean() / 10, 1e-3)
+
+    chunks = np.array_split(np.arange(S), max(1, min(workers, S)))
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    def solve_all(w, xbar, rho):
+        jobs = [(model, A, idx, w[idx], xbar, rho) for idx in chunks]
+        parts = map(_solve_prox, jobs) if pool is None else pool.map(_solve_prox, jobs)
+        res = [r for part in parts for r in part]
+        return (np.array([r[0] for r in res]), np.array([r[1] for r in res]),
+                np.array([r[2] for r in res]))
+
+    try:
+        # iteration 0: every scenario on its own
+        w = np.zeros((S, n1))
+        X, Y, _ = solve_all(w, np.zeros(n1), 0.0)
+        xbar = p @ X
+        w += rho * (X - xbar)
+        for it in range(1, max_iter + 1):
+            X, Y, _ = solve_all(w, xbar, rho)
+            xbar = p @ X
+            gap = float(p @ np.abs(X - xbar).sum(axis=1))
+            w += rho * (X - xbar)
+            if verbose:
+                print("{:>4} {:>12.6f}".format(it, gap))
+            if gap < tol:
+                break
+        # sum_k p_k w_k = 0, so the scenario problems with the w penalty
+        # alone give a valid bound on the optimum
+        _, _, values = solve_all(w, xbar, 0.0)
+        bound = sign * float(p @ values)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return StochasticResult(evaluate(model, xbar), xbar, Y, it, bound)
+
+
+## 3. THE PROFIT MODEL OF SECTION 4
+#----------------------------------
+
+BASE_PROFIT = np.array([500.0, 450.0, 600.0])
+
+
+def profit_two_stage(n, noise_sd=25.0, demand_mean=8.0, demand_sd=2.0, seed=0):
+    """Produce A, B, C now (hours and floor space), sell later.
+
+    Per scenario the unit profits carry N(0, noise_sd) noise as in
+    run_optimization(), and the demand of A (constraint C3, 8 units) is
+    N(demand_mean, demand_sd). Sales y[k] <= production x and y_A[k] <= demand.
+    With one scenario and no noise this is the model of section 1.
+    """
+    rng = np.random.default_rng(seed)
+    q = BASE_PROFIT + rng.normal(0, noise_sd, (n, 3))
+    demand = np.maximum(rng.normal(demand_mean, demand_sd, n), 0.0)
+    # recourse rows: y - x <= 0 (3 rows), y_A <= demand
+    T = sp.csr_matrix(np.vstack([-np.eye(3), np.zeros((1, 3))]))
+    W = sp.csr_matrix(np.vstack([np.eye(3), [1.0, 0.0, 0.0]]))
+    h_upper = np.column_stack([np.zeros((n, 3)), demand])
+    return TwoStageModel(c=np.zeros(3),
+                         A=sp.csr_matrix([[6.0, 5.0, 8.0], [10.5, 20.0, 10.0]]),
+                         row_lower=np.full(2, -np.inf), row_upper=np.array([60.0, 150.0]),
+                         col_lower=np.zeros(3), col_upper=np.full(3, np.inf),
+                         T=T, W=W, q=q, h_lower=np.full((n, 4), -np.inf), h_upper=h_upper,
+                         y_lower=np.zeros(3), y_upper=np.full(3, np.inf),
+                         probability=np.full(n, 1.0 / n), sense=MAXIMIZE)
+
+
+if __name__ == "__main__":
+
+    model = profit_two_stage(1000)
+
+    # one plan over all 1000 scenarios
+    start = time.perf_counter()
+    res = solve_extensive(model)
+    t_ef = time.perf_counter() - start
+    ef = extensive_form(model)
+    print("extensive form: {} x {}, {} nonzeros, {:.2f}s".format(*ef.A.shape, ef.A.nnz, t_ef))
+    print("SAA plan A, B, C =", np.round(res.x, 3), " expected profit {:.2f}".format(res.objective))
+
+    # the plans of section 4: one LP per draw, then the most frequent plan
+    plans = np.array([solve_arrays(make_model(model.q[k], model.A,
+                                              model.row_lower, model.row_upper,
+                                              col_upper=[model.h_upper[k, 3], np.inf, np.inf],
+                                              sense=MAXIMIZE)).x
+                      for k in range(n_scenarios(model))])
+    _, first, counts = np.unique(plans.round(6), axis=0, return_index=True, return_counts=True)
+    voted = plans[first[np.argmax(counts)]]
+    print("voted plan A, B, C =", np.round(voted, 3),
+          " expected profit {:.2f}".format(evaluate(model, voted)))
+
+    # 50 representative scenarios
+    start = time.perf_counter()
+    small, kept = reduce_scenarios(model, 50)
+    res50 = solve_extensive(small)
+    print("reduced to 50 scenarios ({:.2f}s): plan {}, profit on all 1000: {:.2f}".format(
+        time.perf_counter() - start, np.round(res50.x, 3), evaluate(model, res50.x)))
+
+    # progressive hedging over a process pool
+    for workers in (1, 2):
+        start = time.perf_counter()
+        ph = progressive_hedging(profit_two_stage(200), workers=workers)
+        print("PH on 200 scenarios, {} worker(s): {} iterations, {:.1f}s, plan {}, "
+              "profit {:.2f}, bound {:.2f}".format(workers, ph.iterations, time.perf_counter() - start,
+                                                   np.round(ph.x, 3), ph.objective, ph.bound))
+    print("extensive form on the same 200:", round(solve_extensive(profit_two_stage(200)).objective, 2))
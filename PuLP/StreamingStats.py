@@ -0,0 +1,360 @@
+### STREAMING STATISTICS FOR MONTE CARLO OUTPUT
+#---------------------------------------------
+
+# SensitivityAndSimulationPuLP.py, section 4, keeps one dict per scenario,
+# turns the list into a DataFrame and only then counts and plots. Here the
+# results are folded into fixed-size aggregates as they arrive:
+#
+#  > RunningMoments: count, mean, variance (Welford), min and max per column
+#  > QuantileSketch: a KLL-style compactor sketch; levels of at most k
+#    values, level h standing for 2^h observations, so memory grows with
+#    log(n / k) and quantiles are off by a small, rank-based error
+#  > Histogram: counts on fixed bin edges, plus under/overflow
+#  > FrequencyTable: exact counts of discrete decision values, capped at
+#    max_keys distinct values (the rest is counted as "other")
+#
+# Every aggregate has merge(), so workers aggregate their own blocks and the
+# parent merges the partial results; MonteCarloSummary bundles them per
+# output column and stream_monte_carlo() runs MonteCarloSimulation.py's
+# blocks through it, with a callback that sees the summary so far.
+
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+import pandas as pd
+
+from MonteCarloSimulation import COLUMNS, block_generator, run_block
+
+
+class RunningMoments:
+    """Count, mean, variance, min and max of every column of a stream."""
+
+    def __init__(self, k=1):
+        self.n = 0
+        self.mean = np.zeros(k)
+        self.m2 = np.zeros(k)
+        self.min = np.full(k, np.inf)
+        self.max = np.full(k, -np.inf)
+
+    def update(self, values):
+        """Add a batch; values is (n,) or (n, k)."""
+        values = np.asarray(values, dtype=float).reshape(-1, self.mean.shape[0])
+        other = RunningMoments(self.mean.shape[0])
+        other.n = values.shape[0]
+        if other.n:
+            other.mean = values.mean(axis=0)
+            other.m2 = ((values - other.mean) ** 2).sum(axis=0)
+            other.min = values.min(axis=0)
+            other.max = values.max(axis=0)
+        return self.merge(other)
+
+    def merge(self, other):
+        # Chan et al.: combine two (n, mean, M2) triples exactly
+        n = self.n + other.n
+        if n == 0:
+            return self
+        delta = other.mean - self.mean
+        self.m2 = self.m2 + other.m2 + delta ** 2 * self.n * other.n / n
+        self.mean = self.mean + delta * other.n / n
+        self.n = n
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        return self
+
+    def variance(self, ddof=1):
+        return self.m2 / (self.n - ddof) if self.n > ddof else np.full_like(self.m2, np.nan)
+
+    def std(self, ddof=1):
+        return np.sqrt(self.variance(ddof))
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch in O(k log(n / k)) memory."""
+
+    def __init__(self, k=1024, seed=0):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        self.n += values.shape[0]
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, level in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], level])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            level = self.levels[h]
+            if level.shape[0] > self.k:
+                level = np.sort(level)
+                # an odd element stays behind; of the sorted rest every
+                # other one moves up a level, starting at a random offset
+                keep = level[:level.shape[0] % 2]
+                pairs = level[level.shape[0] % 2:]
+                up = pairs[self._rng.integers(2)::2]
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[h] = keep
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], up])
+            h += 1
+
+    def _weighted(self):
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(l.shape[0], 2.0 ** h) for h, l in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        return values[order], np.cumsum(weights[order])
+
+    def quantile(self, q):
+        """Approximate q-quantiles (q in [0, 1], scalar or array)."""
+        values, cum = self._weighted()
+        if not values.shape[0]:
+            return np.full(np.shape(q), np.nan)
+        idx = np.searchsorted(cum, np.asarray(q) * cum[-1], side="left")
+        return values[np.minimum(idx, values.shape[0] - 1)]
+
+    def cdf(self, x):
+        values, cum = self._weighted()
+        if not values.shape[0]:
+            return np.full(np.shape(x), np.nan)
+        idx = np.searchsorted(values, x, side="right")
+        return np.where(idx > 0, cum[np.maximum(idx - 1, 0)], 0.0) / cum[-1]
+
+    def size(self):
+        return sum(l.shape[0] for l in self.levels)
+
+
+class Histogram:
+    """Counts on fixed bin edges (the last bin is closed, as in np.histogram)."""
+
+    def __init__(self, edges):
+        self.edges = np.asarray(edges, dtype=float)
+        self.counts = np.zeros(self.edges.shape[0] - 1, dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+
+    @classmethod
+    def uniform(cls, lo, hi, bins=50):
+        return cls(np.linspace(lo, hi, bins + 1))
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        idx = np.searchsorted(self.edges, values, side="right") - 1
+        idx[values == self.edges[-1]] = self.counts.shape[0] - 1
+        self.underflow += int((idx < 0).sum())
+        self.overflow += int((idx >= self.counts.shape[0]).sum())
+        inside = idx[(idx >= 0) & (idx < self.counts.shape[0])]
+        self.counts += np.bincount(inside, minlength=self.counts.shape[0])
+        return self
+
+    def merge(self, other):
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError("histograms with different bin edges cannot be merged")
+        self.counts += other.counts
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+        return self
+
+
+class FrequencyTable:
+    """Exact counts of discrete values (rounded to `decimals`)."""
+
+    def __init__(self, decimals=6, max_keys=10000):
+        self.decimals = decimals
+        self.max_keys = max_keys
+        self.counts = Counter()
+        self.other = 0
+
+    def update(self, values):
+        values = np.round(np.asarray(values, dtype=float).ravel(), self.decimals)
+        keys, counts = np.unique(values, return_counts=True)
+        return self._add(zip(keys.tolist(), counts.tolist()))
+
+    def _add(self, items):
+        for key, count in items:
+            if key in self.counts or len(self.counts) < self.max_keys:
+                self.counts[key] += count
+            else:
+                self.other += count
+        return self
+
+    def merge(self, other):
+        self._add(other.counts.items())
+        self.other += other.other
+        return self
+
+    def value_counts(self):
+        # the layout of pandas' Series.value_counts()
+        return pd.Series(dict(self.counts.most_common()), dtype=np.int64, name="count")
+
+
+## 1. MONTE CARLO SUMMARY
+#------------------------
+
+# bin edges for the decision variables of the profit model, from the
+# constraints: A <= 8, 20 B <= 150, 8 C <= 60 (50 bins, as plt.hist in
+# SensitivityAndSimulationPuLP.py)
+DEFAULT_EDGES = {"A": np.linspace(0, 8, 51),
+                 "B": np.linspace(0, 7.5, 51),
+                 "C": np.linspace(0, 7.5, 51)}
+
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+class MonteCarloSummary:
+    """All streaming aggregates of the Monte Carlo output columns."""
+
+    def __init__(self, columns=COLUMNS, discrete=("A", "B", "C"), edges=None, sketch_size=1024,
+                 seed=0):
+        self.columns = list(columns)
+        self.moments = RunningMoments(len(self.columns))
+        self.sketches = {c: QuantileSketch(sketch_size, seed=seed) for c in self.columns}
+        edges = DEFAULT_EDGES if edges is None else edges
+        self.histograms = {c: Histogram(edges[c]) for c in self.columns if c in edges}
+        self.tables = {c: FrequencyTable() for c in discrete}
+
+    def update(self, block):
+        """Add a (len(columns), n) block of results, as returned by run_block()."""
+        block = np.asarray(block, dtype=float)
+        self.moments.update(block.T)
+        for k, c in enumerate(self.columns):
+            self.sketches[c].update(block[k])
+            if c in self.histograms:
+                self.histograms[c].update(block[k])
+            if c in self.tables:
+                self.tables[c].update(block[k])
+        return self
+
+    def merge(self, other):
+        self.moments.merge(other.moments)
+        for c in self.columns:
+            self.sketches[c].merge(other.sketches[c])
+        for c, h in self.histograms.items():
+            h.merge(other.histograms[c])
+        for c, t in self.tables.items():
+            t.merge(other.tables[c])
+        return self
+
+    @property
+    def n(self):
+        return self.moments.n
+
+    def summary(self):
+        df = pd.DataFrame({"count": self.moments.n,
+                           "mean": self.moments.mean,
+                           "std": self.moments.std(),
+                           "min": self.moments.min},
+                          index=self.columns)
+        for q in QUANTILES:
+            df["p%02d" % round(100 * q)] = [float(self.sketches[c].quantile(q)) for c in self.columns]
+        df["max"] = self.moments.max
+        return df
+
+    def value_counts(self, column):
+        return self.tables[column].value_counts()
+
+    def plot_histogram(self, column, ax=None):
+        import matplotlib.pyplot as plt
+        ax = plt.gca() if ax is None else ax
+        h = self.histograms[column]
+        ax.stairs(h.counts, h.edges, fill=True)
+        ax.set_title("{} MonteCarlo Runs for {}".format(self.n, column))
+        ax.set_ylabel("Frequency")
+        ax.set_xlabel("Value of decision variable")
+        return ax
+
+
+def summarize_block(seed, block, start, stop):
+    """Run one block of MonteCarloSimulation.py and return only its summary."""
+    sketch_seed = int(block_generator(seed, block).integers(2**31))
+    return MonteCarloSummary(seed=sketch_seed).update(run_block(seed, block, start, stop))
+
+
+def stream_monte_carlo(n_scenarios, seed=0, workers=1, block_size=64, callback=None):
+    """monte_carlo() without the result array: blocks are folded into a MonteCarloSummary.
+
+    callback(summary) is called after every merged block. At most 2 * workers
+    blocks are in flight, so memory does not grow with n_scenarios.
+    """
+    total = MonteCarloSummary(seed=seed)
+    blocks = ((k, start, min(start + block_size, n_scenarios))
+              for k, start in enumerate(range(0, n_scenarios, block_size)))
+
+    if workers == 1:
+        for job in blocks:
+            total.merge(summarize_block(seed, *job))
+            if callback is not None:
+                callback(total)
+        return total
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for job in blocks:
+            pending.add(pool.submit(summarize_block, seed, *job))
+            if len(pending) < 2 * workers:
+                continue
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                total.merge(fut.result())
+                if callback is not None:
+                    callback(total)
+        for fut in pending:
+            total.merge(fut.result())
+            if callback is not None:
+                callback(total)
+    return total
+
+
+if __name__ == "__main__":
+
+    import tracemalloc
+
+    from MonteCarloSimulation import monte_carlo, to_dataframe
+
+    # the streaming summary against the DataFrame of the full result array
+    pd.set_option("display.width", 200, "display.max_columns", None)
+    df = to_dataframe(monte_carlo(2048, seed=42))
+    summary = stream_monte_carlo(2048, seed=42, workers=2)
+    print(summary.summary().round(3))
+    print("exact mean/std:", np.allclose(summary.moments.mean, df.mean().to_numpy()),
+          np.allclose(summary.moments.std(), df.std().to_numpy()))
+    print("exact value counts:", all(
+        (summary.value_counts(c).sort_index() == df[c].value_counts().sort_index()).all()
+        for c in ("A", "B", "C")))
+    print("median of OBJ: sketch {:.2f}, exact {:.2f}".format(
+        summary.sketches["OBJ"].quantile(0.5), df["OBJ"].median()))
+    print(summary.value_counts("A"))
+
+    # progress reports while the run is going
+    def report(s):
+        if s.n % 1024 == 0:
+            print("{:>6} scenarios, mean OBJ {:.2f}".format(s.n, s.moments.mean[-1]))
+    stream_monte_carlo(4096, seed=1, callback=report)
+
+    # constant memory: the sketch of 10^7 values stays at a few thousand
+    sketch = QuantileSketch(k=1024, seed=0)
+    rng = np.random.default_rng(0)
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(100):
+        sketch.update(rng.normal(size=100000))
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    q = sketch.quantile([0.01, 0.5, 0.99])
+    print("10^7 values: {:.1f}s, {} values kept, peak {:.1f} MiB, quantiles {}".format(
+        elapsed, sketch.size(), peak / 2**20, np.round(q, 3)))
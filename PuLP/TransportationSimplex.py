@@ -0,0 +1,374 @@
+### TRANSPORTATION SIMPLEX
+#------------------------
+
+# The warehouse -> customer models of OptimizationBasics.py (sections 2 and
+# 3) are pure transportation problems:
+#
+#   min   sum cost[i,j] x[i,j]
+#   s.t.  sum_j x[i,j] <= supply[i],  sum_i x[i,j] = demand[j],  x >= 0
+#
+# transportation_simplex() solves them with the textbook method on arrays
+# instead of a generic MIP solver:
+#
+#  1. Vogel's approximation for the starting basis: the penalty of a row
+#     (column) is the gap between its two cheapest open lanes, kept up to
+#     date with pointers into the pre-sorted cost rows and columns
+#  2. MODI / network simplex iterations on the spanning tree of the m+n-1
+#     basic lanes: potentials u[i] + v[j] = cost[i,j] on the tree, a lane
+#     with negative reduced cost cost - u - v enters (the most negative in
+#     the next block of rows that has one), the cycle it closes is found by
+#     climbing the tree, and only the smaller side of the cut made by the
+#     leaving lane gets its potentials shifted
+#
+# Flows only ever change by the smallest flow on a cycle, so integer supply
+# and demand give an integer plan (the constraint matrix is totally
+# unimodular). The potentials are the duals: u for the supply rows, v for
+# the demand rows, and cost - u - v is the price of every unused lane.
+
+import time
+from collections import namedtuple
+
+import numpy as np
+import scipy.sparse as sp
+
+
+TransportResult = namedtuple("TransportResult", ["objective", "flow", "supply_dual", "demand_dual",
+                                                 "reduced_cost", "iterations"])
+
+
+## 1. VOGEL'S APPROXIMATION
+#--------------------------
+
+def _advance(order, p1, p2, open_, lines):
+    # move the pointers of `lines` to their first two open entries; index
+    # order.shape[1] - 1 is a sentinel that is always open
+    for p in (p1, p2):
+        if p is p2:
+            p2[lines] = np.maximum(p2[lines], p1[lines] + 1)
+        todo = lines[~open_[order[lines, p[lines]]]]
+        while todo.shape[0]:
+            p[todo] += 1
+            todo = todo[~open_[order[todo, p[todo]]]]
+
+
+def vogel(cost, supply, demand):
+    """Basic starting solution of a balanced problem: m + n - 1 lanes (i, j, flow)."""
+    m, n = cost.shape
+    supply = supply.astype(float).copy()
+    demand = demand.astype(float).copy()
+
+    # padded costs: a sentinel row/column of +inf behind every sorted line
+    padded = np.full((m + 1, n + 1), np.inf)
+    padded[:m, :n] = cost
+    row_order = np.hstack([np.argsort(cost, axis=1, kind="stable"), np.full((m, 1), n)])
+    col_order = np.vstack([np.argsort(cost, axis=0, kind="stable"), np.full((1, n), m)]).T
+    row_open = np.ones(m + 1, dtype=bool)
+    col_open = np.ones(n + 1, dtype=bool)
+    rows, cols = np.arange(m), np.arange(n)
+    r1, r2 = np.zeros(m, dtype=np.int64), np.ones(m, dtype=np.int64)
+    c1, c2 = np.zeros(n, dtype=np.int64), np.ones(n, dtype=np.int64)
+    _advance(row_order, r1, r2, col_open, rows)
+    _advance(col_order, c1, c2, row_open, cols)
+
+    basis = []
+    n_rows, n_cols = m, n
+    while n_rows > 1 and n_cols > 1:
+        # penalties of the open lines; a line with one open lane has +inf
+        with np.errstate(invalid="ignore"):
+            pen_r = padded[rows, row_order[rows, r2]] - padded[rows, row_order[rows, r1]]
+            pen_c = padded[col_order[cols, c2], cols] - padded[col_order[cols, c1], cols]
+        pen_r[~row_open[:m]] = -1.0
+        pen_c[~col_open[:n]] = -1.0
+        i_best, j_best = int(np.argmax(pen_r)), int(np.argmax(pen_c))
+        if pen_r[i_best] >= pen_c[j_best]:
+            i, j = i_best, int(row_order[i_best, r1[i_best]])
+        else:
+            i, j = int(col_order[j_best, c1[j_best]]), j_best
+
+        q = min(supply[i], demand[j])
+        basis.append((i, j, q))
+        supply[i] -= q
+        demand[j] -= q
+        # close exactly one line, so the basis stays a spanning tree
+        if supply[i] <= demand[j]:
+            row_open[i] = False
+            n_rows -= 1
+            hit = cols[col_open[:n] & ((col_order[cols, c1] == i) | (col_order[cols, c2] == i))]
+            _advance(col_order, c1, c2, row_open, hit)
+        else:
+            col_open[j] = False
+            n_cols -= 1
+            hit = rows[row_open[:m] & ((row_order[rows, r1] == j) | (row_order[rows, r2] == j))]
+            _advance(row_order, r1, r2, col_open, hit)
+
+    # the last open row (or column) takes everything that is left
+    for i in np.flatnonzero(row_open[:m]):
+        for j in np.flatnonzero(col_open[:n]):
+            q = min(supply[i], demand[j])
+            basis.append((int(i), int(j), q))
+            supply[i] -= q
+            demand[j] -= q
+    return basis
+
+
+## 2. MODI / NETWORK SIMPLEX ITERATIONS
+#--------------------------------------
+
+def transportation_simplex(cost, supply, demand, max_iter=None, tol=1e-9, block_size=5000):
+    """Optimal transportation plan.
+
+    cost: dense (m x n) array or scipy.sparse matrix of the open lanes (a
+    sparse matrix is densified, missing lanes get a prohibitive cost).
+    supply may exceed total demand; the surplus stays at the origins.
+    block_size is the number of lanes priced per iteration.
+    Returns a TransportResult with a sparse flow matrix and the duals.
+    """
+    if sp.issparse(cost):
+        lanes = sp.coo_matrix(cost)
+        dense = np.full(lanes.shape, np.inf)
+        dense[lanes.row, lanes.col] = lanes.data
+        cost = dense
+    cost = np.asarray(cost, dtype=float)
+    supply = np.asarray(supply, dtype=float)
+    demand = np.asarray(demand, dtype=float)
+    m, n = cost.shape
+    if supply.sum() < demand.sum() - tol:
+        raise ValueError("total supply is smaller than total demand")
+
+    # missing lanes: a cost no optimal plan would pay
+    missing = ~np.isfinite(cost)
+    big = (np.abs(cost[~missing]).max() + 1.0) * (m + n) if (~missing).any() else 1.0
+    C = np.where(missing, big, cost)
+    # surplus supply goes to a zero-cost dummy customer
+    surplus = supply.sum() - demand.sum()
+    dummy = surplus > tol
+    if dummy:
+        C = np.hstack([C, np.zeros((m, 1))])
+        demand = np.append(demand, surplus)
+    N = C.shape[1]
+
+    # nodes: rows 0..m-1, columns m..m+N-1; the tree is kept as adjacency
+    # sets and parent pointers rooted at row 0
+    basis = vogel(C, supply, demand)
+    flow = {}
+    adj = [set() for _ in range(m + N)]
+    for i, j, q in basis:
+        flow[(i, j)] = q
+        adj[i].add(m + j)
+        adj[m + j].add(i)
+
+    parent = [-1] * (m + N)
+    u = np.zeros(m)
+    v = np.zeros(N)
+
+    def hang(root):
+        # parent pointers and potentials of the whole tree, from root
+        stack = [root]
+        parent[root] = -1
+        nodes = []
+        while stack:
+            a = stack.pop()
+            nodes.append(a)
+            for b in adj[a]:
+                if b != parent[a]:
+                    parent[b] = a
+                    if b >= m:
+                        v[b - m] = C[a, b - m] - u[a]
+                    else:
+                        u[b] = C[b, a - m] - v[a - m]
+                    stack.append(b)
+        return nodes
+
+    # a degenerate start can leave the tree disconnected: join the pieces
+    # with zero-flow lanes
+    visited = np.zeros(m + N, dtype=bool)
+    visited[hang(0)] = True
+    while not visited.all():
+        a = int(np.argmin(visited))
+        i, j = (a, int(np.argmax(visited[m:]))) if a < m else (int(np.argmax(visited[:m])), a - m)
+        flow[(i, j)] = 0.0
+        adj[i].add(m + j)
+        adj[m + j].add(i)
+        visited[hang(0)] = True
+
+    def lane(x):
+        p = parent[x]
+        return (x, p - m) if x < m else (p, x - m)
+
+    # partial pricing: the entering lane is the most negative reduced cost
+    # within the next block of rows that has one; optimal once a full sweep
+    # over all blocks finds none
+    block = max(1, min(m, block_size // N))
+    start = 0
+    it = 0
+    while max_iter is None or it < max_iter:
+        for sweep in range(0, m + block, block):
+            rows = np.arange(start, start + block) % m
+            R = C[rows] - u[rows, None] - v[None, :]
+            k = int(np.argmin(R))
+            d = R.flat[k]
+            r, c = int(rows[k // N]), k % N
+            if d < -tol * max(1.0, abs(C[r, c])):
+                break
+            start = (start + block) % m
+        else:
+            break
+        it += 1
+
+        # the cycle closed by lane (r, c): climb from both ends in turn
+        # until one reaches a node the other has passed
+        path_a, path_b = [r], [m + c]
+        seen_a, seen_b = {r}, {m + c}
+        while True:
+            x = parent[path_a[-1]]
+            if x != -1:
+                if x in seen_b:
+                    path_b = path_b[:path_b.index(x)]
+                    break
+                path_a.append(x)
+                seen_a.add(x)
+            y = parent[path_b[-1]]
+            if y != -1:
+                if y in seen_a:
+                    path_a = path_a[:path_a.index(y)]
+                    break
+                path_b.append(y)
+                seen_b.add(y)
+
+        # lanes on the cycle alternate -, +, -, ... from both ends
+        minus, plus = [], []
+        for path in (path_a, path_b):
+            for k, x in enumerate(path):
+                (minus if k % 2 == 0 else plus).append((x, lane(x)))
+        theta, leave_node, leave_lane = min(((flow[l], x, l) for x, l in minus),
+                                            key=lambda t: t[0])
+        for _, l in minus:
+            flow[l] -= theta
+        for _, l in plus:
+            flow[l] += theta
+        flow[(r, c)] = theta
+        del flow[leave_lane]
+
+        # cut the leaving lane: the tree falls into the part below leave_node
+        # and the part with the root. Walk both in turn until the smaller one
+        # is complete and shift its potentials so the entering lane has
+        # u + v = cost
+        p = parent[leave_node]
+        adj[leave_node].discard(p)
+        adj[p].discard(leave_node)
+        parts = [[leave_node], [p]]
+        seen = [{leave_node}, {p}]
+        heads = [0, 0]
+        small = None
+        while small is None:
+            for side in (0, 1):
+                if heads[side] == len(parts[side]):
+                    small = side
+                    break
+                a = parts[side][heads[side]]
+                heads[side] += 1
+                for b in adj[a]:
+                    if b not in seen[side]:
+                        seen[side].add(b)
+                        parts[side].append(b)
+        nodes = np.array(parts[small])
+        sign = 1.0 if r in seen[small] else -1.0
+        u[nodes[nodes < m]] += sign * d
+        v[nodes[nodes >= m] - m] -= sign * d
+
+        # re-hang the part below leave_node from the entering lane: reverse
+        # the parent pointers on the path from its end of the lane
+        x, y = (r, m + c) if leave_node in path_a else (m + c, r)
+        prev, node = y, x
+        while node != leave_node:
+            up = parent[node]
+            parent[node] = prev
+            prev, node = node, up
+        parent[leave_node] = prev
+        adj[r].add(m + c)
+        adj[m + c].add(r)
+
+    if dummy:
+        # the dummy customer is worth nothing: u <= 0 prices the supply rows
+        u += v[-1]
+        v -= v[-1]
+        v = v[:-1]
+    else:
+        # balanced: the potentials are only fixed up to a constant, shift
+        # them so that u <= 0 is a valid dual of the supply rows as well
+        shift = u.max()
+        u -= shift
+        v += shift
+    used = [(l, q) for l, q in flow.items() if q > 0 and l[1] < n]
+    i = np.array([l[0] for l, _ in used], dtype=np.int64)
+    j = np.array([l[1] for l, _ in used], dtype=np.int64)
+    q = np.array([q for _, q in used])
+    if missing[i, j].any():
+        raise ValueError("demand cannot be met on the open lanes")
+    return TransportResult(float(cost[i, j] @ q), sp.csr_matrix((q, (i, j)), shape=(m, n)),
+                           u, v, cost - u[:, None] - v[None, :], it)
+
+
+def random_transport_instance(m, n, seed=0):
+    rng = np.random.default_rng(seed)
+    origins = rng.uniform(0, 1000, (m, 2))
+    destinations = rng.uniform(0, 1000, (n, 2))
+    cost = np.round(np.hypot(*(origins[:, None, :] - destinations[None, :, :]).transpose(2, 0, 1)))
+    demand = rng.integers(10, 100, n).astype(float)
+    supply = np.round(rng.dirichlet(np.ones(m)) * demand.sum() * 1.1) + 1
+    return cost, supply, demand
+
+
+def benchmark_transport(sizes=(100, 300, 1000), cbc_limit=1000):
+    import pulp as plp
+    from MinCostFlowModel import transportation_model
+    from SparseModel import solve_arrays
+
+    print("{:>6} {:>12} {:>10} {:>8} {:>10} {:>10}".format(
+        "m = n", "objective", "simplex s", "pivots", "HiGHS s", "CBC s"))
+    for size in sizes:
+        cost, supply, demand = random_transport_instance(size, size)
+        start = time.perf_counter()
+        res = transportation_simplex(cost, supply, demand)
+        t_simplex = time.perf_counter() - start
+
+        start = time.perf_counter()
+        sol = solve_arrays(transportation_model(cost, supply, demand)[0])
+        t_highs = time.perf_counter() - start
+        assert abs(sol.objective - res.objective) <= 1e-6 * abs(sol.objective)
+
+        # the route of OptimizationBasics.py: LpVariable.dicts + CBC
+        t_cbc = np.nan
+        if size <= cbc_limit:
+            start = time.perf_counter()
+            model = plp.LpProblem("Transportation", plp.LpMinimize)
+            lanes = [(i, j) for i in range(size) for j in range(size)]
+            x = plp.LpVariable.dicts("x", lanes, lowBound=0, cat="Integer")
+            model += plp.lpSum(cost[i, j] * x[(i, j)] for i, j in lanes)
+            for i in range(size):
+                model += plp.lpSum(x[(i, j)] for j in range(size)) <= supply[i]
+            for j in range(size):
+                model += plp.lpSum(x[(i, j)] for i in range(size)) == demand[j]
+            model.solve(plp.PULP_CBC_CMD(msg=0))
+            t_cbc = time.perf_counter() - start
+        print("{:>6} {:>12.0f} {:>10.2f} {:>8} {:>10.2f} {:>10.2f}".format(
+            size, res.objective, t_simplex, res.iterations, t_highs, t_cbc))
+
+
+if __name__ == "__main__":
+
+    # OptimizationBasics.py section 2: two warehouses, four customers
+    warehouse = ['New York', 'Atlanta']
+    customers = ['East', 'South', 'Midwest', 'West']
+    costs = np.array([[211, 232, 240, 300],
+                      [232, 212, 230, 280]])
+    res = transportation_simplex(costs, [5100, 5100], [1800, 1200, 1100, 1000])
+    flow = res.flow.toarray()
+    for i, w in enumerate(warehouse):
+        for j, c in enumerate(customers):
+            if flow[i, j] > 0:
+                print("X_{}_{} = {}".format(w, c, flow[i, j]))
+    print("Total transportation cost: ", res.objective)
+    print("supply duals: ", res.supply_dual, " demand duals: ", res.demand_dual)
+
+    benchmark_transport()
@@ -0,0 +1,325 @@
+### TRUCK LOADING ENGINE
+#-----------------------
+
+# Section 6 of OptimizationBasics.py loads one truck through a binary
+# model: weight <= 20000, E and D not together, D only with B. This module
+# loads trucks without a MIP solver:
+#
+#  > knapsack():   one truck. The items without side constraints go into a
+#                  NumPy dynamic program over the capacity (one vector
+#                  update per item); the items in conflict / implication
+#                  constraints are branched on, bounded by the same DP
+#                  with those items added unconstrained
+#  > load_trucks(): several trucks in sequence, each one a knapsack over
+#                  the items still left
+#  > pack_fleet(): every item on as few trucks as possible. First-fit-
+#                  decreasing gives a fleet at once; column generation over
+#                  truck loads (priced with knapsack()) then tries to save
+#                  trucks and gives a lower bound
+#
+# Weights must be integers (kg); they are divided by their common divisor
+# before the DP, so 20000 kg in units of 100 kg is a 200-wide table.
+
+import math
+import time
+from collections import namedtuple
+from functools import reduce
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.optimize import linprog
+
+from SparseModel import make_model, solve_arrays, MINIMIZE
+
+
+Load = namedtuple("Load", ["items", "weight", "profit"])
+
+FleetResult = namedtuple("FleetResult", ["trucks", "n_trucks", "lower_bound", "method"])
+
+
+def _integer_weights(weight, capacity):
+    weight = np.asarray(weight)
+    if not (np.all(np.mod(weight, 1) == 0) and float(capacity) % 1 == 0):
+        raise ValueError("weights and capacity must be integers")
+    weight = weight.astype(np.int64)
+    capacity = int(capacity)
+    g = reduce(math.gcd, weight.tolist() + [capacity])
+    g = max(g, 1)
+    return weight // g, capacity // g, g
+
+
+## 1. ONE TRUCK
+#--------------
+
+def _dp(weight, profit, capacity, keep=False):
+    # dp[c] = best profit within capacity c; keep[i, c]: item i taken at c
+    dp = np.zeros(capacity + 1)
+    taken = np.zeros((weight.shape[0], capacity + 1), dtype=bool) if keep else None
+    for i in range(weight.shape[0]):
+        w, p = weight[i], profit[i]
+        if w > capacity or p <= 0:
+            continue
+        cand = dp[:capacity + 1 - w] + p
+        better = cand > dp[w:]
+        if keep:
+            taken[i, w:] = better
+        dp[w:] = np.where(better, cand, dp[w:])
+    return dp, taken
+
+
+def knapsack(weight, profit, capacity, conflicts=(), implies=()):
+    """Most profitable load of one truck.
+
+    conflicts: pairs (i, j) that cannot be loaded together;
+    implies:   pairs (i, j) where loading i requires loading j.
+    Returns a Load with the loaded item indices.
+    """
+    profit = np.asarray(profit, dtype=float)
+    w, cap, _ = _integer_weights(weight, capacity)
+    conflicts = [tuple(c) for c in conflicts]
+    implies = [tuple(c) for c in implies]
+
+    # items in a side constraint are branched on, the rest go into the DP
+    constrained = sorted({i for pair in conflicts + implies for i in pair})
+    free = np.setdiff1d(np.arange(w.shape[0]), constrained)
+    dp_free, taken = _dp(w[free], profit[free], cap, keep=True)
+
+    # suffix[k]: DP over the free items plus constrained items k.., side
+    # constraints dropped, an upper bound for the rest of the branch
+    k_total = len(constrained)
+    suffix = [None] * k_total + [dp_free]
+    for k in range(k_total - 1, -1, -1):
+        i = constrained[k]
+        suffix[k] = suffix[k + 1].copy()
+        if w[i] <= cap and profit[i] > 0:
+            suffix[k][w[i]:] = np.maximum(suffix[k][w[i]:], suffix[k + 1][:cap + 1 - w[i]] + profit[i])
+
+    # side constraints checked at the position where both ends are decided
+    pos = {i: k for k, i in enumerate(constrained)}
+    checks = [[] for _ in range(k_total)]
+    for a, b in conflicts:
+        checks[max(pos[a], pos[b])].append((pos[a], pos[b], True))
+    for a, b in implies:
+        checks[max(pos[a], pos[b])].append((pos[a], pos[b], False))
+
+    # an item without profit is only worth loading when another item needs it
+    targets = {pos[b] for _, b in implies}
+
+    chosen = np.zeros(k_total, dtype=bool)
+    best = [-np.inf, None, cap]
+
+    def search(k, rem, value):
+        if k == k_total:
+            total = value + dp_free[rem]
+            if total > best[0]:
+                best[:] = [total, chosen.copy(), rem]
+            return
+        if value + suffix[k][rem] <= best[0]:
+            return
+        i = constrained[k]
+        for take in (True, False):
+            if take and (w[i] > rem or (profit[i] <= 0 and k not in targets)):
+                continue
+            chosen[k] = take
+            ok = all(not (chosen[a] and chosen[b]) if conflict else not (chosen[a] and not chosen[b])
+                     for a, b, conflict in checks[k])
+            if ok:
+                search(k + 1, rem - w[i] * take, value + profit[i] * take)
+        chosen[k] = False
+
+    search(0, cap, 0.0)
+    if best[1] is None:
+        raise ValueError("no load satisfies the side constraints")
+
+    # trace the free items back through the DP table
+    items = [constrained[k] for k in np.flatnonzero(best[1])]
+    c = best[2]
+    for j in range(free.shape[0] - 1, -1, -1):
+        if taken[j, c]:
+            items.append(free[j])
+            c -= w[free[j]]
+    items = np.sort(np.array(items, dtype=np.int64))
+    return Load(items, float(np.asarray(weight, dtype=float)[items].sum()), float(profit[items].sum()))
+
+
+def load_trucks(weight, profit, capacity, n_trucks, conflicts=(), implies=()):
+    """Fill n_trucks one after the other, each with the best load of the items left."""
+    weight = np.asarray(weight)
+    profit = np.asarray(profit, dtype=float)
+    left = np.ones(weight.shape[0], dtype=bool)
+    loads = []
+    for _ in range(n_trucks):
+        idx = np.flatnonzero(left)
+        if idx.shape[0] == 0:
+            break
+        # side constraints among the items still left, in local indices
+        local = np.full(weight.shape[0], -1)
+        local[idx] = np.arange(idx.shape[0])
+        keep = lambda pairs: [(local[a], local[b]) for a, b in pairs if left[a] and left[b]]
+        # an implication whose target has already left cannot be satisfied
+        blocked = [a for a, b in implies if left[a] and not left[b]]
+        p = profit[idx].copy()
+        p[local[blocked]] = 0.0
+        load = knapsack(weight[idx], p, capacity, keep(conflicts), keep(implies))
+        if load.items.shape[0] == 0:
+            break
+        items = idx[load.items]
+        left[items] = False
+        loads.append(Load(items, float(weight[items].sum()), float(profit[items].sum())))
+    return loads
+
+
+## 2. THE WHOLE FLEET
+#--------------------
+
+def _groups(n, implies):
+    # loading i requires j on the same truck: union-find into bundles
+    parent = np.arange(n)
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for a, b in implies:
+        parent[find(a)] = find(b)
+    roots = np.array([find(i) for i in range(n)])
+    _, group = np.unique(roots, return_inverse=True)
+    return group
+
+
+def first_fit_decreasing(weight, capacity, conflicts=()):
+    """Bins (lists of item indices) by first-fit-decreasing, respecting conflicts."""
+    weight = np.asarray(weight, dtype=float)
+    n = weight.shape[0]
+    neighbours = [[] for _ in range(n)]
+    for a, b in conflicts:
+        neighbours[a].append(b)
+        neighbours[b].append(a)
+    residual = np.full(n, float(capacity))
+    bin_of = np.full(n, -1)
+    used = 0
+    for i in np.argsort(-weight, kind="stable"):
+        fits = residual[:used + 1] >= weight[i]
+        nb = bin_of[neighbours[i]] if neighbours[i] else np.empty(0, dtype=int)
+        fits[nb[(nb >= 0) & (nb <= used)]] = False
+        b = int(np.argmax(fits))
+        bin_of[i] = b
+        residual[b] -= weight[i]
+        used = max(used, b + 1)
+    return [np.flatnonzero(bin_of == b) for b in range(used)]
+
+
+def _load_matrix(columns, n):
+    # bundle x load incidence
+    return sp.csc_matrix((np.ones(sum(len(c) for c in columns)), np.concatenate(columns),
+                          np.cumsum([0] + [len(c) for c in columns])), shape=(n, len(columns)))
+
+
+def pack_fleet(weight, capacity, conflicts=(), implies=(), refine=True, max_iter=500,
+               max_seconds=30.0):
+    """Load every item on as few trucks as possible.
+
+    Items linked by an implication travel together. Returns a FleetResult
+    whose trucks hold the item indices of every truck.
+    """
+    weight = np.asarray(weight)
+    n = weight.shape[0]
+    group = _groups(n, implies)
+    n_g = group.max() + 1 if n else 0
+    g_weight = np.bincount(group, weight.astype(float), minlength=n_g)
+    if (g_weight > capacity).any():
+        raise ValueError("an item (or bundle of implied items) is heavier than a truck")
+    g_conflicts = sorted({(min(group[a], group[b]), max(group[a], group[b])) for a, b in conflicts})
+    if any(a == b for a, b in g_conflicts):
+        raise ValueError("conflicting items are bundled by an implication")
+
+    columns = first_fit_decreasing(g_weight, capacity, g_conflicts)
+    best = columns
+    lower = math.ceil(g_weight.sum() / capacity - 1e-9)
+    method = "ffd"
+
+    if refine and len(best) > lower:
+        # column generation on the set-covering master: min #loads, every
+        # bundle on at least one load; pricing is a knapsack on the duals
+        start = time.perf_counter()
+        for _ in range(max_iter):
+            M = _load_matrix(columns, n_g)
+            lp = linprog(np.ones(len(columns)), A_ub=-M, b_ub=-np.ones(n_g), bounds=(0, None),
+                         method="highs")
+            duals = -lp.ineqlin.marginals
+            load = knapsack(g_weight, duals, capacity, conflicts=g_conflicts)
+            # Farley bound: z / (best pricing value) holds at every iteration
+            lower = max(lower, math.ceil(lp.fun / max(load.profit, 1.0) - 1e-6))
+            if load.profit <= 1.0 + 1e-9 or lower >= len(best):
+                break
+            columns.append(load.items)
+            if time.perf_counter() - start > max_seconds:
+                break
+
+        if lower < len(best):
+            model = make_model(np.ones(len(columns)), _load_matrix(columns, n_g), np.ones(n_g), np.full(n_g, np.inf),
+                               col_upper=np.ones(len(columns)),
+                               integrality=np.ones(len(columns), dtype=np.int8), sense=MINIMIZE)
+            sol = solve_arrays(model, time_limit=max_seconds)
+            if sol.x is not None and round(sol.objective) < len(best):
+                # covering -> partition: a bundle stays on the first load that has it
+                seen = np.zeros(n_g, dtype=bool)
+                best = []
+                for j in np.flatnonzero(np.round(sol.x) > 0):
+                    col = columns[j][~seen[columns[j]]]
+                    seen[col] = True
+                    if col.shape[0]:
+                        best.append(col)
+                method = "column generation"
+
+    # bundles back to items
+    members = [np.flatnonzero(np.isin(group, col)) for col in best]
+    return FleetResult(members, len(members), lower, method)
+
+
+def benchmark_loading(n_items=(100, 1000, 5000), capacity=20000, n_trucks=20, seed=0):
+    rng = np.random.default_rng(seed)
+    print("{:>7} {:>8} {:>14} {:>8} {:>8} {:>10}".format(
+        "items", "trucks", "ms per truck", "fleet", "bound", "fleet s"))
+    for n in n_items:
+        weight = rng.integers(200, 12000, n)
+        profit = weight * rng.uniform(4, 8, n)
+        conflicts = [tuple(rng.choice(n, 2, replace=False)) for _ in range(5)]
+        # implied pairs among the lighter items, so every bundle fits a truck
+        implies = [tuple(rng.choice(np.flatnonzero(weight < 6000), 2, replace=False)) for _ in range(5)]
+        start = time.perf_counter()
+        loads = load_trucks(weight, profit, capacity, n_trucks, conflicts, implies)
+        per_truck = (time.perf_counter() - start) / max(len(loads), 1)
+        start = time.perf_counter()
+        fleet = pack_fleet(weight, capacity, conflicts, implies, max_seconds=10)
+        print("{:>7} {:>8} {:>14.2f} {:>8} {:>8} {:>10.2f}".format(
+            n, len(loads), 1000 * per_truck, fleet.n_trucks, fleet.lower_bound, time.perf_counter() - start))
+
+
+if __name__ == "__main__":
+
+    import pulp as plp
+    from InProcessSolver import truck_model
+
+    # OptimizationBasics.py section 6
+    products = ['A', 'B', 'C', 'D', 'E', 'F']
+    weight = [12800, 10900, 11400, 2100, 11300, 2300]
+    profitability = [77878, 82713, 82728, 68423, 84119, 77765]
+    load = knapsack(weight, profitability, 20000, conflicts=[(4, 3)], implies=[(3, 1)])
+    print("Load: ", [products[i] for i in load.items], " weight: ", load.weight, " profit: ", load.profit)
+
+    model = truck_model()
+    model.solve(plp.PULP_CBC_CMD(msg=0))
+    assert abs(plp.value(model.objective) - load.profit) < 1e-6, plp.value(model.objective)
+
+    # item 0 loses money but item 1 needs it on board: 16 + 35 - 1 = 50
+    load = knapsack([3, 6, 7, 12, 13], [-1, 16, 36, 35, 3], 25, conflicts=[(0, 2)],
+                    implies=[(1, 0), (2, 4)])
+    assert load.profit == 50, load
+
+    fleet = pack_fleet(weight, 20000, conflicts=[(4, 3)], implies=[(3, 1)])
+    print("Fleet: ", [[products[i] for i in t] for t in fleet.trucks])
+
+    benchmark_loading()